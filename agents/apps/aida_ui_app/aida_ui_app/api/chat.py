@@ -2,18 +2,71 @@ import frappe
 from frappe import _
 import requests
 import json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Shared connection pool so chat turns reuse the keep-alive socket to the Aida API
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=50,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 502, 503, 504])
+)
+_SESSION.mount('http://', _ADAPTER)
+_SESSION.mount('https://', _ADAPTER)
+_TIMEOUT = (3, 30)
+
+# site -> (aida_api_url, google_maps_api_key); a bench worker can serve several sites
+_SITE_CONF = {}
+
+def _site_conf():
+    """Aida settings from site_config.json, resolved once per site"""
+    conf = _SITE_CONF.get(frappe.local.site)
+    if conf is None:
+        conf = (
+            frappe.conf.get('aida_api_url', 'http://localhost:5000'),
+            frappe.conf.get('google_maps_api_key', '')
+        )
+        _SITE_CONF[frappe.local.site] = conf
+    return conf
+
+def get_aida_api_url():
+    """Base URL of the Aida API server for the current site"""
+    return _site_conf()[0]
+
+def get_google_maps_api_key():
+    """Google Maps API key configured for the current site"""
+    return _site_conf()[1]
+
+# site -> public site URL, used as the ERPNext URL the Aida backend calls back
+_SITE_URLS = {}
+
+def get_site_url():
+    """frappe.utils.get_url() for the current site, resolved once per site"""
+    url = _SITE_URLS.get(frappe.local.site)
+    if url is None:
+        url = _SITE_URLS[frappe.local.site] = frappe.utils.get_url()
+    return url
+
+def _proxy(path, payload):
+    """Forward a request to the Aida API over the shared keep-alive pool.
+
+    Whitelisted methods run inside Frappe's synchronous WSGI request cycle, so
+    an async client would still hold the worker for the full round trip; the
+    pooled session keeps that round trip as short as possible instead.
+    """
+    return _SESSION.post(f"{get_aida_api_url()}/{path}", json=payload, timeout=_TIMEOUT)
 
 @frappe.whitelist()
 def init_session():
     """Initialize a new chat session with the Aida AI agent"""
     try:
         # Get configuration from site_config.json
-        aida_api_url = frappe.conf.get('aida_api_url', 'http://localhost:5000')
-        google_api_key = frappe.conf.get('google_maps_api_key', '')
+        google_api_key = get_google_maps_api_key()
         
         # Initialize session with the Aida AI agent
-        response = requests.post(f"{aida_api_url}/init_session", json={
-            'erpnext_url': frappe.utils.get_url(),
+        response = _proxy("init_session", {
+            'erpnext_url': get_site_url(),
             'username': frappe.session.user,
             'password': 'session_token',
             'api_key': frappe.session.user,
@@ -42,10 +95,8 @@ def send_message(session_id, message):
         if not session_id or not message:
             return {'error': _("Invalid request parameters")}
             
-        aida_api_url = frappe.conf.get('aida_api_url', 'http://localhost:5000')
-        
         # Send message to Aida AI agent
-        response = requests.post(f"{aida_api_url}/chat", json={
+        response = _proxy("chat", {
             'session_id': session_id,
             'message': message
         })
@@ -1,10 +1,32 @@
 import frappe
 
+# Roles rarely change mid-session; cache them per user in Redis
+ROLE_CACHE_PREFIX = "aida_ui_app:user_roles:"
+ROLE_CACHE_TTL = 300
+
+def get_user_roles(user=None):
+    """Return the user's roles, cached for ROLE_CACHE_TTL seconds"""
+    user = user or frappe.session.user
+    key = ROLE_CACHE_PREFIX + user
+    roles = frappe.cache().get_value(key)
+    if roles is None:
+        roles = frappe.get_roles(user)
+        frappe.cache().set_value(key, roles, expires_in_sec=ROLE_CACHE_TTL)
+    return roles
+
+def clear_role_cache(doc=None, method=None):
+    """Drop cached roles; hooked to User and Role changes"""
+    if doc is not None and doc.doctype == "User":
+        frappe.cache().delete_value(ROLE_CACHE_PREFIX + doc.name)
+    else:
+        frappe.cache().delete_keys(ROLE_CACHE_PREFIX)
+
 def has_app_permission():
     """Check if user has permission to access Aida AI app"""
     # Allow access to System Manager and users with the 'Aida AI User' role
     user = frappe.session.user
-    if user == 'Administrator' or 'System Manager' in frappe.get_roles(user):
+    if user == 'Administrator':
         return True
         
-    return 'Aida AI User' in frappe.get_roles(user) 
\ No newline at end of file
+    roles = get_user_roles(user)
+    return 'System Manager' in roles or 'Aida AI User' in roles
\ No newline at end of file
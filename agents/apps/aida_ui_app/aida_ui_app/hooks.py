@@ -41,4 +41,17 @@ web_include_js = [
 
 web_include_css = [
     "/assets/aida_ui_app/css/aida_chat_widget.css"
-] 
\ No newline at end of file
+] 
+
+# Document Events
+# ------------------
+doc_events = {
+    "User": {
+        "on_update": "aida_ui_app.api.permission.clear_role_cache",
+        "on_trash": "aida_ui_app.api.permission.clear_role_cache"
+    },
+    "Role": {
+        "on_update": "aida_ui_app.api.permission.clear_role_cache",
+        "on_trash": "aida_ui_app.api.permission.clear_role_cache"
+    }
+}
\ No newline at end of file
@@ -1,6 +1,7 @@
 import frappe
 from frappe import _
-from aida_ui_app.api.permission import has_app_permission
+from aida_ui_app.api.permission import has_app_permission, get_user_roles
+from aida_ui_app.api.chat import get_aida_api_url, get_google_maps_api_key
 
 def get_context(context):
     if not has_app_permission():
@@ -10,11 +11,11 @@ def get_context(context):
     context.title = _("Aida AI")
     
     # Add any additional context needed for the page
-    context.api_base_url = frappe.conf.get('aida_api_url', 'http://localhost:5000')
-    context.google_maps_api_key = frappe.conf.get('google_maps_api_key', '')
+    context.api_base_url = get_aida_api_url()
+    context.google_maps_api_key = get_google_maps_api_key()
     
     # Get user info
     context.user = frappe.session.user
-    context.user_roles = frappe.get_roles()
+    context.user_roles = get_user_roles()
     
     return context 
\ No newline at end of file
@@ -1,11 +1,19 @@
 import logging
-from typing import List, Dict, Optional
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Optional, Tuple
 from services.gmaps_service import GMapsDataExtractor
 from services.erpnext_service import ERPNextService
 from services.personalization_service import PersonalizationService
 from services.lead_filter_service import LeadFilterService
+from services.http_session import create_http_session
 
 class LeadCreationAgent:
+    # erpnext_url -> monotonic time of the last successful connection probe
+    _erpnext_verified: Dict[str, float] = {}
+    PREFLIGHT_TTL = 300
+    
     def __init__(self, 
                  gmaps_api_key: str,
                  erpnext_url: str,
@@ -13,22 +21,29 @@ class LeadCreationAgent:
                  erpnext_password: str,
                  gemini_api_key: Optional[str] = None):
         
-        self.gmaps_service = GMapsDataExtractor(gmaps_api_key)
-        self.erpnext_service = ERPNextService(erpnext_url, erpnext_username, erpnext_password)
+        # One connection pool shared by the Google Maps and ERPNext services
+        self.http_session = create_http_session()
+        self.gmaps_service = GMapsDataExtractor(gmaps_api_key, session=self.http_session)
+        self.erpnext_service = ERPNextService(erpnext_url, erpnext_username, erpnext_password,
+                                              session=self.http_session)
         self.filter_service = LeadFilterService()
+        self.max_workers = int(os.getenv('LEAD_CREATION_WORKERS', '8'))
         
         self.personalization_service = None
         if gemini_api_key:
             self.personalization_service = PersonalizationService(gemini_api_key)
         
-        # Test ERPNext connection immediately
-        try:
-            # Verify connection works by getting a few leads
-            test_leads = self.erpnext_service.client.get_list('Lead', fields=['name'], limit_page_length=1)
-            logging.info(f"ERPNext connection verified, found {len(test_leads)} existing leads")
-        except Exception as e:
-            logging.error(f"ERPNext connection test failed: {e}")
-            raise Exception(f"ERPNext connection failed: {e}")
+        # Test ERPNext connection, at most once per PREFLIGHT_TTL per site
+        verified_at = LeadCreationAgent._erpnext_verified.get(erpnext_url)
+        if verified_at is None or time.monotonic() - verified_at >= LeadCreationAgent.PREFLIGHT_TTL:
+            try:
+                # Verify connection works by getting a few leads
+                test_leads = self.erpnext_service.client.get_list('Lead', fields=['name'], limit_page_length=1)
+                logging.info(f"ERPNext connection verified, found {len(test_leads)} existing leads")
+                LeadCreationAgent._erpnext_verified[erpnext_url] = time.monotonic()
+            except Exception as e:
+                logging.error(f"ERPNext connection test failed: {e}")
+                raise Exception(f"ERPNext connection failed: {e}")
 
     def create_leads(self, 
                     business_type: str,
@@ -74,37 +89,39 @@ class LeadCreationAgent:
                 # Get extra businesses to account for filtering
                 search_count = max(count * 3, 20) if filters else count
                 
-                businesses = self.gmaps_service.search_businesses(
+                # Filter while parsing and stop as soon as enough businesses match
+                found = 0
+                businesses = []
+                for business in self.gmaps_service.iter_businesses(
                     query=business_type,
                     location=location,
                     count=search_count
-                )
+                ):
+                    found += 1
+                    if self.filter_service.matches(business, filters):
+                        businesses.append(business)
+                        if len(businesses) >= count:
+                            break
                 
-                if not businesses:
+                if not found:
                     return {
                         'success': False,
                         'message': 'No businesses found matching criteria',
                         'created_leads': []
                     }
                 
-                logging.info(f"Found {len(businesses)} businesses from API")
+                logging.info(f"Scanned {found} businesses from API")
+                
+                if not businesses:
+                    return {
+                        'success': False,
+                        'message': f'No businesses found matching filter criteria. {filter_summary}',
+                        'created_leads': [],
+                        'filter_summary': filter_summary
+                    }
                 
-                # Apply filters
                 if filters:
-                    filtered_businesses = self.filter_service.filter_businesses(businesses, filters)
-                    if not filtered_businesses:
-                        return {
-                            'success': False,
-                            'message': f'No businesses found matching filter criteria. {filter_summary}',
-                            'created_leads': [],
-                            'filter_summary': filter_summary
-                        }
-                    
-                    # Limit to requested count
-                    businesses = filtered_businesses[:count]
                     logging.info(f"After filtering: {len(businesses)} businesses meet criteria")
-                else:
-                    businesses = businesses[:count]
                 
             except Exception as e:
                 logging.error(f"Google Maps API failed: {e}")
@@ -119,36 +136,24 @@ class LeadCreationAgent:
             personalized_content = {}
             failed_leads = []
             
-            for business in businesses:
-                try:
-                    # Generate personalization content if requested
-                    personalization = None
-                    if generate_personalization and self.personalization_service:
-                        try:
-                            website_content = self.gmaps_service.get_website_content(business)
-                            personalization = self.personalization_service.generate_personalized_email(
-                                business, website_content
-                            )
-                            personalized_content[business.business_name] = personalization
-                        except Exception as e:
-                            logging.warning(f"Personalization failed for {business.business_name}: {e}")
-                    
-                    # Create lead in ERPNext
-                    lead_name = self.erpnext_service.create_lead(business, personalization)
-                    created_leads.append({
-                        'lead_name': lead_name,
-                        'business_name': business.business_name,
-                        'website': business.website,
-                        'industry': business.industry
-                    })
-                
-                except Exception as e:
-                    logging.error(f"Failed to process {business.business_name}: {e}")
-                    failed_leads.append({
-                        'business_name': business.business_name,
-                        'error': str(e)
-                    })
-                    continue
+            # Website fetch, personalization and insert run concurrently per business
+            results = [None] * len(businesses)
+            with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(businesses)))) as executor:
+                futures = {
+                    executor.submit(self._process_one, business, generate_personalization): idx
+                    for idx, business in enumerate(businesses)
+                }
+                for future in as_completed(futures):
+                    results[futures[future]] = future.result()
+            
+            # Collect in search order so the summary is stable
+            for business, (created, failed, personalization) in zip(businesses, results):
+                if personalization:
+                    personalized_content[business.business_name] = personalization
+                if created:
+                    created_leads.append(created)
+                if failed:
+                    failed_leads.append(failed)
             
             success_count = len(created_leads)
             total_found = len(businesses)
@@ -176,24 +181,82 @@ class LeadCreationAgent:
                 'created_leads': []
             }
     
+    def _process_one(self, business, generate_personalization: bool) -> Tuple[Optional[Dict], Optional[Dict], Optional[str]]:
+        """Personalize and create a single lead, returning (created, failed, personalization)"""
+        personalization = None
+        try:
+            # Generate personalization content if requested
+            if generate_personalization and self.personalization_service:
+                try:
+                    website_content = self.gmaps_service.get_website_content(business)
+                    personalization = self.personalization_service.generate_personalized_email(
+                        business, website_content
+                    )
+                except Exception as e:
+                    logging.warning(f"Personalization failed for {business.business_name}: {e}")
+            
+            # Create lead in ERPNext
+            lead_name = self.erpnext_service.create_lead(business, personalization)
+            return {
+                'lead_name': lead_name,
+                'business_name': business.business_name,
+                'website': business.website,
+                'industry': business.industry
+            }, None, personalization
+        
+        except Exception as e:
+            logging.error(f"Failed to process {business.business_name}: {e}")
+            return None, {
+                'business_name': business.business_name,
+                'error': str(e)
+            }, personalization
+    
     def get_lead_summary(self, lead_names: List[str]) -> List[Dict]:
         """Get summary of created leads from ERPNext"""
-        summaries = []
+        if not lead_names:
+            return []
         
+        client = self.erpnext_service.client
+        try:
+            # One query for the whole set instead of a get_doc per lead
+            rows = client.get_list(
+                'Lead',
+                filters={'name': ['in', lead_names]},
+                fields=['name', 'lead_name', 'company_name', 'status', 'source', 'email_id', 'phone', 'website'],
+                limit_page_length=len(lead_names)
+            )
+            leads_by_name = {row['name']: row for row in rows}
+        except Exception as e:
+            logging.warning(f"Bulk lead lookup failed, fetching individually: {e}")
+            leads_by_name = {}
+            
+            def fetch(lead_name):
+                try:
+                    return client.get_doc('Lead', lead_name)
+                except Exception as e:
+                    logging.error(f"Failed to get lead {lead_name}: {e}")
+                    return None
+            
+            with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(lead_names)))) as executor:
+                for lead in executor.map(fetch, lead_names):
+                    if lead:
+                        leads_by_name[lead['name']] = lead
+        
+        summaries = []
         for lead_name in lead_names:
-            try:
-                lead = self.erpnext_service.client.get_doc('Lead', lead_name)
-                summaries.append({
-                    'name': lead['name'],
-                    'lead_name': lead.get('lead_name'),
-                    'company_name': lead.get('company_name'),
-                    'status': lead.get('status'),
-                    'source': lead.get('source'),
-                    'email': lead.get('email_id'),
-                    'phone': lead.get('phone'),
-                    'website': lead.get('website')
-                })
-            except Exception as e:
-                logging.error(f"Failed to get lead {lead_name}: {e}")
+            lead = leads_by_name.get(lead_name)
+            if not lead:
+                logging.error(f"Failed to get lead {lead_name}: not found")
+                continue
+            summaries.append({
+                'name': lead['name'],
+                'lead_name': lead.get('lead_name'),
+                'company_name': lead.get('company_name'),
+                'status': lead.get('status'),
+                'source': lead.get('source'),
+                'email': lead.get('email_id'),
+                'phone': lead.get('phone'),
+                'website': lead.get('website')
+            })
         
         return summaries
@@ -1,39 +1,168 @@
 import os
 import logging
 import json
+import re
+import asyncio
+import heapq
+import time
+import threading
 from typing import List, Dict, Optional
 from datetime import datetime, timedelta
+from operator import itemgetter
+from collections import Counter
 import google.generativeai as genai
 from services.erpnext_service import ERPNextService
 from services.wiki_service import WikiService
 from services.email_service import EmailService
+from services.event_loop import run_coroutine
+from services.http_session import create_http_session
+from services.rate_limiter import TokenBucket
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Below this many leads the plain Python scorer is faster than building arrays
+_VECTORIZE_MIN_LEADS = 500
+
+try:
+    import orjson
+
+    def _dumps(obj) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+except ImportError:
+    def _dumps(obj) -> str:
+        return json.dumps(obj, indent=2)
 
 logger = logging.getLogger(__name__)
 
+# Ask Gemini for raw JSON when generating emails for a batch of leads
+_JSON_GENERATION_CONFIG = {'response_mime_type': 'application/json'}
+
+# SUBJECT:/BODY: sections of a single generated email
+_EMAIL_RE = re.compile(r'^SUBJECT:[ \t]*(?P<subject>[^\n]*).*?^BODY:\s*(?P<body>.*)', re.S | re.M)
+
+# Email prompt split into the static header (company profile + guidelines,
+# formatted once per campaign) and the per-lead trailer
+_PROMPT_HEADER_TEMPLATE = """
+        You are a professional business development representative. Generate a personalized outreach email based on the following information:
+
+        MY COMPANY PROFILE:
+        {company_profile}
+
+        OUTREACH GUIDELINES:
+        {outreach_template}
+"""
+
+_LEAD_PROMPT_TEMPLATE = """
+        LEAD INFORMATION:
+        - Company: {company_name}
+        - Contact: {lead_name}
+        - Email: {email_id}
+        - Industry: {industry}
+        - Company Size: {no_of_employees} employees
+        - Company Description: {company_description}
+
+        Generate a professional email with:
+        1. Personalized subject line
+        2. Email body that's concise, valuable, and relevant
+        3. Clear call-to-action
+        4. Professional tone
+
+        Format your response as:
+        SUBJECT: [subject line]
+        BODY: [email body]
+        """
+
+
+class _LeadFields(dict):
+    """Lead mapping for str.format_map that renders missing fields as N/A"""
+
+    def __missing__(self, key):
+        return 'N/A'
+
+
+# Gemini is configured once per process and the model object is shared by all agents
+_GEMINI_MODEL = None
+_GEMINI_LOCK = threading.Lock()
+
+def _get_gemini_model():
+    """Return the shared Gemini model, configuring the client on first use"""
+    global _GEMINI_MODEL
+    if _GEMINI_MODEL is None:
+        with _GEMINI_LOCK:
+            if _GEMINI_MODEL is None:
+                genai.configure(api_key=os.getenv('GOOGLE_API_KEY'))
+                _GEMINI_MODEL = genai.GenerativeModel('gemini-2.0-flash')
+    return _GEMINI_MODEL
+
+
 class LeadOutreachAgent:
     def __init__(self, url: str, username: str, password: str):
+        # One connection pool shared by the ERPNext and Wiki services
+        self.http_session = create_http_session()
+        
         # Initialize ERPNext service with correct parameters
         self.erpnext_service = ERPNextService(
             url=url,
             username=username,
-            password=password
+            password=password,
+            session=self.http_session
         )
         self.wiki_service = WikiService(
             base_url=url,
             username=username,
-            password=password
+            password=password,
+            session=self.http_session
         )
         self.email_service = EmailService()
         
         # Configure Gemini AI
-        genai.configure(api_key=os.getenv('GOOGLE_API_KEY'))
-        self.model = genai.GenerativeModel('gemini-2.0-flash')
+        self.model = _get_gemini_model()
         
         # Configuration
         self.max_daily_outreach = int(os.getenv('MAX_DAILY_OUTREACH', '50'))
         self.batch_size = int(os.getenv('LEAD_BATCH_SIZE', '10'))
         self.enable_scoring = os.getenv('ENABLE_LEAD_SCORING', 'true').lower() == 'true'
         self.min_score = float(os.getenv('MIN_LEAD_SCORE', '0.6'))
+        self.wiki_cache_ttl = int(os.getenv('WIKI_CACHE_TTL', '900'))
+        self.lead_cache_ttl = int(os.getenv('LEAD_CACHE_TTL', '60'))
+        
+        # Requests per minute shared by Gemini calls and email sends
+        self.outreach_rpm = int(os.getenv('OUTREACH_RPM', '30'))
+        self._limiter = TokenBucket(self.outreach_rpm, 60)
+        
+        # Wiki content cache: key -> (fetched_at, value)
+        self._wiki_cache = {}
+        # Fallback lead list cache: (fetched_at, leads)
+        self._leads_cache = None
+        self._fallback_client = None
+        # Formatted prompt header: ((company_profile, outreach_template), prefix)
+        self._prefix_cache = None
+    
+    def _get_wiki_cached(self, key: str, fetch) -> str:
+        """Return cached wiki content, refetching once the TTL has expired"""
+        cached = self._wiki_cache.get(key)
+        now = time.monotonic()
+        if cached and now - cached[0] < self.wiki_cache_ttl:
+            return cached[1]
+        
+        value = fetch()
+        self._wiki_cache[key] = (now, value)
+        return value
+    
+    def get_company_profile(self) -> str:
+        """Company profile from the wiki, cached for wiki_cache_ttl seconds"""
+        return self._get_wiki_cached('company_profile', self.wiki_service.get_company_profile)
+    
+    def get_outreach_template(self) -> str:
+        """Outreach template from the wiki, cached for wiki_cache_ttl seconds"""
+        return self._get_wiki_cached('outreach_template', self.wiki_service.get_outreach_template)
+    
+    def invalidate_wiki_cache(self):
+        """Drop cached wiki content so the next campaign refetches it"""
+        self._wiki_cache.clear()
     
     def get_leads_for_outreach(self, limit: int = None, filters: Dict = None) -> List[Dict]:
         """Get leads that are ready for outreach with enhanced filtering"""
@@ -41,37 +170,83 @@ class LeadOutreachAgent:
             limit = self.max_daily_outreach
         
         try:
-            # Use the available method from ERPNext service
-            if hasattr(self.erpnext_service, 'get_leads_for_campaign'):
-                all_leads = self.erpnext_service.get_leads_for_campaign()
-            else:
-                # Use fallback method with corrected field names
-                all_leads = self._get_leads_fallback()
+            all_leads = self._get_all_leads()
+            
+            # Normalize filters once instead of per lead
+            filters = filters or {}
+            industry_filter = filters['industry'].casefold() if filters.get('industry') else None
+            min_employees = filters.get('min_employees')
+            max_employees = filters.get('max_employees')
             
-            # Apply filtering
-            filtered_leads = []
+            # Single pass over the raw leads for the cheap exclusions
+            candidates = []
+            emp_counts = []
             for lead in all_leads:
-                if self._should_include_lead(lead, filters):
-                    filtered_leads.append(lead)
+                if not lead.get('email_id'):
+                    continue
+                if industry_filter and industry_filter not in (lead.get('industry') or '').casefold():
+                    continue
+                
+                emp_count = self._employee_count(lead)
+                if min_employees is not None and emp_count < min_employees:
+                    continue
+                if max_employees is not None and emp_count > max_employees:
+                    continue
+                
+                candidates.append(lead)
+                emp_counts.append(emp_count)
             
-            if self.enable_scoring:
-                filtered_leads = self._score_and_filter_leads(filtered_leads)
+            if not self.enable_scoring:
+                return candidates[:limit]
             
-            return filtered_leads[:limit]
+            selected = []
+            for lead, score in zip(candidates, self._score_leads(candidates, emp_counts)):
+                lead['lead_score'] = score
+                if score >= self.min_score:
+                    selected.append(lead)
+            
+            # Top-k by score without sorting every candidate
+            return heapq.nlargest(limit, selected, key=itemgetter('lead_score'))
         except Exception as e:
             logger.error(f"Error fetching leads: {str(e)}")
             return []
     
-    def _get_leads_fallback(self) -> List[Dict]:
-        """Fallback method to get leads directly from Frappe with correct field names"""
-        try:
-            # Use the frappe client directly to get leads
+    def _get_all_leads(self) -> List[Dict]:
+        """Get all candidate leads, reusing recent results within lead_cache_ttl"""
+        # Use the available method from ERPNext service (cached there)
+        if hasattr(self.erpnext_service, 'get_leads_for_campaign'):
+            return self.erpnext_service.get_leads_for_campaign()
+        
+        # Use fallback method with corrected field names
+        now = time.monotonic()
+        if self._leads_cache and now - self._leads_cache[0] < self.lead_cache_ttl:
+            return self._leads_cache[1]
+        
+        leads = self._get_leads_fallback()
+        self._leads_cache = (now, leads)
+        return leads
+
+    def invalidate_lead_cache(self):
+        """Drop cached leads so the next lookup goes to ERPNext"""
+        self._leads_cache = None
+        self.erpnext_service.invalidate_cache()
+    
+    def _client(self):
+        """Lazily log in the direct Frappe client once and reuse it"""
+        if self._fallback_client is None:
             from frappeclient import FrappeClient
-            client = FrappeClient(
+            self._fallback_client = FrappeClient(
                 os.getenv('ERPNEXT_URL'),
                 os.getenv('ERPNEXT_USERNAME'),
                 os.getenv('ERPNEXT_PASSWORD')
             )
+        return self._fallback_client
+    
+    def _get_leads_fallback(self) -> List[Dict]:
+        """Fallback method to get leads directly from Frappe with correct field names"""
+        try:
+            # Use the frappe client directly to get leads
+            client = self._client()
             
             # Get leads using only permitted fields
             leads = client.get_list('Lead', fields=[
@@ -84,75 +259,131 @@ class LeadOutreachAgent:
             logger.error(f"Fallback lead fetch failed: {str(e)}")
             return []
 
-    def _should_include_lead(self, lead: Dict, filters: Dict = None) -> bool:
-        """Check if lead should be included based on filters"""
-        # Basic validation
-        if not lead.get('email_id'):
-            return False
+    def _employee_count(self, lead: Dict) -> int:
+        """Parse no_of_employees, treating missing or non-numeric values as 0"""
+        try:
+            return int(lead.get('no_of_employees') or 0)
+        except (TypeError, ValueError):
+            return 0
+    
+    def _score_leads(self, leads: List[Dict], emp_counts: List[int]) -> List[float]:
+        """Score a batch of leads, vectorized with numpy for large batches when available"""
+        if np is None or len(leads) < _VECTORIZE_MIN_LEADS:
+            return [self._score_lead(lead, emp_count) for lead, emp_count in zip(leads, emp_counts)]
         
-        # Apply custom filters
-        if filters:
-            if 'industry' in filters:
-                lead_industry = lead.get('industry', '').lower()
-                if filters['industry'].lower() not in lead_industry:
-                    return False
-            
-            if 'min_employees' in filters:
-                emp_count = int(lead.get('no_of_employees', 0) or 0)
-                if emp_count < filters['min_employees']:
-                    return False
-            
-            if 'max_employees' in filters:
-                emp_count = int(lead.get('no_of_employees', 0) or 0)
-                if emp_count > filters['max_employees']:
-                    return False
+        n = len(leads)
+        emp = np.fromiter(emp_counts, dtype=np.int64, count=n)
+        has_industry = np.fromiter((bool(lead.get('industry')) for lead in leads), dtype=bool, count=n)
+        has_description = np.fromiter((bool(lead.get('company_description')) for lead in leads), dtype=bool, count=n)
+        sources = np.array([(lead.get('source') or '').casefold() for lead in leads], dtype=str)
         
-        return True
+        # Same terms, added in the same order, as _score_lead
+        score = np.select([emp > 100, emp > 50, emp > 10], [0.3, 0.2, 0.1], 0.0)
+        score += np.where(has_industry, 0.2, 0.0)
+        quality_source = (np.char.find(sources, 'website') >= 0) | (np.char.find(sources, 'referral') >= 0)
+        email_source = np.char.find(sources, 'email') >= 0
+        score += np.where(quality_source, 0.3, np.where(email_source, 0.2, 0.0))
+        score += np.where(has_description, 0.2, 0.0)
+        return score.tolist()
     
-    def _score_and_filter_leads(self, leads: List[Dict]) -> List[Dict]:
-        """Score leads based on various criteria"""
-        scored_leads = []
+    def _score_lead(self, lead: Dict, emp_count: int) -> float:
+        """Score a lead based on various criteria"""
+        score = 0.0
         
-        for lead in leads:
-            score = 0.0
-            
-            # Score based on company size
-            if lead.get('no_of_employees'):
-                emp_count = int(lead.get('no_of_employees', 0))
-                if emp_count > 100:
-                    score += 0.3
-                elif emp_count > 50:
-                    score += 0.2
-                elif emp_count > 10:
-                    score += 0.1
-            
-            # Score based on industry match (if available)
-            if lead.get('industry'):
-                score += 0.2
-            
-            # Score based on lead source quality
-            lead_source = lead.get('source', '').lower()
-            if 'website' in lead_source or 'referral' in lead_source:
-                score += 0.3
-            elif 'email' in lead_source:
-                score += 0.2
-            
-            # Score based on company description availability
-            if lead.get('company_description'):
-                score += 0.2
-            
-            lead['lead_score'] = score
-            
-            if score >= self.min_score:
-                scored_leads.append(lead)
+        # Score based on company size
+        if emp_count > 100:
+            score += 0.3
+        elif emp_count > 50:
+            score += 0.2
+        elif emp_count > 10:
+            score += 0.1
+        
+        # Score based on industry match (if available)
+        if lead.get('industry'):
+            score += 0.2
+        
+        # Score based on lead source quality
+        lead_source = (lead.get('source') or '').casefold()
+        if 'website' in lead_source or 'referral' in lead_source:
+            score += 0.3
+        elif 'email' in lead_source:
+            score += 0.2
+        
+        # Score based on company description availability
+        if lead.get('company_description'):
+            score += 0.2
         
-        # Sort by score descending
-        return sorted(scored_leads, key=lambda x: x['lead_score'], reverse=True)
+        return score
     
+    def _prompt_prefix(self, company_profile: str, outreach_template: str) -> str:
+        """Static prompt header, rebuilt only when the profile or template changes"""
+        key = (company_profile, outreach_template)
+        if self._prefix_cache is None or self._prefix_cache[0] != key:
+            self._prefix_cache = (key, _PROMPT_HEADER_TEMPLATE.format(
+                company_profile=company_profile,
+                outreach_template=outreach_template
+            ))
+        return self._prefix_cache[1]
+
+    def _build_email_prompt(self, lead: Dict, company_profile: str, outreach_template: str) -> str:
+        """Build the email generation prompt for a single lead"""
+        return self._prompt_prefix(company_profile, outreach_template) + _LEAD_PROMPT_TEMPLATE.format_map(_LeadFields(lead))
+
+    def _parse_email_content(self, email_content: str) -> Dict[str, str]:
+        """Parse SUBJECT/BODY sections out of the model response"""
+        m = _EMAIL_RE.search(email_content)
+        return {
+            'subject': m.group('subject').strip() if m else '',
+            'body': m.group('body').strip() if m else ''
+        }
+
+    def _fallback_email(self, lead: Dict) -> Dict[str, str]:
+        """Default email used when generation fails"""
+        return {
+            'subject': f"Partnership Opportunity with {lead.get('company_name', 'Your Company')}",
+            'body': "I hope this email finds you well. I'd love to discuss a potential partnership opportunity that could benefit both our companies. Would you be available for a brief call this week?"
+        }
+
     def generate_personalized_email(self, lead: Dict, company_profile: str, outreach_template: str) -> Dict[str, str]:
         """Generate personalized email content using AI"""
-        prompt = f"""
-        You are a professional business development representative. Generate a personalized outreach email based on the following information:
+        prompt = self._build_email_prompt(lead, company_profile, outreach_template)
+        
+        try:
+            self._limiter.wait()
+            response = self.model.generate_content(prompt)
+            return self._parse_email_content(response.text)
+        except Exception as e:
+            logger.error(f"Error generating email content: {str(e)}")
+            return self._fallback_email(lead)
+
+    async def generate_personalized_email_async(self, lead: Dict, company_profile: str, outreach_template: str) -> Dict[str, str]:
+        """Async variant of generate_personalized_email"""
+        prompt = self._build_email_prompt(lead, company_profile, outreach_template)
+        
+        try:
+            async with self._limiter:
+                response = await self.model.generate_content_async(prompt)
+            return self._parse_email_content(response.text)
+        except Exception as e:
+            logger.error(f"Error generating email content: {str(e)}")
+            return self._fallback_email(lead)
+    
+    def _build_batch_prompt(self, leads: List[Dict], company_profile: str, outreach_template: str) -> str:
+        """Build one prompt covering a whole batch of leads"""
+        lead_lines = []
+        for idx, lead in enumerate(leads):
+            lead_lines.append(json.dumps({
+                'idx': idx,
+                'company': lead.get('company_name', 'N/A'),
+                'contact': lead.get('lead_name', 'N/A'),
+                'industry': lead.get('industry', 'N/A'),
+                'company_size': lead.get('no_of_employees', 'N/A'),
+                'company_description': lead.get('company_description', 'N/A')
+            }))
+        leads_block = '\n'.join(lead_lines)
+        
+        return f"""
+        You are a professional business development representative. Generate one personalized outreach email for each lead listed below.
 
         MY COMPANY PROFILE:
         {company_profile}
@@ -160,51 +391,75 @@ class LeadOutreachAgent:
         OUTREACH GUIDELINES:
         {outreach_template}
 
-        LEAD INFORMATION:
-        - Company: {lead.get('company_name', 'N/A')}
-        - Contact: {lead.get('lead_name', 'N/A')}
-        - Email: {lead.get('email_id', 'N/A')}
-        - Industry: {lead.get('industry', 'N/A')}
-        - Company Size: {lead.get('no_of_employees', 'N/A')} employees
-        - Company Description: {lead.get('company_description', 'N/A')}
+        LEADS (one JSON object per line):
+        {leads_block}
 
-        Generate a professional email with:
-        1. Personalized subject line
-        2. Email body that's concise, valuable, and relevant
-        3. Clear call-to-action
-        4. Professional tone
+        Each email needs a personalized subject line, a concise and relevant body, a clear call-to-action and a professional tone.
 
-        Format your response as:
-        SUBJECT: [subject line]
-        BODY: [email body]
+        Respond with a JSON array only, one entry per lead:
+        [{{"idx": <lead idx>, "subject": "<subject line>", "body": "<email body>"}}]
         """
+
+    def _parse_batch_response(self, text: str, count: int) -> Dict[int, Dict[str, str]]:
+        """Map lead index to generated email from a batch JSON response"""
+        emails = {}
+        try:
+            entries = json.loads(text)
+        except (TypeError, ValueError) as e:
+            logger.error(f"Could not parse batch email response: {str(e)}")
+            return emails
+        
+        for entry in entries if isinstance(entries, list) else []:
+            if not isinstance(entry, dict):
+                continue
+            idx = entry.get('idx')
+            if isinstance(idx, int) and 0 <= idx < count and entry.get('subject') and entry.get('body'):
+                emails[idx] = {'subject': entry['subject'], 'body': entry['body']}
+        return emails
+
+    def generate_personalized_emails_batch(self, leads: List[Dict], company_profile: str, outreach_template: str) -> List[Dict[str, str]]:
+        """Generate emails for several leads with a single model request"""
+        if not leads:
+            return []
+        prompt = self._build_batch_prompt(leads, company_profile, outreach_template)
         
         try:
-            response = self.model.generate_content(prompt)
-            email_content = response.text
-            
-            # Parse subject and body
-            lines = email_content.split('\n')
-            subject = ""
-            body = ""
-            
-            for i, line in enumerate(lines):
-                if line.startswith('SUBJECT:'):
-                    subject = line.replace('SUBJECT:', '').strip()
-                elif line.startswith('BODY:'):
-                    body = '\n'.join(lines[i:]).replace('BODY:', '').strip()
-                    break
-            
-            return {
-                'subject': subject,
-                'body': body
-            }
+            self._limiter.wait()
+            response = self.model.generate_content(prompt, generation_config=_JSON_GENERATION_CONFIG)
+            emails = self._parse_batch_response(response.text, len(leads))
         except Exception as e:
-            logger.error(f"Error generating email content: {str(e)}")
-            return {
-                'subject': f"Partnership Opportunity with {lead.get('company_name', 'Your Company')}",
-                'body': "I hope this email finds you well. I'd love to discuss a potential partnership opportunity that could benefit both our companies. Would you be available for a brief call this week?"
-            }
+            logger.error(f"Error generating batch email content: {str(e)}")
+            emails = {}
+        
+        return [
+            emails[idx] if idx in emails else self.generate_personalized_email(lead, company_profile, outreach_template)
+            for idx, lead in enumerate(leads)
+        ]
+
+    async def generate_personalized_emails_batch_async(self, leads: List[Dict], company_profile: str, outreach_template: str) -> List[Dict[str, str]]:
+        """Async variant of generate_personalized_emails_batch"""
+        if not leads:
+            return []
+        prompt = self._build_batch_prompt(leads, company_profile, outreach_template)
+        
+        try:
+            async with self._limiter:
+                response = await self.model.generate_content_async(prompt, generation_config=_JSON_GENERATION_CONFIG)
+            emails = self._parse_batch_response(response.text, len(leads))
+        except Exception as e:
+            logger.error(f"Error generating batch email content: {str(e)}")
+            emails = {}
+        
+        # Leads the batch response skipped are generated individually
+        missing = [idx for idx in range(len(leads)) if idx not in emails]
+        if missing:
+            retried = await asyncio.gather(*[
+                self.generate_personalized_email_async(leads[idx], company_profile, outreach_template)
+                for idx in missing
+            ])
+            emails.update(zip(missing, retried))
+        
+        return [emails[idx] for idx in range(len(leads))]
     
     def send_outreach_email(self, lead: Dict, email_content: Dict[str, str]) -> bool:
         """Send outreach email to a lead"""
@@ -241,8 +496,8 @@ class LeadOutreachAgent:
         
         try:
             # Get company knowledge
-            company_profile = self.wiki_service.get_company_profile()
-            outreach_template = self.wiki_service.get_outreach_template()
+            company_profile = self.get_company_profile()
+            outreach_template = self.get_outreach_template()
             
             # Get leads for outreach
             leads = self.get_leads_for_outreach(limit=target_count, filters=filters)
@@ -255,30 +510,9 @@ class LeadOutreachAgent:
                 'campaign_start': datetime.now().isoformat()
             }
             
-            # Process leads in batches
-            for i in range(0, len(leads), self.batch_size):
-                batch = leads[i:i + self.batch_size]
-                
-                for lead in batch:
-                    try:
-                        # Generate personalized email
-                        email_content = self.generate_personalized_email(
-                            lead, company_profile, outreach_template
-                        )
-                        
-                        # Send email
-                        if self.send_outreach_email(lead, email_content):
-                            stats['emails_sent'] += 1
-                        else:
-                            stats['emails_failed'] += 1
-                        
-                        # Small delay between emails
-                        import time
-                        time.sleep(2)
-                        
-                    except Exception as e:
-                        logger.error(f"Error processing lead {lead.get('name', 'Unknown')}: {str(e)}")
-                        stats['emails_failed'] += 1
+            # One generation request per batch, batches and sends run concurrently. Campaigns share
+            # one long-lived loop: the shared Gemini model's async client is bound to its first loop
+            run_coroutine(self._run_campaign_async(leads, company_profile, outreach_template, stats))
             
             stats['campaign_end'] = datetime.now().isoformat()
             logger.info(f"Targeted outreach campaign completed. Stats: {stats}")
@@ -292,33 +526,71 @@ class LeadOutreachAgent:
                 'emails_failed': 0
             }
     
+    async def _send_lead_email(self, lead: Dict, email_content: Dict[str, str],
+                               sem: asyncio.Semaphore, stats: Dict) -> None:
+        """Send a generated outreach email and record the result"""
+        async with sem:
+            try:
+                # Email sending is blocking I/O, keep it off the event loop
+                async with self._limiter:
+                    sent = await asyncio.to_thread(self.send_outreach_email, lead, email_content)
+                
+                if sent:
+                    stats['emails_sent'] += 1
+                else:
+                    stats['emails_failed'] += 1
+                    
+            except Exception as e:
+                logger.error(f"Error processing lead {lead.get('name', 'Unknown')}: {str(e)}")
+                stats['emails_failed'] += 1
+
+    async def _process_batch(self, batch: List[Dict], company_profile: str, outreach_template: str,
+                             sem: asyncio.Semaphore, stats: Dict) -> None:
+        """Generate a batch of emails in one request, then send them"""
+        async with sem:
+            emails = await self.generate_personalized_emails_batch_async(
+                batch, company_profile, outreach_template
+            )
+        
+        await asyncio.gather(*[
+            self._send_lead_email(lead, email_content, sem, stats)
+            for lead, email_content in zip(batch, emails)
+        ])
+
+    async def _run_campaign_async(self, leads: List[Dict], company_profile: str,
+                                  outreach_template: str, stats: Dict) -> None:
+        """Fan out email generation and sending with bounded concurrency"""
+        batch_size = max(1, self.batch_size)
+        sem = asyncio.Semaphore(batch_size)
+        await asyncio.gather(*[
+            self._process_batch(leads[i:i + batch_size], company_profile, outreach_template, sem, stats)
+            for i in range(0, len(leads), batch_size)
+        ])
+    
     def get_campaign_stats(self, days: int = 7) -> Dict:
         """Get campaign statistics for the last N days"""
         try:
-            # Use the available method from ERPNext service
-            if hasattr(self.erpnext_service, 'get_leads_for_campaign'):
-                all_leads = self.erpnext_service.get_leads_for_campaign()
-            else:
-                # Use fallback method
-                all_leads = self._get_leads_fallback()
+            all_leads = self._get_all_leads()
+            
+            # Aggregate by industry and status (since source field isn't permitted)
+            by_industry = Counter()
+            by_status = Counter()
+            with_email = 0
+            for lead in all_leads:
+                if lead.get('email_id'):
+                    with_email += 1
+                by_industry[lead.get('industry', 'Unknown')] += 1
+                by_status[lead.get('status', 'Unknown')] += 1
             
             stats = {
                 'period_days': days,
                 'total_leads_in_system': len(all_leads),
-                'leads_with_email': len([l for l in all_leads if l.get('email_id')]),
-                'by_industry': {},
-                'by_status': {},
+                'leads_with_email': with_email,
+                'by_industry': dict(by_industry),
+                'by_status': dict(by_status),
                 'response_rate': 0.0  # This would need tracking
             }
             
-            # Aggregate by industry and status (since source field isn't permitted)
-            for lead in all_leads:
-                industry = lead.get('industry', 'Unknown')
-                status = lead.get('status', 'Unknown')
-                
-                stats['by_industry'][industry] = stats['by_industry'].get(industry, 0) + 1
-                stats['by_status'][status] = stats['by_status'].get(status, 0) + 1
-            
             return stats
             
         except Exception as e:
@@ -342,7 +614,7 @@ if __name__ == "__main__":
     
     if args.stats:
         stats = agent.get_campaign_stats()
-        print(json.dumps(stats, indent=2))
+        print(_dumps(stats))
     elif args.dry_run:
         filters = {}
         if args.industry:
@@ -351,8 +623,8 @@ if __name__ == "__main__":
             filters['min_employees'] = args.min_employees
             
         leads = agent.get_leads_for_outreach(limit=args.count, filters=filters)
-        company_profile = agent.wiki_service.get_company_profile()
-        outreach_template = agent.wiki_service.get_outreach_template()
+        company_profile = agent.get_company_profile()
+        outreach_template = agent.get_outreach_template()
         
         for lead in leads[:3]:  # Show first 3 as examples
             email_content = agent.generate_personalized_email(
@@ -369,4 +641,4 @@ if __name__ == "__main__":
             filters['min_employees'] = args.min_employees
             
         stats = agent.run_targeted_campaign(target_count=args.count, filters=filters)
-        print(f"Campaign Results: {json.dumps(stats, indent=2)}")
\ No newline at end of file
+        print(f"Campaign Results: {_dumps(stats)}")
\ No newline at end of file
@@ -1,20 +1,327 @@
 import os
 import json
 import logging
-import os
 import re
-from typing import List, Dict, Optional, Any
+import time
+import asyncio
+import hashlib
+import threading
+import weakref
+from html import escape
+from string import Formatter
+from functools import lru_cache
+from collections import Counter, defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Dict, Optional, Any, Callable
 from datetime import datetime, timedelta
-from frappeclient import FrappeClient
-import google.generativeai as genai
 from langchain.agents import Tool, AgentExecutor, create_react_agent
 from langchain.prompts import PromptTemplate
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.schema import BaseOutputParser
 from agents.lead_creation_agent import LeadCreationAgent
 from agents.lead_outreach_agent import LeadOutreachAgent
+from services.rate_limiter import TokenBucket
+from services.event_loop import run_coroutine
+from services.frappe_async import AsyncFrappeClient, create_frappe_client
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Below this many leads a plain Python loop is faster than building arrays
+_VECTORIZE_MIN_LEADS = 500
+
+try:
+    import orjson
+    
+    _loads = orjson.loads
+    
+    def _dumps(obj, indent: bool = False) -> str:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, option=option).decode()
+except ImportError:
+    _loads = json.loads
+    
+    def _dumps(obj, indent: bool = False) -> str:
+        if indent:
+            return json.dumps(obj, indent=2)
+        return json.dumps(obj, separators=(',', ':'))
 
 logger = logging.getLogger(__name__)
+# Progress logger for agents built with verbose=True; only this child is set to DEBUG,
+# so other agents and modules keep their configured level
+verbose_logger = logger.getChild('verbose')
+verbose_logger.setLevel(logging.DEBUG)
+
+SEND_EMAIL_METHOD = "frappe.core.doctype.communication.email.make"
+
+# Static prompt text lives at module level and always comes before the
+# per-request parts, so Gemini's implicit prefix caching can reuse it.
+REACT_PROMPT_TEMPLATE = """
+You are an intelligent CRM agent that helps with lead generation and outreach campaigns.
+
+You have access to the following tools:
+
+{tools}
+
+Use the following format:
+
+Question: the input question you must answer
+Thought: you should always think about what to do
+Action: the action to take, should be one of [{tool_names}]
+Action Input: the input to the action
+Observation: the result of the action
+... (this Thought/Action/Action Input/Observation can repeat N times)
+Thought: I now know the final answer
+Final Answer: the final answer to the original input question
+
+When a user makes a request:
+1. First analyze the query to understand the intent
+2. Based on the intent, use the appropriate tools
+3. For lead generation: use create_leads tool
+4. For outreach: get company description, get leads with filters, generate emails, and send them
+5. For stats: use get_campaign_stats
+6. When several actions do not depend on each other's results, run them together with the batch tool
+
+Always provide detailed progress updates and show email content for outreach campaigns.
+
+Question: {input}
+{agent_scratchpad}"""
+
+ANALYSIS_PROMPT_PREFIX = """
+        Analyze the user query at the end of this prompt and extract the intent and parameters.
+        
+        Extract specific parameters:
+        - Count: any numbers mentioned (default to 10 if none found)
+        - Status: words like "open", "interested", "qualified", "lead", "replied", "opportunity", "quotation", "lost"
+        - Industry: business types like "software", "marketing", "healthcare", "finance", "tech"
+        - Time: words like "recent", "last X days", "new"
+        
+        Return as JSON (use null for missing values, not "None"):
+        {
+            "intent": "lead_generation|outreach|stats",
+            "parameters": {
+                "count": 10,
+                "business_type": null,
+                "location": null,
+                "filters": {
+                    "industry": null,
+                    "status": null,
+                    "size": null,
+                    "recent": null
+                }
+            }
+        }
+"""
+
+_COUNT_RE = re.compile(r'(\d+)')
+_LOCATION_RE = re.compile(r'in\s+([^,\n]+)', re.IGNORECASE)
+
+# Keyword -> business type, checked in priority order
+_BUSINESS_TYPES = {
+    'startup': 'startup',
+    'software': 'software company',
+    'marketing': 'marketing agency',
+    'healthcare': 'healthcare company',
+    'tech': 'tech company',
+}
+
+# Keyword -> business type searched by direct lead creation, checked in order
+_DIRECT_BUSINESS_TYPES = (
+    ('software', 'software companies'),
+    ('marketing', 'marketing agencies'),
+    ('healthcare', 'healthcare companies'),
+)
+
+# Comments read per lead for research notes. FrappeClient.get_list sends no limit when the
+# page length is 0, so the server's default of 20 rows would apply to the whole query.
+_RESEARCH_COMMENTS_PER_LEAD = 20
+
+# Verbs that, next to "lead", send a query straight to lead creation without an LLM call.
+# Matched as substrings so "creating" or "generated" still count.
+_LEAD_TRIGGERS = frozenset(('create', 'generate', 'find'))
+
+# Keyword sets for the fallback intent parser, checked in order
+_INTENT_KEYWORDS = (
+    ('lead_generation', ('lead', 'create', 'generate', 'find')),
+    ('outreach', ('outreach', 'email', 'campaign', 'contact')),
+    ('stats', ('stats', 'status', 'report')),
+)
+
+# Clients and sub-agents shared by UnifiedAgent instances with the same credentials.
+# Weak values, so entries disappear once no agent references them.
+_SHARED = weakref.WeakValueDictionary()
+_SHARED_LOCK = threading.Lock()
+# Objects still being built, by key: later callers wait on the Future instead of building again
+_BUILDING = {}
+_LLMS = {}
+
+@lru_cache(maxsize=None)
+def _env_settings() -> Dict[str, Any]:
+    """Read API keys and agent tuning from the environment once, on first use
+    
+    Deferred until the first agent is built so callers can load a .env file after import.
+    """
+    return {
+        'google_api_key': os.getenv('GOOGLE_API_KEY'),
+        'gmaps_api_key': os.getenv('GMAPS_API_KEY'),
+        'no_email_policy': os.getenv('NO_EMAIL_LEAD_POLICY', 'skip'),
+        'llm_retries': max(1, int(os.getenv('LLM_RETRIES', '3'))),
+        'llm_retry_max_delay': float(os.getenv('LLM_RETRY_MAX_DELAY', '10')),
+        'campaign_call_timeout': float(os.getenv('CAMPAIGN_CALL_TIMEOUT', '60')),
+        'outreach_concurrency': int(os.getenv('OUTREACH_CONCURRENCY', '10')),
+        'outreach_rpm': int(os.getenv('OUTREACH_RPM', '30')),
+        'analysis_cache_ttl': int(os.getenv('ANALYSIS_CACHE_TTL', '3600')),
+        'analysis_cache_size': int(os.getenv('ANALYSIS_CACHE_SIZE', '512')),
+        'lead_cache_ttl': int(os.getenv('LEAD_CACHE_TTL', '60')),
+        'research_workers': int(os.getenv('LEAD_RESEARCH_WORKERS', '16')),
+        'research_cache_ttl': int(os.getenv('LEAD_RESEARCH_CACHE_TTL', '300')),
+        'email_cache_ttl': int(os.getenv('EMAIL_CACHE_TTL', '86400')),
+        'email_concurrency': int(os.getenv('EMAIL_GENERATION_CONCURRENCY', '8')),
+        'email_model': os.getenv('EMAIL_MODEL', 'gemini-2.0-flash-lite'),
+        'email_max_output_tokens': int(os.getenv('EMAIL_MAX_OUTPUT_TOKENS', '320')),
+    }
+
+def _get_llm(model: str = "gemini-2.0-flash", temperature: float = 0.7,
+             max_output_tokens: Optional[int] = None) -> ChatGoogleGenerativeAI:
+    """Return the shared LangChain Gemini LLM for these settings, creating it on first use"""
+    key = (model, temperature, max_output_tokens)
+    llm = _LLMS.get(key)
+    if llm is None:
+        with _SHARED_LOCK:
+            llm = _LLMS.get(key)
+            if llm is None:
+                options = {'max_output_tokens': max_output_tokens} if max_output_tokens else {}
+                llm = _LLMS[key] = ChatGoogleGenerativeAI(
+                    model=model,
+                    google_api_key=_env_settings()['google_api_key'],
+                    temperature=temperature,
+                    **options
+                )
+    return llm
+
+def _get_shared(kind: str, credentials: tuple, factory: Callable[[], Any]) -> Any:
+    """Return the shared object of this kind for the credentials, building it once
+    
+    The factory runs outside _SHARED_LOCK, so a slow build only holds up callers
+    waiting for the same key.
+    """
+    key = (kind,) + credentials
+    with _SHARED_LOCK:
+        obj = _SHARED.get(key)
+        if obj is not None:
+            return obj
+        future = _BUILDING.get(key)
+        building = future is None
+        if building:
+            future = _BUILDING[key] = Future()
+    if not building:
+        return future.result()
+    
+    try:
+        obj = factory()
+    except BaseException as e:
+        with _SHARED_LOCK:
+            del _BUILDING[key]
+        future.set_exception(e)
+        raise
+    with _SHARED_LOCK:
+        _SHARED[key] = obj
+        del _BUILDING[key]
+    future.set_result(obj)
+    return obj
+
+def _extract_json(text: str, opener: str = '{', closer: str = '}') -> Optional[str]:
+    """Return the first balanced JSON object (or array) in text, skipping brackets inside strings
+    
+    A single forward scan, so there is no regex backtracking and no trailing text after the
+    closing bracket.
+    """
+    start = text.find(opener)
+    if start < 0:
+        return None
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        char = text[i]
+        if escaped:
+            escaped = False
+        elif char == '\\':
+            escaped = in_string
+        elif char == '"':
+            in_string = not in_string
+        elif in_string:
+            continue
+        elif char == opener:
+            depth += 1
+        elif char == closer:
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return None
+
+def _compile_template(text: str) -> Callable[[Dict[str, Any]], str]:
+    """Pre-parse a str.format template into a renderer taking the template variables"""
+    pieces = list(Formatter().parse(text))
+    if any(field is not None and (not field.isidentifier() or conversion)
+           for _, field, _, conversion in pieces):
+        # Indexing, attribute access or conversions: leave it to str.format
+        return lambda template_vars: text.format(**template_vars)
+    
+    def render(template_vars: Dict[str, Any]) -> str:
+        parts = []
+        for literal, field, spec, _ in pieces:
+            parts.append(literal)
+            if field is not None:
+                parts.append(format(template_vars[field], spec))
+        return ''.join(parts)
+    return render
+
+def _count_created_since(leads: List[Dict], cutoff_day: str) -> int:
+    """Count leads created on or after cutoff_day (YYYY-MM-DD), vectorized for large lists"""
+    days = [str(lead.get('creation') or '')[:10] for lead in leads]
+    if np is not None and len(days) >= _VECTORIZE_MIN_LEADS:
+        try:
+            parsed = np.array([day or 'NaT' for day in days], dtype='datetime64[D]')
+            return int((parsed >= np.datetime64(cutoff_day)).sum())
+        except ValueError:
+            pass  # Unparseable dates: fall back to the string comparison
+    # ISO dates sort lexicographically, so no parsing is needed
+    return sum(1 for day in days if day and day >= cutoff_day)
+
+def _recent_cutoff(days) -> str:
+    """Creation timestamp cutoff for a 'last N days' filter, formatted like Frappe timestamps"""
+    return (datetime.now() - timedelta(days=int(days))).strftime('%Y-%m-%d %H:%M:%S')
+
+@lru_cache(maxsize=1024)
+def _extract_params(text: str) -> Dict:
+    """Extract lead creation parameters from plain text; memoized, callers get a copy"""
+    params = {
+        'business_type': 'company',
+        'location': 'USA',
+        'count': 5
+    }
+    
+    # Extract count
+    count_match = _COUNT_RE.search(text)
+    if count_match:
+        params['count'] = int(count_match.group(1))
+    
+    # Extract business type
+    text_lower = text.lower()
+    for keyword, business_type in _BUSINESS_TYPES.items():
+        if keyword in text_lower:
+            params['business_type'] = business_type
+            break
+    
+    # Extract location
+    location_match = _LOCATION_RE.search(text)
+    if location_match:
+        params['location'] = location_match.group(1).strip()
+    
+    return params
 
 class QueryTypeParser(BaseOutputParser):
     """Parse the query to determine intent and extract parameters"""
@@ -22,12 +329,10 @@ class QueryTypeParser(BaseOutputParser):
     def parse(self, text: str) -> Dict[str, Any]:
         """Parse the LLM output to extract structured data"""
         try:
-            # Look for JSON in the response
-            import json
             # Try to find JSON block in the response
-            json_match = re.search(r'\{.*\}', text, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group())
+            json_text = _extract_json(text)
+            if json_text:
+                return _loads(json_text)
             
             # Fallback parsing
             result = {
@@ -35,12 +340,11 @@ class QueryTypeParser(BaseOutputParser):
                 "parameters": {}
             }
             
-            if any(word in text.lower() for word in ['lead', 'create', 'generate', 'find']):
-                result["intent"] = "lead_generation"
-            elif any(word in text.lower() for word in ['outreach', 'email', 'campaign', 'contact']):
-                result["intent"] = "outreach"
-            elif any(word in text.lower() for word in ['stats', 'status', 'report']):
-                result["intent"] = "stats"
+            text_lower = text.lower()
+            for intent, keywords in _INTENT_KEYWORDS:
+                if any(word in text_lower for word in keywords):
+                    result["intent"] = intent
+                    break
             
             return result
         except Exception as e:
@@ -50,14 +354,33 @@ class QueryTypeParser(BaseOutputParser):
 class UnifiedAgent:
     def __init__(self, erpnext_url: str, erpnext_username: str, erpnext_password: str, 
                  company_profile: Optional[Dict[str, Any]] = None, 
-                 email_templates: Optional[List[Dict[str, Any]]] = None):
-        """Initialize the agent with dynamic ERPNext credentials and company configuration."""
-        # Initialize Frappe client
-        self.client = FrappeClient(
+                 email_templates: Optional[List[Dict[str, Any]]] = None,
+                 interactive: bool = False,
+                 on_decision: Optional[Callable[[List[str], Dict[str, Any]], str]] = None,
+                 verbose: bool = False):
+        """Initialize the agent with dynamic ERPNext credentials and company configuration.
+        
+        When leads match a campaign but none have an email address, on_decision is called
+        with the options and context and returns 'skip', 'include' or 'cancel'. Without a
+        callback the user is prompted if interactive is set, otherwise NO_EMAIL_LEAD_POLICY
+        (default 'skip') is applied.
+        
+        Progress is logged at DEBUG level; verbose=True enables it for this agent only.
+        """
+        self.verbose = verbose
+        self.logger = verbose_logger if verbose else logger
+        settings = _env_settings()
+        
+        # Clients and sub-agents are shared between agents using the same credentials
+        credentials = (erpnext_url, erpnext_username, erpnext_password)
+        
+        # Initialize Frappe client on a pooled session, with an awaitable view for campaigns
+        self.client = _get_shared('frappe', credentials, lambda: create_frappe_client(
             erpnext_url,
             erpnext_username,
             erpnext_password
-        )
+        ))
+        self.async_client = AsyncFrappeClient(self.client)
         
         # Store company profile and email templates
         self.company_profile = company_profile or {
@@ -85,30 +408,91 @@ class UnifiedAgent:
             }
         ]
         
+        # The static part of every email prompt, placed first so providers can cache it
+        self._offers_joined = ', '.join(self.company_profile['offers'])
+        self._email_prompt_prefix = self._build_email_prompt_prefix()
+        # Digest of the profile half of the email cache key, hashed once instead of per lead
+        self._profile_digest = hashlib.sha256(
+            json.dumps(self.company_profile, sort_keys=True, default=str).encode()
+        ).hexdigest()
+        
+        # Parse each template once; rendering per lead then skips format-string parsing
+        self._compiled_templates = {}
+        for template in self.email_templates:
+            self._compiled_templates.setdefault(template['type'], (
+                template,
+                _compile_template(template['subject']),
+                _compile_template(template['body'])
+            ))
+        
         # Initialize LangChain LLM
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash",
-            google_api_key=os.getenv('GOOGLE_API_KEY'),
-            temperature=0.7
-        )
+        self.llm = _get_llm()
+        # Emails are short and formulaic: a lighter model with a capped, steadier output
+        self._email_llm_settings = (settings['email_model'], 0.3, settings['email_max_output_tokens'])
+        self.email_llm = _get_llm(*self._email_llm_settings)
         
         # Initialize lead creation agent
-        self.lead_agent = LeadCreationAgent(
-            gmaps_api_key=os.getenv('GMAPS_API_KEY'),
+        self.lead_agent = _get_shared('lead_creation', credentials, lambda: LeadCreationAgent(
+            gmaps_api_key=settings['gmaps_api_key'],
             erpnext_url=erpnext_url,
             erpnext_username=erpnext_username,
             erpnext_password=erpnext_password,
-            gemini_api_key=os.getenv('GOOGLE_API_KEY')
-        )
-        self.outreach_agent = LeadOutreachAgent(
+            gemini_api_key=settings['google_api_key']
+        ))
+        self.outreach_agent = _get_shared('lead_outreach', credentials, lambda: LeadOutreachAgent(
             url=erpnext_url,
             username=erpnext_username,
             password=erpnext_password
-        )
+        ))
         
         # Initialize parser
         self.parser = QueryTypeParser()
         
+        # How to resolve campaigns where no matching lead has an email address
+        self.interactive = interactive
+        self.on_decision = on_decision
+        self.no_email_policy = settings['no_email_policy']
+        
+        # LLM retries and the per-lead time budget for campaign calls
+        self.llm_retries = settings['llm_retries']
+        self.llm_retry_max_delay = settings['llm_retry_max_delay']
+        self.campaign_call_timeout = settings['campaign_call_timeout']
+        
+        # Outreach fan-out: concurrent leads in flight and sends per minute
+        self.outreach_concurrency = settings['outreach_concurrency']
+        self._send_limiter = TokenBucket(settings['outreach_rpm'], 60)
+        
+        # Exact-match cache of query analyses: digest -> (timestamp, analysis JSON)
+        self.analysis_cache_ttl = settings['analysis_cache_ttl']
+        self.analysis_cache_size = settings['analysis_cache_size']
+        self._analysis_cache = {}
+        self._analysis_cache_lock = threading.Lock()
+        
+        # Short-lived cache of lead queries: key -> (timestamp, rows)
+        self.lead_cache_ttl = settings['lead_cache_ttl']
+        self.lead_cache_size = 64
+        self._lead_cache = {}
+        self._lead_cache_lock = threading.Lock()
+        
+        # Concurrent per-lead research lookups when the bulk query is unavailable
+        self.research_workers = settings['research_workers']
+        
+        # Research notes per lead: lead name -> (timestamp, research dict)
+        self.research_cache_ttl = settings['research_cache_ttl']
+        self.research_cache_size = 2048
+        self._research_cache = {}
+        self._research_cache_lock = threading.Lock()
+        
+        # Generated emails by prompt inputs and LLM settings: digest -> (timestamp, email).
+        # Sampling is not deterministic at a non-zero temperature, so a hit replays the email
+        # generated earlier for the lead rather than a fresh variation; a TTL of 0 disables it
+        self.email_cache_ttl = settings['email_cache_ttl']
+        self.email_cache_size = 10000
+        self._email_cache = {}
+        # Written from request threads and from coroutines on the shared event loop
+        self._email_cache_lock = threading.Lock()
+        self.email_concurrency = settings['email_concurrency']
+        
         # Setup tools and agent
         self._setup_agent()
     
@@ -152,115 +536,148 @@ class UnifiedAgent:
             )
         ]
         
-        template = """
-You are an intelligent CRM agent that helps with lead generation and outreach campaigns.
-
-You have access to the following tools:
-
-{tools}
-
-Use the following format:
-
-Question: the input question you must answer
-Thought: you should always think about what to do
-Action: the action to take, should be one of [{tool_names}]
-Action Input: the input to the action
-Observation: the result of the action
-... (this Thought/Action/Action Input/Observation can repeat N times)
-Thought: I now know the final answer
-Final Answer: the final answer to the original input question
-
-When a user makes a request:
-1. First analyze the query to understand the intent
-2. Based on the intent, use the appropriate tools
-3. For lead generation: use create_leads tool
-4. For outreach: get company description, get leads with filters, generate emails, and send them
-5. For stats: use get_campaign_stats
-
-Always provide detailed progress updates and show email content for outreach campaigns.
-
-Question: {input}
-{agent_scratchpad}"""
+        # Tools by name, so batch invocations can dispatch to them
+        self._tool_registry = {tool.name: tool.func for tool in tools}
+        tools.append(Tool(
+            name="batch",
+            description=(
+                'Invoke multiple independent tools in parallel. Input: '
+                '{"invocations": [{"tool_name": "<tool>", "arguments": "<tool input>"}, ...]}'
+            ),
+            func=self._batch_tool
+        ))
         
-        prompt = PromptTemplate.from_template(template)
+        prompt = PromptTemplate.from_template(REACT_PROMPT_TEMPLATE)
         self.agent = create_react_agent(self.llm, tools, prompt)
         self.agent_executor = AgentExecutor(
             agent=self.agent,
             tools=tools,
-            verbose=True,
+            verbose=self.verbose,
             handle_parsing_errors="Check your output and make sure it conforms to the format instructions!",
             max_iterations=10,
             early_stopping_method="generate"
         )
     
+    def _invoke_llm(self, prompt: str, llm: Optional[ChatGoogleGenerativeAI] = None):
+        """Invoke the LLM (the agent's by default), retrying failed calls with exponential backoff"""
+        llm = llm or self.llm
+        for attempt in range(self.llm_retries):
+            try:
+                return llm.invoke(prompt)
+            except Exception as e:
+                if attempt == self.llm_retries - 1:
+                    raise
+                delay = min(self.llm_retry_max_delay, 2 ** attempt)
+                logger.warning(f"LLM call failed ({e}), retrying in {delay}s")
+                time.sleep(delay)
+
+    async def _ainvoke_llm(self, prompt: str, llm: Optional[ChatGoogleGenerativeAI] = None):
+        """Async counterpart of _invoke_llm, backing off without blocking the event loop"""
+        llm = llm or self.llm
+        for attempt in range(self.llm_retries):
+            try:
+                return await llm.ainvoke(prompt)
+            except Exception as e:
+                if attempt == self.llm_retries - 1:
+                    raise
+                delay = min(self.llm_retry_max_delay, 2 ** attempt)
+                logger.warning(f"LLM call failed ({e}), retrying in {delay}s")
+                await asyncio.sleep(delay)
+
+    def _batch_tool(self, query: str) -> str:
+        """Tool to run several tool invocations concurrently, results in invocation order"""
+        try:
+            invocations = _loads(query).get('invocations') or []
+        except Exception as e:
+            return f"Error parsing batch invocations: {e}"
+        return _dumps(asyncio.run(self._run_batch(invocations)))
+
+    async def _run_batch(self, invocations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Run tool invocations in worker threads and gather their results"""
+        async def invoke(invocation: Dict[str, Any]) -> Dict[str, Any]:
+            name = invocation.get('tool_name')
+            func = self._tool_registry.get(name)
+            if func is None:
+                return {"tool_name": name, "error": f"Unknown tool: {name}"}
+            arguments = invocation.get('arguments', '')
+            if not isinstance(arguments, str):
+                arguments = _dumps(arguments)
+            try:
+                return {"tool_name": name, "result": await asyncio.to_thread(func, arguments)}
+            except Exception as e:
+                return {"tool_name": name, "error": str(e)}
+        
+        return await asyncio.gather(*[invoke(invocation) for invocation in invocations])
+
     def _analyze_query(self, query: str) -> str:
         """Analyze user query to determine intent and extract parameters"""
-        analysis_prompt = f"""
-        Analyze this user query and extract the intent and parameters:
-        
-        Query: "{query}"
-        
-        Extract specific parameters:
-        - Count: any numbers mentioned (default to 10 if none found)
-        - Status: words like "open", "interested", "qualified", "lead", "replied", "opportunity", "quotation", "lost"
-        - Industry: business types like "software", "marketing", "healthcare", "finance", "tech"
-        - Time: words like "recent", "last X days", "new"
+        key = hashlib.blake2b(query.encode(), digest_size=16).hexdigest()
+        cached = self._analysis_cache.get(key)
+        now = time.monotonic()
+        if cached and now - cached[0] < self.analysis_cache_ttl:
+            return cached[1]
         
-        Return as JSON (use null for missing values, not "None"):
-        {{
-            "intent": "lead_generation|outreach|stats",
-            "parameters": {{
-                "count": 10,
-                "business_type": null,
-                "location": null,
-                "filters": {{
-                    "industry": null,
-                    "status": null,
-                    "size": null,
-                    "recent": null
-                }}
-            }}
-        }}
-        """
+        analysis_prompt = ANALYSIS_PROMPT_PREFIX + f'\n        Query: "{query}"\n'
         
         try:
-            response = self.llm.invoke(analysis_prompt)
+            response = self._invoke_llm(analysis_prompt)
             result = self.parser.parse(response.content)
-            
-            # Ensure count is always a number
-            if 'parameters' in result:
-                if 'count' not in result['parameters'] or result['parameters']['count'] is None:
-                    result['parameters']['count'] = 10
-                elif isinstance(result['parameters']['count'], str):
-                    try:
-                        result['parameters']['count'] = int(result['parameters']['count'])
-                    except:
-                        result['parameters']['count'] = 10
-            
-            # Clean up None values that might come as strings
-            if 'parameters' in result and 'filters' in result['parameters']:
-                filters = result['parameters']['filters']
-                for key, value in filters.items():
-                    if value in ['None', 'none', 'null', '']:
-                        filters[key] = None
-            
-            return json.dumps(result)
+            analysis = _dumps(self._normalize_analysis(result))
+            self._cache_analysis(key, now, analysis)
+            return analysis
         except Exception as e:
             logger.error(f"Error analyzing query: {e}")
-            return json.dumps({
-                "intent": "lead_generation",
-                "parameters": {
-                    "count": 10,
-                    "business_type": None,
-                    "location": None,
-                    "filters": {
-                        "industry": None,
-                        "status": None,
-                        "size": None,
-                        "recent": None
-                    }
+            return _dumps(self._default_analysis())
+
+    def _cache_analysis(self, key: str, now: float, analysis: str) -> None:
+        """Store an analysis, evicting the oldest entry once the cache is full"""
+        with self._analysis_cache_lock:
+            self._analysis_cache.pop(key, None)
+            if len(self._analysis_cache) >= self.analysis_cache_size:
+                self._analysis_cache.pop(next(iter(self._analysis_cache)))
+            self._analysis_cache[key] = (now, analysis)
+
+    def _normalize_analysis(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Coerce count to int and string null markers to None"""
+        # Ensure count is always a number
+        if 'parameters' in result:
+            if 'count' not in result['parameters'] or result['parameters']['count'] is None:
+                result['parameters']['count'] = 10
+            elif isinstance(result['parameters']['count'], str):
+                try:
+                    result['parameters']['count'] = int(result['parameters']['count'])
+                except:
+                    result['parameters']['count'] = 10
+        
+        # Clean up None values that might come as strings
+        if 'parameters' in result and 'filters' in result['parameters']:
+            filters = result['parameters']['filters']
+            for key, value in filters.items():
+                if value in ['None', 'none', 'null', '']:
+                    filters[key] = None
+        
+        return result
+
+    def _default_analysis(self) -> Dict[str, Any]:
+        """Analysis used when the LLM call or parsing fails
+        
+        The intent is left unknown so a failed analysis never routes a query to a handler
+        that writes to ERPNext.
+        """
+        return {
+            "intent": "unknown",
+            "parameters": {
+                "count": 10,
+                "business_type": None,
+                "location": None,
+                "filters": {
+                    "industry": None,
+                    "status": None,
+                    "size": None,
+                    "recent": None
                 }
-            })
+            }
+        }
 
     def process_query(self, query: str) -> Dict[str, Any]:
         """Process a single query using the agent executor."""
@@ -276,57 +693,33 @@ Question: {input}
         try:
             # Handle both JSON and plain text input
             try:
-                params = json.loads(query)
+                params = _loads(query)
             except (json.JSONDecodeError, TypeError):
                 # If not JSON, treat as plain text and extract parameters
                 params = self._extract_params_from_text(query)
             
-            result = self.lead_agent.create_leads(
-                business_type=params.get('business_type', 'company'),
-                location=params.get('location', 'USA'),
-                count=params.get('count', 5),
-                user_input=query # Pass the original query for more context
-            )
-            return json.dumps(result)
+            return _dumps(self._create_leads(params, query))
         except Exception as e:
             return f"Error creating leads: {e}"
     
+    def _create_leads(self, params: Dict[str, Any], user_input: str) -> Any:
+        """Create leads for the business_type, location and count in params"""
+        result = self.lead_agent.create_leads(
+            business_type=params.get('business_type') or 'company',
+            location=params.get('location') or 'USA',
+            count=params.get('count') or 5,
+            user_input=user_input # Pass the original query for more context
+        )
+        self.invalidate_lead_cache()
+        return result
+    
     def _extract_params_from_text(self, text: str) -> Dict:
         """Extract parameters from plain text query"""
-        params = {
-            'business_type': 'company',
-            'location': 'USA',
-            'count': 5
-        }
-        
-        # Extract count
-        count_match = re.search(r'(\d+)', text)
-        if count_match:
-            params['count'] = int(count_match.group(1))
-        
-        # Extract business type
-        text_lower = text.lower()
-        if 'startup' in text_lower:
-            params['business_type'] = 'startup'
-        elif 'software' in text_lower:
-            params['business_type'] = 'software company'
-        elif 'marketing' in text_lower:
-            params['business_type'] = 'marketing agency'
-        elif 'healthcare' in text_lower:
-            params['business_type'] = 'healthcare company'
-        elif 'tech' in text_lower:
-            params['business_type'] = 'tech company'
-        
-        # Extract location
-        location_match = re.search(r'in\s+([^,\n]+)', text, re.IGNORECASE)
-        if location_match:
-            params['location'] = location_match.group(1).strip()
-        
-        return params
+        return dict(_extract_params(text))
 
     def _get_company_description(self, query: str) -> str:
         """Tool to get company description from the stored profile."""
-        return json.dumps({
+        return _dumps({
             "name": self.company_profile["name"],
             "description": self.company_profile["description"],
             "industry": self.company_profile["industry"],
@@ -338,7 +731,7 @@ Question: {input}
     def _get_leads_for_outreach_tool(self, query: str) -> List[Dict]:
         """Tool to get leads for an outreach campaign."""
         try:
-            params = json.loads(query)
+            params = _loads(query)
             return self.outreach_agent.get_leads_for_outreach(filters=params.get('filters'))
         except Exception as e:
             logger.error(f"Error getting leads for outreach: {e}")
@@ -347,29 +740,32 @@ Question: {input}
     def _generate_email_tool(self, query: str) -> str:
         """Tool to generate a personalized email using stored templates."""
         try:
-            params = json.loads(query)
+            params = _loads(query)
             lead = params.get('lead')
             template_type = params.get('template_type', 'meeting')
             
             # Find the appropriate template
-            selected_template = None
-            for template in self.email_templates:
-                if template['type'] == template_type:
-                    selected_template = template
-                    break
+            selected_template = self._compiled_templates.get(template_type)
             
             if not selected_template:
-                selected_template = self.email_templates[0]  # Use first template as fallback
+                selected_template = self._compiled_templates[self.email_templates[0]['type']]  # Use first template as fallback
             
             # Generate personalized email using the template and company profile
             email_content = self._personalize_email_template(lead, selected_template)
-            return json.dumps(email_content)
+            return _dumps(email_content)
         except Exception as e:
             return f"Error generating email: {e}"
     
-    def _personalize_email_template(self, lead: Dict[str, Any], template: Dict[str, Any]) -> Dict[str, Any]:
+    def _personalize_email_template(self, lead: Dict[str, Any], template: Any) -> Dict[str, Any]:
         """Personalize an email template with lead and company information."""
         try:
+            # Accept either a raw template dict or a compiled (template, subject, body) entry
+            if isinstance(template, tuple):
+                template, render_subject, render_body = template
+            else:
+                render_subject = _compile_template(template['subject'])
+                render_body = _compile_template(template['body'])
+            
             # Extract lead information
             lead_name = lead.get('lead_name', lead.get('company_name', 'there'))
             contact_name = lead.get('contact_display', lead.get('lead_name', 'there'))
@@ -387,8 +783,8 @@ Question: {input}
             }
             
             # Format subject and body
-            subject = template['subject'].format(**template_vars)
-            body = template['body'].format(**template_vars)
+            subject = render_subject(template_vars)
+            body = render_body(template_vars)
             
             return {
                 'subject': subject,
@@ -408,7 +804,7 @@ Question: {input}
     def _send_email_tool(self, query: str) -> str:
         """Tool to send an email."""
         try:
-            params = json.loads(query)
+            params = _loads(query)
             email_data = params.get('email')
             recipient = params.get('recipient')
             
@@ -425,7 +821,7 @@ Question: {input}
     def _get_stats_tool(self, query: str) -> str:
         """Tool to get campaign statistics."""
         # This would query ERPNext for stats
-        return json.dumps({
+        return _dumps({
             'leads_generated': 100,
             'emails_sent': 50,
             'open_rate': 0.2
@@ -433,97 +829,54 @@ Question: {input}
 
     def run_outreach_campaign(self, query: str) -> Dict:
         """Run a complete outreach campaign"""
+        return run_coroutine(self.run_outreach_campaign_async(query))
+
+    async def run_outreach_campaign_async(self, query: str) -> Dict:
+        """Run a complete outreach campaign, processing leads concurrently"""
         try:
-            print(f"\n📧 Starting outreach campaign based on: {query}")
+            self.logger.debug("Starting outreach campaign based on: %s", query)
             
-            # Step 1: Analyze query
-            analysis = json.loads(self._analyze_query(query))
+            # Step 1: Analyze query; the LLM call blocks, so keep it off the shared event loop
+            analysis = _loads(await asyncio.to_thread(self._analyze_query, query))
             filters = analysis.get('parameters', {}).get('filters', {})
             count = analysis.get('parameters', {}).get('count', 10)
             
             # Clean filters - remove None values
             clean_filters = {k: v for k, v in filters.items() if v is not None}
             
-            print(f"📊 Campaign parameters: {clean_filters}, Count: {count}")
+            self.logger.debug("Campaign parameters: %s, count: %s", clean_filters, count)
             
             # Step 2: Use stored company profile instead of hardcoded description
             company_profile = self.company_profile
-            print(f"🏢 Using company profile: {company_profile['name']}")
-            print(f"   Industry: {company_profile['industry']}")
-            print(f"   Services: {', '.join(company_profile['offers'])}")
+            self.logger.debug("Using company profile: %s (industry: %s, services: %s)",
+                              company_profile['name'], company_profile['industry'], company_profile['offers'])
             
             # Step 3: Get filtered leads with detailed debugging
             filter_params = {**clean_filters, 'count': count}
-            leads = self._get_filtered_leads(filter_params)
+            leads = await asyncio.to_thread(self._get_filtered_leads, filter_params)
             
             if not leads:
-                print("\n❌ No qualifying leads found.")
+                self.logger.debug("No qualifying leads found")
                 return {"success": False, "message": "No qualifying leads found with the specified criteria"}
             
-            print(f"\n✅ Found {len(leads)} qualifying leads for outreach")
-            
-            # Show lead details for verification
-            for i, lead in enumerate(leads[:3], 1):  # Show first 3
-                email_status = "✅" if lead.get('email_id') else "❌"
-                print(f"   {i}. {lead.get('lead_name', 'Unknown')} ({lead.get('status', 'No status')}) {email_status} {lead.get('email_id', 'No email')}")
-            
-            if len(leads) > 3:
-                print(f"   ... and {len(leads) - 3} more leads")
+            self.logger.debug("Found %d qualifying leads for outreach", len(leads))
             
             # Step 4: Generate and send emails
-            sent_count = 0
-            failed_count = 0
-            skipped_count = 0
-            
-            for i, lead in enumerate(leads, 1):
-                try:
-                    print(f"\n📧 Processing lead {i}/{len(leads)}: {lead.get('lead_name', 'Unknown')}")
-                    print(f"   Company: {lead.get('company_name', 'N/A')}")
-                    print(f"   Email: {lead.get('email_id', 'N/A')}")
-                    print(f"   Status: {lead.get('status', 'N/A')}")
-                    
-                    # Skip leads without email
-                    if not lead.get('email_id'):
-                        skipped_count += 1
-                        print(f"⏭️  Skipped - No email address")
-                        continue
-                    
-                    # Generate email using stored company profile
-                    email_content = self._generate_personalized_email(lead, "")  # Empty string since we use stored profile
-                    
-                    print(f"✍️  Generated email:")
-                    print(f"   Subject: {email_content['subject']}")
-                    print(f"   Body preview: {email_content['body'][:100]}...")
-                    
-                    # Send email
-                    email_data = {
-                        'to_email': lead['email_id'],
-                        'subject': email_content['subject'],
-                        'body': email_content['body']
-                    }
-                    
-                    send_result = self._send_email_tool(json.dumps(email_data))
-                    
-                    if "successfully" in send_result:
-                        sent_count += 1
-                        print(f"✅ Email sent successfully")
-                    else:
-                        failed_count += 1
-                        print(f"❌ Email failed: {send_result}")
-                    
-                    # Small delay between emails
-                    import time
-                    time.sleep(1)
-                    
-                except Exception as e:
-                    failed_count += 1
-                    print(f"❌ Error processing lead: {str(e)}")
+            counts = {'sent': 0, 'failed': 0, 'skipped': 0}
+            sem = asyncio.Semaphore(max(1, self.outreach_concurrency))
+            email_sem = asyncio.Semaphore(max(1, self.email_concurrency))
+            await asyncio.gather(
+                *[self._process_lead(i, len(leads), lead, sem, email_sem, counts) for i, lead in enumerate(leads, 1)],
+                return_exceptions=True
+            )
+            if counts['sent']:
+                self.invalidate_lead_cache()
+            sent_count = counts['sent']
+            failed_count = counts['failed']
+            skipped_count = counts['skipped']
             
             # Final statistics
-            final_statuses = [lead.get('status', 'Unknown') for lead in leads]
-            status_counts = {}
-            for status in final_statuses:
-                status_counts[status] = status_counts.get(status, 0) + 1
+            status_counts = Counter(lead.get('status', 'Unknown') for lead in leads)
             
             return {
                 "success": True,
@@ -533,7 +886,7 @@ Question: {input}
                     "emails_failed": failed_count,
                     "emails_skipped": skipped_count,
                     "filters_applied": clean_filters,
-                    "lead_statuses": status_counts
+                    "lead_statuses": dict(status_counts)
                 }
             }
             
@@ -541,171 +894,192 @@ Question: {input}
             logger.error(f"Campaign error: {e}")
             return {"success": False, "error": str(e)}
 
+    async def _process_lead(self, i: int, total: int, lead: Dict, sem: asyncio.Semaphore,
+                            email_sem: asyncio.Semaphore, counts: Dict) -> None:
+        """Generate and send the outreach email for one lead"""
+        async with sem:
+            try:
+                self.logger.debug("Processing lead %d/%d: %s (company: %s, email: %s, status: %s)",
+                                  i, total, lead.get('lead_name', 'Unknown'), lead.get('company_name', 'N/A'),
+                                  lead.get('email_id', 'N/A'), lead.get('status', 'N/A'))
+                
+                # Skip leads without email
+                if not lead.get('email_id'):
+                    counts['skipped'] += 1
+                    self.logger.debug("Skipped lead %s: no email address", lead.get('lead_name', 'Unknown'))
+                    return
+                
+                # Generate email using stored company profile
+                email_content = await asyncio.wait_for(
+                    self._generate_personalized_email_async(lead, email_sem),
+                    self.campaign_call_timeout
+                )
+                
+                self.logger.debug("Generated email for %s with subject: %s",
+                                  lead.get('lead_name', 'Unknown'), email_content['subject'])
+                
+                # Send email
+                email_data = {
+                    'to_email': lead['email_id'],
+                    'subject': email_content['subject'],
+                    'body': email_content['body']
+                }
+                
+                try:
+                    async with self._send_limiter:
+                        await asyncio.wait_for(
+                            self.async_client.post_api(SEND_EMAIL_METHOD, self._email_payload(email_data)),
+                            self.campaign_call_timeout
+                        )
+                    counts['sent'] += 1
+                    logger.info("Email sent to %s", email_data['to_email'])
+                except Exception as e:
+                    counts['failed'] += 1
+                    logger.error("Error sending email to %s: %s", email_data['to_email'], e)
+                
+            except Exception as e:
+                counts['failed'] += 1
+                logger.error("Error processing lead %s: %s", lead.get('name', 'Unknown'), e)
+
     def _get_filtered_leads(self, filters: Dict) -> List[Dict]:
-        """Get leads with dynamic filtering"""
+        """Get leads with dynamic filtering, applied server-side in a single query"""
         try:
-            # First, let's debug what leads and statuses exist
-            print("\n🔍 DEBUG: Checking Lead data structure...")
-            
-            # Get all leads without filters first to see what's available
-            all_leads_debug = self.client.get_list('Lead', 
-                fields=['name', 'lead_name', 'company_name', 'email_id', 'industry', 'creation', 'status'],
-                limit_page_length=50
-            )
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self._log_status_distribution()
             
-            print(f"📊 Total leads in system: {len(all_leads_debug)}")
-            
-            # Show all available statuses
-            statuses_in_system = set()
-            leads_with_email = 0
-            
-            for lead in all_leads_debug:
-                if lead.get('status'):
-                    statuses_in_system.add(lead.get('status'))
-                if lead.get('email_id'):
-                    leads_with_email += 1
-            
-            print(f"📋 Available statuses in system: {sorted(list(statuses_in_system))}")
-            print(f"📧 Leads with email addresses: {leads_with_email}")
-            
-            # Show sample leads by status
-            for status in sorted(list(statuses_in_system)):
-                status_leads = [l for l in all_leads_debug if l.get('status') == status]
-                email_count = len([l for l in status_leads if l.get('email_id')])
-                print(f"   - {status}: {len(status_leads)} total, {email_count} with email")
-            
-            # Now apply the actual filtering
             target_status = filters.get('status')
-            if target_status:
-                print(f"\n🎯 Looking for leads with status: '{target_status}'")
-                
-                # Try exact match first
-                exact_match_leads = [l for l in all_leads_debug if l.get('status', '').lower() == target_status.lower()]
-                print(f"   Exact match (case-insensitive): {len(exact_match_leads)}")
-                
-                # Use exact match leads
-                if exact_match_leads:
-                    filtered_leads = exact_match_leads
-                else:
-                    print(f"❌ No leads found with status '{target_status}' in any case")
-                    filtered_leads = []
-            else:
-                # No status filter, use all leads
-                filtered_leads = all_leads_debug
-            
-            print(f"📊 After status filtering: {len(filtered_leads)} leads")
+            lead_filters = self._build_lead_filters(filters)
             
-            # Check email situation before filtering
-            leads_with_email = [l for l in filtered_leads if l.get('email_id')]
-            leads_without_email = [l for l in filtered_leads if not l.get('email_id')]
-            
-            print(f"📧 Email analysis:")
-            print(f"   - Leads with email: {len(leads_with_email)}")
-            print(f"   - Leads without email: {len(leads_without_email)}")
+            count = filters.get('count')
+            limit = count if count and count > 0 else 0
+            fields = ['name', 'lead_name', 'company_name', 'email_id', 'industry', 'creation', 'status']
+            
+            # The cache key uses the requested filters, not the computed cutoff timestamp
+            cache_key = tuple(sorted((k, str(v)) for k, v in filters.items()))
+            email_filtered_leads = self._get_leads_cached(('email',) + cache_key, lambda: self.client.get_list('Lead',
+                fields=fields,
+                filters={**lead_filters, 'email_id': ['is', 'set']},
+                limit_page_length=limit
+            ))
+            self.logger.debug("Leads matching filters with email: %d", len(email_filtered_leads))
             
             # If no leads have email, offer to show leads without email or suggest adding emails
-            if len(leads_with_email) == 0 and len(leads_without_email) > 0:
-                print(f"\n⚠️  WARNING: Found {len(leads_without_email)} leads with status '{target_status}' but none have email addresses!")
-                print("📋 Leads without email addresses:")
-                for i, lead in enumerate(leads_without_email[:5], 1):  # Show first 5
-                    print(f"   {i}. {lead.get('lead_name', 'Unknown')} - {lead.get('company_name', 'No company')}")
-                
-                if len(leads_without_email) > 5:
-                    print(f"   ... and {len(leads_without_email) - 5} more")
-                
-                print("\n💡 Suggestions:")
-                print("   1. Add email addresses to these leads in ERPNext")
-                print("   2. Use leads with 'Interested' status (which have emails)")
-                print("   3. Run campaign anyway without emails (for testing)")
-                
-                # Ask user what to do
-                choice = input("\nWould you like to:\n1. Skip leads without emails (current behavior)\n2. Include leads without emails (emails won't be sent)\n3. Cancel campaign\nEnter choice (1/2/3): ").strip()
-                
-                if choice == "2":
-                    print("📧 Including leads without email addresses (emails will be skipped)")
-                    email_filtered_leads = filtered_leads  # Include all leads
-                elif choice == "3":
-                    print("❌ Campaign cancelled")
-                    return []
-                else:
-                    print("📧 Using only leads with email addresses")
-                    email_filtered_leads = leads_with_email
-            else:
-                # Normal filtering - only leads with emails
-                email_filtered_leads = leads_with_email
-            
-            print(f"📧 After email filter: {len(email_filtered_leads)} leads")
-            
-            # Apply industry filter if specified
-            if filters.get('industry'):
-                industry = filters['industry']
-                if industry is not None:  # Add null check
-                    before_count = len(email_filtered_leads)
-                    email_filtered_leads = [l for l in email_filtered_leads 
-                                         if l.get('industry') and industry.lower() in l.get('industry', '').lower()]
-                    print(f"🏭 After industry filter '{industry}': {len(email_filtered_leads)} leads (was {before_count})")
-            
-            # Apply recent filter if specified
-            if filters.get('recent'):
-                try:
-                    days = int(filters['recent'])
-                    cutoff_date = datetime.now() - timedelta(days=days)
-                    before_count = len(email_filtered_leads)
+            if not email_filtered_leads:
+                leads_without_email = self._get_leads_cached(('no_email',) + cache_key, lambda: self.client.get_list('Lead',
+                    fields=fields,
+                    filters={**lead_filters, 'email_id': ['is', 'not set']},
+                    limit_page_length=limit
+                ))
+                if leads_without_email:
+                    logger.warning("Found %d leads with status '%s' but none have email addresses",
+                                   len(leads_without_email), target_status)
                     
-                    recent_leads = []
-                    for lead in email_filtered_leads:
-                        try:
-                            if lead.get('creation'):  # Add null check
-                                creation_date = datetime.strptime(lead['creation'][:19], '%Y-%m-%d %H:%M:%S')
-                                if creation_date >= cutoff_date:
-                                    recent_leads.append(lead)
-                        except:
-                            # If date parsing fails, include the lead
-                            recent_leads.append(lead)
+                    choice = self._resolve_no_email_leads({
+                        'status': target_status,
+                        'filters': filters,
+                        'leads_without_email': leads_without_email
+                    })
+                    self.logger.debug("No-email leads decision: %s", choice)
                     
-                    email_filtered_leads = recent_leads
-                    print(f"📅 After recent filter (last {days} days): {len(email_filtered_leads)} leads (was {before_count})")
-                except Exception as e:
-                    print(f"⚠️ Error applying recent filter: {e}")
+                    if choice == "include":
+                        email_filtered_leads = leads_without_email
+                    elif choice == "cancel":
+                        return []
             
-            # Add research data to each lead
-            final_leads = []
+            # Add research data to each lead, fetched for all leads in one request
+            research = self._get_lead_research_data_bulk([lead['name'] for lead in email_filtered_leads])
             for lead in email_filtered_leads:
-                try:
-                    lead_data = self._get_lead_research_data(lead['name'])
-                    lead.update(lead_data)
-                except Exception as e:
-                    print(f"⚠️ Error getting research data for lead {lead.get('name', 'Unknown')}: {e}")
-                    lead.update({'research_data': 'No research data available', 'notes_count': 0})
-                final_leads.append(lead)
-            
-            # Apply count limit
-            count = filters.get('count')
-            if count and count > 0:
-                final_leads = final_leads[:count]
-                print(f"🔢 After count limit ({count}): {len(final_leads)} leads")
+                lead.update(research[lead['name']])
             
-            return final_leads
+            return email_filtered_leads
             
         except Exception as e:
-            logger.error(f"Error filtering leads: {e}")
-            print(f"❌ Error in lead filtering: {e}")
+            logger.error("Error filtering leads: %s", e)
             return []
 
-    def _passes_additional_filters(self, lead: Dict, filters: Dict) -> bool:
-        """Check if lead passes additional filters that can't be done at DB level"""
+    def _get_leads_cached(self, key: tuple, fetch: Callable[[], List[Dict]]) -> List[Dict]:
+        """Return copies of cached lead rows, refetching once the TTL has expired"""
+        cached = self._lead_cache.get(key)
+        now = time.monotonic()
+        if not (cached and now - cached[0] < self.lead_cache_ttl):
+            rows = fetch() or []
+            cached = (now, rows)
+            with self._lead_cache_lock:
+                if key not in self._lead_cache and len(self._lead_cache) >= self.lead_cache_size:
+                    self._lead_cache.pop(next(iter(self._lead_cache)))
+                self._lead_cache[key] = cached
+        # Callers enrich the rows in place, so hand out copies
+        return [dict(row) for row in cached[1]]
+
+    def invalidate_lead_cache(self):
+        """Drop cached lead queries after leads are created or contacted"""
+        with self._lead_cache_lock:
+            self._lead_cache.clear()
+
+    def _resolve_no_email_leads(self, context: Dict[str, Any]) -> str:
+        """Decide what to do when matching leads have no email: 'skip', 'include' or 'cancel'"""
+        options = ['skip', 'include', 'cancel']
+        if self.on_decision:
+            choice = self.on_decision(options, context)
+        elif self.interactive:
+            leads_without_email = context['leads_without_email']
+            print(f"\n⚠️  WARNING: Found {len(leads_without_email)} leads with status '{context['status']}' but none have email addresses!")
+            print("📋 Leads without email addresses:")
+            for i, lead in enumerate(leads_without_email[:5], 1):  # Show first 5
+                print(f"   {i}. {lead.get('lead_name', 'Unknown')} - {lead.get('company_name', 'No company')}")
+            
+            if len(leads_without_email) > 5:
+                print(f"   ... and {len(leads_without_email) - 5} more")
+            
+            print("\n💡 Suggestions:")
+            print("   1. Add email addresses to these leads in ERPNext")
+            print("   2. Use leads with 'Interested' status (which have emails)")
+            print("   3. Run campaign anyway without emails (for testing)")
+            
+            answer = input("\nWould you like to:\n1. Skip leads without emails (current behavior)\n2. Include leads without emails (emails won't be sent)\n3. Cancel campaign\nEnter choice (1/2/3): ").strip()
+            choice = {'1': 'skip', '2': 'include', '3': 'cancel'}.get(answer, 'skip')
+        else:
+            choice = self.no_email_policy
         
-        # Recent leads filter (last X days)
-        if 'recent' in filters:
+        if choice not in options:
+            logger.warning(f"Unknown no-email lead policy '{choice}', skipping leads without email")
+            return 'skip'
+        return choice
+
+    def _log_status_distribution(self) -> None:
+        """Log lead counts per status using one grouped query"""
+        try:
+            rows = self._get_leads_cached(('status_counts',), lambda: self.client.get_api('frappe.client.get_list', {
+                'doctype': 'Lead',
+                'fields': _dumps(['status', 'count(name) as count']),
+                'group_by': 'status',
+                'limit_page_length': 0
+            }))
+            for row in rows or []:
+                self.logger.debug("Lead status %s: %s", row.get('status'), row.get('count'))
+        except Exception as e:
+            self.logger.debug("Could not fetch lead status distribution: %s", e)
+
+    def _build_lead_filters(self, filters: Dict) -> Dict:
+        """Translate campaign filters into Frappe Lead filters so ERPNext does the filtering"""
+        lead_filters = {}
+        if filters.get('status'):
+            self.logger.debug("Looking for leads with status: %s", filters['status'])
+            lead_filters['status'] = ['=', filters['status']]
+        if filters.get('industry'):
+            lead_filters['industry'] = ['like', f"%{filters['industry']}%"]
+        if filters.get('recent'):
             try:
-                days = int(filters['recent'])
-                creation_date = datetime.strptime(lead['creation'][:10], '%Y-%m-%d')
-                cutoff_date = datetime.now() - timedelta(days=days)
-                if creation_date < cutoff_date:
-                    return False
-            except Exception as e:
-                logger.error(f"Error parsing recent filter: {e}")
-                pass
+                lead_filters['creation'] = ['>=', _recent_cutoff(filters['recent'])]
+            except (TypeError, ValueError) as e:
+                logger.warning("Error applying recent filter: %s", e)
+        return lead_filters
+
+    def _passes_additional_filters(self, lead: Dict, filters: Dict) -> bool:
+        """Check if lead passes additional filters that can't be done at DB level
+        
+        Status, industry and recent are applied by the Lead query via _build_lead_filters.
+        """
         
         # Size filter (based on company description keywords)
         if 'size' in filters:
@@ -718,147 +1092,271 @@ Question: {input}
         """Check if lead passes the filters (legacy method - kept for compatibility)"""
         # Status filter
         if 'status' in filters:
-            lead_status = lead.get('status', '').lower()
-            filter_status = filters['status'].lower()
-            if filter_status not in lead_status:
+            if filters['status'].lower() not in (lead.get('status') or '').lower():
                 return False
         
         # Industry filter
         if 'industry' in filters:
-            lead_industry = lead.get('industry', '').lower()
-            if filters['industry'].lower() not in lead_industry:
+            if filters['industry'].lower() not in (lead.get('industry') or '').lower():
                 return False
         
         # Recent leads filter (last X days)
         if 'recent' in filters:
             try:
-                days = int(filters['recent'])
-                creation_date = datetime.strptime(lead['creation'][:10], '%Y-%m-%d')
-                cutoff_date = datetime.now() - timedelta(days=days)
-                if creation_date < cutoff_date:
+                if not self._is_recent(lead, _recent_cutoff(filters['recent'])):
                     return False
-            except:
+            except (TypeError, ValueError):
                 pass
         
         return True
+
+    def _is_recent(self, lead: Dict, cutoff: str) -> bool:
+        """Compare creation timestamps as strings; ISO timestamps sort lexicographically"""
+        creation = lead.get('creation')
+        return not creation or str(creation)[:19] >= cutoff
     
     def _get_lead_research_data(self, lead_name: str) -> Dict:
         """Get research data/notes for a lead"""
+        return self._get_lead_research_data_bulk([lead_name])[lead_name]
+    
+    def _fetch_lead_notes(self, lead_name: str) -> List[str]:
+        """Comment contents for one lead; empty on failure so one lead cannot fail a batch"""
         try:
-            # Get comments/notes for the lead
             comments = self.client.get_list('Comment',
-                filters={'reference_doctype': 'Lead', 'reference_name': lead_name},
-                fields=['content', 'creation']
+                filters={'reference_doctype': 'Lead', 'reference_name': lead_name, 'comment_type': 'Comment'},
+                fields=['content'],
+                limit_page_length=_RESEARCH_COMMENTS_PER_LEAD
             )
-            
-            research_notes = []
-            for comment in comments:
-                if comment.get('content'):
-                    research_notes.append(comment['content'])
-            
-            return {
-                'research_data': ' '.join(research_notes) if research_notes else 'No research data available',
-                'notes_count': len(research_notes)
-            }
+            return [comment['content'] for comment in comments if comment.get('content')]
         except Exception as e:
             logger.error(f"Error getting lead research: {e}")
-            return {'research_data': 'No research data available', 'notes_count': 0}
+            return []
+    
+    def _get_lead_research_data_bulk(self, lead_names: List[str]) -> Dict[str, Dict]:
+        """Get research data/notes for several leads, querying only leads not cached recently"""
+        now = time.monotonic()
+        research = {}
+        for name in lead_names:
+            cached = self._research_cache.get(name)
+            if cached and now - cached[0] < self.research_cache_ttl:
+                research[name] = dict(cached[1])
+        
+        missing = [name for name in dict.fromkeys(lead_names) if name not in research]
+        fetched = self._fetch_lead_research(missing)
+        with self._research_cache_lock:
+            for name, data in fetched.items():
+                if name not in self._research_cache and len(self._research_cache) >= self.research_cache_size:
+                    self._research_cache.pop(next(iter(self._research_cache)))
+                self._research_cache[name] = (now, data)
+        for name, data in fetched.items():
+            research[name] = dict(data)
+        return research
+    
+    def _fetch_lead_research(self, lead_names: List[str]) -> Dict[str, Dict]:
+        """Get research data/notes for several leads with a paged Comment query"""
+        notes = defaultdict(list)
+        if lead_names:
+            try:
+                # Page until a short page comes back; one page usually covers the whole batch
+                page_size = len(lead_names) * _RESEARCH_COMMENTS_PER_LEAD
+                start = 0
+                while True:
+                    comments = self.client.get_list('Comment',
+                        filters={
+                            'reference_doctype': 'Lead',
+                            'reference_name': ['in', lead_names],
+                            'comment_type': 'Comment'
+                        },
+                        fields=['reference_name', 'content'],
+                        limit_start=start,
+                        limit_page_length=page_size
+                    )
+                    for comment in comments:
+                        if comment.get('content'):
+                            notes[comment['reference_name']].append(comment['content'])
+                    if len(comments) < page_size:
+                        break
+                    start += page_size
+            except Exception as e:
+                # Fall back to one query per lead, run concurrently
+                logger.warning(f"Bulk lead research query failed, fetching per lead: {e}")
+                workers = max(1, min(self.research_workers, len(lead_names)))
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    for name, lead_notes in zip(lead_names, executor.map(self._fetch_lead_notes, lead_names)):
+                        notes[name] = lead_notes
+        
+        return {
+            name: {
+                'research_data': ' '.join(notes[name]) or 'No research data available',
+                'notes_count': len(notes[name])
+            }
+            for name in lead_names
+        }
     
     def _generate_email_tool(self, lead_and_company_json: str) -> str:
         """Generate personalized email for a lead"""
         try:
-            data = json.loads(lead_and_company_json)
+            data = _loads(lead_and_company_json)
+            if 'leads' in data:
+                # Several leads at once: generate concurrently
+                return _dumps(self._generate_personalized_emails_bulk(data['leads']))
             lead = data['lead']
             company_desc = data['company_description']
             
             email_content = self._generate_personalized_email(lead, company_desc)
-            return json.dumps(email_content)
+            return _dumps(email_content)
         except Exception as e:
             return f"Error generating email: {str(e)}"
     
     def _generate_personalized_email(self, lead: Dict, company_description: str) -> Dict:
         """Generate personalized email using Gemini"""
-        # Use the stored company profile instead of the passed description
+        # Identical prompt inputs reuse the email generated earlier; the prompt is only built on a miss
+        cache_key = self._email_cache_key(lead)
+        cached = self._cached_email(cache_key)
+        if cached:
+            return cached
+        
+        try:
+            # Static company block first so the provider can reuse the cached prefix across leads
+            response = self._invoke_llm(self._email_prompt(lead), self.email_llm)
+            return self._store_email(cache_key, response.content)
+        except Exception as e:
+            logger.error(f"Error generating email: {e}")
+            return self._fallback_email()
+    
+    async def _generate_personalized_email_async(self, lead: Dict, sem: asyncio.Semaphore) -> Dict:
+        """Generate one personalized email with a non-blocking LLM call, bounded by sem"""
+        cache_key = self._email_cache_key(lead)
+        cached = self._cached_email(cache_key)
+        if cached:
+            return cached
+        
+        try:
+            async with sem:
+                response = await self._ainvoke_llm(self._email_prompt(lead), self.email_llm)
+            return self._store_email(cache_key, response.content)
+        except Exception as e:
+            logger.error(f"Error generating email: {e}")
+            return self._fallback_email()
+    
+    async def _generate_personalized_emails_async(self, leads: List[Dict]) -> List[Dict]:
+        """Generate emails for several leads concurrently, results in lead order"""
+        sem = asyncio.Semaphore(max(1, self.email_concurrency))
+        return await asyncio.gather(*[self._generate_personalized_email_async(lead, sem) for lead in leads])
+    
+    def _generate_personalized_emails_bulk(self, leads: List[Dict]) -> List[Dict]:
+        """Generate emails for several leads concurrently from synchronous code"""
+        return run_coroutine(self._generate_personalized_emails_async(leads))
+    
+    def _email_prompt(self, lead: Dict) -> str:
+        """Full email prompt: the shared company prefix followed by this lead's details"""
+        return self._email_prompt_prefix + f"""
+        LEAD INFORMATION:
+        - Name: {lead.get('lead_name', 'N/A')}
+        - Company: {lead.get('company_name', 'N/A')}
+        - Email: {lead.get('email_id', 'N/A')}
+        - Industry: {lead.get('industry', 'N/A')}
+        - Research Notes: {lead.get('research_data', 'N/A')}
+        """
+    
+    def _cached_email(self, cache_key: str) -> Optional[Dict]:
+        """Copy of a previously generated email for these prompt inputs, if still fresh"""
+        cached = self._email_cache.get(cache_key)
+        if cached and time.monotonic() - cached[0] < self.email_cache_ttl:
+            return dict(cached[1])
+        return None
+    
+    def _store_email(self, cache_key: str, email_text: str) -> Dict:
+        """Parse the subject and body from the LLM output and cache the result"""
         company_profile = self.company_profile
         
-        prompt = f"""
-        Generate a personalized outreach email based on the following information:
+        # Parse subject and body
+        subject = ""
+        body = ""
+        
+        json_text = _extract_json(email_text)
+        try:
+            parsed = _loads(json_text) if json_text else None
+        except ValueError:
+            parsed = None
+        if isinstance(parsed, dict):
+            subject = str(parsed.get('subject') or '').strip()
+            body = str(parsed.get('body') or '').strip()
+        else:
+            # Older SUBJECT:/BODY: line format
+            lines = email_text.split('\n')
+            for i, line in enumerate(lines):
+                if line.startswith('SUBJECT:'):
+                    subject = line.replace('SUBJECT:', '').strip()
+                elif line.startswith('BODY:'):
+                    body = '\n'.join(lines[i:]).replace('BODY:', '').strip()
+                    break
+        
+        email = {
+            'subject': subject or f"Partnership opportunity with {company_profile['name']}",
+            'body': body or f"I'd love to discuss how {company_profile['name']} can help your business grow. Would you be available for a brief call?"
+        }
+        if self.email_cache_ttl > 0:
+            with self._email_cache_lock:
+                if cache_key not in self._email_cache and len(self._email_cache) >= self.email_cache_size:
+                    self._email_cache.pop(next(iter(self._email_cache)))
+                self._email_cache[cache_key] = (time.monotonic(), email)
+        return dict(email)
+    
+    def _fallback_email(self) -> Dict:
+        """Generic email used when generation fails"""
+        company_profile = self.company_profile
+        return {
+            'subject': f"Partnership opportunity with {company_profile['name']}",
+            'body': f"I'd love to discuss how {company_profile['name']} can help your business grow. Would you be available for a brief call?"
+        }
+    
+    def _build_email_prompt_prefix(self) -> str:
+        """Company profile and guidelines shared by every email prompt"""
+        company_profile = self.company_profile
+        return f"""
+        Generate a personalized outreach email based on the following information.
+        The lead's details are given at the end.
 
         MY COMPANY:
         Name: {company_profile['name']}
         Industry: {company_profile['industry']}
         Description: {company_profile['description']}
-        Services/Offers: {', '.join(company_profile['offers'])}
+        Services/Offers: {self._offers_joined}
         Value Proposition: {company_profile['value_proposition']}
         Website: {company_profile.get('website', 'N/A')}
 
-        LEAD INFORMATION:
-        - Name: {lead.get('lead_name', 'N/A')}
-        - Company: {lead.get('company_name', 'N/A')}
-        - Email: {lead.get('email_id', 'N/A')}
-        - Industry: {lead.get('industry', 'N/A')}
-        - Research Notes: {lead.get('research_data', 'N/A')}
-
         GUIDELINES:
         - Keep under 150 words
         - Professional yet personable tone
         - Reference their company/industry specifically
         - Use our actual company name: {company_profile['name']}
-        - Highlight our specific services: {', '.join(company_profile['offers'])}
+        - Highlight our specific services: {self._offers_joined}
         - Emphasize our value proposition: {company_profile['value_proposition']}
         - Clear value proposition
         - End with soft call-to-action for 15-minute call
         - Use research data to personalize
 
-        Format as:
-        SUBJECT: [subject line]
-        BODY: [email body]
+        Respond with only a JSON object, no markdown:
+        {{"subject": "<subject line>", "body": "<email body>"}}
         """
-        
-        try:
-            response = self.llm.invoke(prompt)
-            email_text = response.content
-            
-            # Parse subject and body
-            subject = ""
-            body = ""
-            
-            lines = email_text.split('\n')
-            for i, line in enumerate(lines):
-                if line.startswith('SUBJECT:'):
-                    subject = line.replace('SUBJECT:', '').strip()
-                elif line.startswith('BODY:'):
-                    body = '\n'.join(lines[i:]).replace('BODY:', '').strip()
-                    break
-            
-            return {
-                'subject': subject or f"Partnership opportunity with {company_profile['name']}",
-                'body': body or f"I'd love to discuss how {company_profile['name']} can help your business grow. Would you be available for a brief call?"
-            }
-            
-        except Exception as e:
-            logger.error(f"Error generating email: {e}")
-            return {
-                'subject': f"Partnership opportunity with {company_profile['name']}",
-                'body': f"I'd love to discuss how {company_profile['name']} can help your business grow. Would you be available for a brief call?"
-            }
+    
+    def _email_cache_key(self, lead: Dict) -> str:
+        """Digest of everything the email prompt is built from, plus the model, temperature and output cap"""
+        fingerprint = {
+            'profile': self._profile_digest,
+            'llm': self._email_llm_settings,
+            'lead': {k: lead.get(k) for k in ('lead_name', 'company_name', 'email_id', 'industry', 'research_data')}
+        }
+        return hashlib.sha256(json.dumps(fingerprint, sort_keys=True, default=str).encode()).hexdigest()
     
     def _send_email_tool(self, email_data_json: str) -> str:
         """Send email using Frappe client"""
         try:
-            email_data = json.loads(email_data_json)
-            
-            # Send using the exact same method as send_mail.py
-            frappe_email_data = {
-                "recipients": email_data['to_email'],
-                "subject": email_data['subject'],
-                "content": self._text_to_html(email_data['body']),
-                "as_html": True,
-                "communication_medium": "Email",
-                "send_email": 1
-            }
+            email_data = _loads(email_data_json)
             
-            response = self.client.post_api("frappe.core.doctype.communication.email.make", frappe_email_data)
+            response = self.client.post_api(SEND_EMAIL_METHOD, self._email_payload(email_data))
+            self.invalidate_lead_cache()
             
             logger.info(f"Email sent to {email_data['to_email']}")
             return f"Email sent successfully to {email_data['to_email']}"
@@ -867,62 +1365,66 @@ Question: {input}
             logger.error(f"Error sending email: {e}")
             return f"Failed to send email: {str(e)}"
     
+    def _email_payload(self, email_data: Dict) -> Dict:
+        """Communication payload for an email, the same one send_mail.py uses"""
+        return {
+            "recipients": email_data['to_email'],
+            "subject": email_data['subject'],
+            "content": self._text_to_html(email_data['body']),
+            "as_html": True,
+            "communication_medium": "Email",
+            "send_email": 1
+        }
+    
     def _text_to_html(self, text: str) -> str:
-        """Convert plain text to HTML"""
-        html_text = text.replace('\n\n', '</p><p>').replace('\n', '<br>')
-        return f"<p>{html_text}</p>"
+        """Convert plain text to HTML, escaping the text so <, > and & render literally"""
+        return "<p>" + escape(text, quote=False).replace('\n\n', '</p><p>').replace('\n', '<br>') + "</p>"
+    
+    def _collect_stats(self) -> Dict:
+        """Lead counts by status and industry, plus email and recent-lead totals"""
+        all_leads = self.client.get_list('Lead', 
+            fields=['name', 'status', 'industry', 'creation', 'email_id'],
+            limit_page_length=1000
+        )
+        
+        # Count recent leads (last 7 days)
+        cutoff_date = datetime.now() - timedelta(days=7)
+        
+        return {
+            'total_leads': len(all_leads),
+            'leads_with_email': sum(1 for lead in all_leads if lead.get('email_id')),
+            'by_status': dict(Counter(lead.get('status', 'Unknown') for lead in all_leads)),
+            'by_industry': dict(Counter(lead.get('industry', 'Unknown') for lead in all_leads)),
+            'recent_leads': _count_created_since(all_leads, cutoff_date.strftime('%Y-%m-%d'))
+        }
     
     def _get_stats_tool(self, filters: str = "{}") -> str:
-        """Get campaign statistics"""
+        """Get campaign statistics as compact JSON for the agent"""
         try:
-            all_leads = self.client.get_list('Lead', 
-                fields=['name', 'status', 'industry', 'creation'],
-                limit_page_length=1000
-            )
-            
-            stats = {
-                'total_leads': len(all_leads),
-                'leads_with_email': 0,
-                'by_status': {},
-                'by_industry': {},
-                'recent_leads': 0
-            }
-            
-            # Count recent leads (last 7 days)
-            cutoff_date = datetime.now() - timedelta(days=7)
-            
-            for lead in all_leads:
-                # Count by status
-                status = lead.get('status', 'Unknown')
-                stats['by_status'][status] = stats['by_status'].get(status, 0) + 1
-                
-                # Count by industry
-                industry = lead.get('industry', 'Unknown')
-                stats['by_industry'][industry] = stats['by_industry'].get(industry, 0) + 1
-                
-                # Count recent leads
-                try:
-                    creation_date = datetime.strptime(lead['creation'][:10], '%Y-%m-%d')
-                    if creation_date >= cutoff_date:
-                        stats['recent_leads'] += 1
-                except:
-                    pass
-            
-            return json.dumps(stats, indent=2)
-            
+            return _dumps(self._collect_stats())
         except Exception as e:
             return f"Error getting stats: {str(e)}"
     
     def process_query(self, query: str) -> Dict:
-        """Process user query using the LangChain agent with fallback"""
+        """Route the query to its intent handler, using the LangChain agent for unknown intents
+        
+        Failed analyses come back with an unknown intent, so they also go to the agent.
+        """
         try:
-            print(f"\n🤖 Processing query: {query}")
+            self.logger.debug("Processing query: %s", query)
+            if self.verbose:
+                print(f"\n🤖 Processing query: {query}")
             
             # Try direct processing first for lead generation
-            if any(word in query.lower() for word in ['create', 'generate', 'find']) and 'lead' in query.lower():
+            if self._is_direct_lead_request(query):
                 return self._direct_lead_creation(query)
             
-            # Use LangChain agent for complex queries
+            analysis = _loads(self._analyze_query(query))
+            handler = self._intent_handlers().get(analysis.get('intent'))
+            if handler:
+                return handler(query, analysis.get('parameters') or {})
+            
+            # Use LangChain agent for queries outside the known intents
             result = self.agent_executor.invoke({"input": query})
             return {
                 "success": True,
@@ -931,19 +1433,75 @@ Question: {input}
             }
         except Exception as e:
             logger.error(f"Error processing query: {e}")
-            # Fallback to direct processing
-            if 'lead' in query.lower():
-                return self._direct_lead_creation(query)
             return {
                 "success": False,
                 "error": str(e),
                 "query": query
             }
     
+    def _is_direct_lead_request(self, query: str) -> bool:
+        """Lead creation requests recognizable by keyword, without an LLM call"""
+        query_lower = query.lower()
+        return 'lead' in query_lower and any(word in query_lower for word in _LEAD_TRIGGERS)
+    
+    def _intent_handlers(self) -> Dict[str, Callable[[str, Dict[str, Any]], Dict]]:
+        """Handlers for the intents _analyze_query can return, called with the query and its parameters"""
+        return {
+            "lead_generation": self._lead_generation_intent,
+            "outreach": self._outreach_intent,
+            "stats": self._stats_intent
+        }
+    
+    def _lead_generation_intent(self, query: str, parameters: Dict[str, Any]) -> Dict:
+        """Create leads with the business type, location and count the analysis extracted"""
+        # Anything the analysis left out is taken from the query text
+        params = self._extract_params_from_text(query)
+        params.update({key: parameters[key] for key in ('business_type', 'location', 'count') if parameters.get(key)})
+        try:
+            result = self._create_leads(params, query)
+        except Exception as e:
+            logger.error(f"Lead creation failed: {e}")
+            return {
+                "success": False,
+                "error": f"Lead creation failed: {str(e)}",
+                "query": query
+            }
+        return {
+            "success": True,
+            "result": f"Successfully created {params['count']} leads for {params['business_type']} in {params['location']}",
+            "details": result,
+            "query": query
+        }
+    
+    def _outreach_intent(self, query: str, parameters: Dict[str, Any]) -> Dict:
+        """Run an outreach campaign for the query"""
+        campaign = self.run_outreach_campaign(query)
+        return {
+            "success": campaign.get("success", False),
+            "result": campaign,
+            "query": query
+        }
+    
+    def _stats_intent(self, query: str, parameters: Dict[str, Any]) -> Dict:
+        """Report lead statistics for the query, pretty-printed for the user"""
+        try:
+            return {
+                "success": True,
+                "result": _dumps(self._collect_stats(), indent=True),
+                "query": query
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Error getting stats: {str(e)}",
+                "query": query
+            }
+    
     def _direct_lead_creation(self, query: str) -> Dict:
         """Direct lead creation bypassing LangChain agent"""
         try:
-            print("\n🔄 Using direct lead creation method...")
+            if self.verbose:
+                print("\n🔄 Using direct lead creation method...")
             
             # Parse query for parameters
             count = 5
@@ -951,24 +1509,25 @@ Question: {input}
             location = "San Francisco"
             
             # Extract count
-            count_match = re.search(r'(\d+)', query)
+            count_match = _COUNT_RE.search(query)
             if count_match:
                 count = int(count_match.group(1))
             
             # Extract business type
-            if 'software' in query.lower():
-                business_type = "software companies"
-            elif 'marketing' in query.lower():
-                business_type = "marketing agencies"
-            elif 'healthcare' in query.lower():
-                business_type = "healthcare companies"
+            query_lower = query.lower()
+            for keyword, business in _DIRECT_BUSINESS_TYPES:
+                if keyword in query_lower:
+                    business_type = business
+                    break
             
             # Extract location
-            location_match = re.search(r'in\s+([^,\n]+)', query, re.IGNORECASE)
+            location_match = _LOCATION_RE.search(query)
             if location_match:
                 location = location_match.group(1).strip()
             
-            print(f"📊 Parameters: {count} {business_type} in {location}")
+            self.logger.debug("Direct lead creation parameters: %d %s in %s", count, business_type, location)
+            if self.verbose:
+                print(f"📊 Parameters: {count} {business_type} in {location}")
             
             # Create leads using lead agent
             result = self.lead_agent.create_leads(
@@ -977,6 +1536,7 @@ Question: {input}
                 count=count,
                 generate_personalization=True
             )
+            self.invalidate_lead_cache()
             
             return {
                 "success": True,
@@ -1,14 +1,21 @@
+import sys
 import json
 import logging
 from typing import List, Dict, Optional, Union
 from dataclasses import dataclass
-from frappeclient import FrappeClient
+from collections import defaultdict
+from operator import itemgetter
+from concurrent.futures import ThreadPoolExecutor
+from services.frappe_async import create_frappe_client
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-@dataclass
+# dataclass(slots=...) needs Python 3.10+; older interpreters keep a regular __dict__
+_DATACLASS_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+@dataclass(frozen=True, **_DATACLASS_SLOTS)
 class FrappeApp:
     """Represents a Frappe application with its details."""
     name: str
@@ -25,47 +32,86 @@ class FrappeAppsDetector:
         self.password = password
         self.client = None
         self.logger = logger
+        # Per-connection caches of site metadata, reset by connect()
+        self._module_map = None
+        self._modules_by_app = None
+        self._all_doctypes = None
 
     def connect(self) -> bool:
         try:
-            self.client = FrappeClient(self.site_url, self.username, self.password)
+            # Pooled, retrying session shared by the sequential and parallel metadata queries
+            self.client = create_frappe_client(self.site_url, self.username, self.password)
+            self._module_map = None
+            self._modules_by_app = None
+            self._all_doctypes = None
             logger.info(f"Successfully connected to {self.site_url}")
             return True
         except Exception as e:
             logger.error(f"Failed to connect to Frappe site: {str(e)}")
             return False
 
+    DOCTYPE_FIELDS = ["name", "module", "app_name", "custom", "istable"]
+
+    # Page length for queries that need every row. FrappeClient.get_list omits the limit
+    # when limit_page_length is 0, and the server then returns its default of 20 rows.
+    ALL_ROWS = 100000
+
     def _get_all_doctypes_paginated(self) -> List[Dict]:
-        """Get all doctypes using pagination."""
-        all_doctypes = []
-        start = 0
-        page_size = 200
-        while True:
-            doctypes_page = self.client.get_list(
+        """Get all doctypes with parallel pagination, cached for the current connection."""
+        if self._all_doctypes is None:
+            self._all_doctypes = self._get_doctypes_in_pages()
+        return self._all_doctypes
+
+    def _get_doctypes_in_pages(self, page_size: int = 200, max_workers: int = 8) -> List[Dict]:
+        """Fetch DocType pages concurrently, max_workers pages at a time, until a short page."""
+        def fetch_page(start: int) -> List[Dict]:
+            return self.client.get_list(
                 "DocType",
-                fields=["name", "module", "app_name", "custom", "istable"],
+                fields=self.DOCTYPE_FIELDS,
                 limit_start=start,
                 limit_page_length=page_size
             )
-            if not doctypes_page:
-                break
-            all_doctypes.extend(doctypes_page)
-            start += page_size
-        return all_doctypes
+
+        all_doctypes = fetch_page(0)
+        if len(all_doctypes) < page_size:
+            return all_doctypes
+        start = page_size
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while True:
+                starts = range(start, start + page_size * max_workers, page_size)
+                for page in executor.map(fetch_page, starts):
+                    all_doctypes.extend(page)
+                    if len(page) < page_size:
+                        return all_doctypes
+                start += page_size * max_workers
 
     def _get_module_app_mapping(self) -> Dict[str, str]:
-        """Fetch accurate module-to-app mapping from Module Def."""
+        """Fetch accurate module-to-app mapping from Module Def, cached for the current connection."""
+        if self._module_map is not None:
+            return self._module_map
         try:
             modules = self.client.get_list(
                 "Module Def",
                 fields=["name", "app_name"],
-                limit_page_length=0
+                limit_page_length=self.ALL_ROWS
             )
-            return {m["name"]: m["app_name"] for m in modules if m.get("app_name")}
+            self._module_map = {m["name"]: m["app_name"] for m in modules if m.get("app_name")}
+            return self._module_map
         except Exception as e:
             logger.warning(f"Failed to fetch Module Def records: {str(e)}")
             return {}
 
+    def _get_modules_by_app(self) -> Dict[str, List[str]]:
+        """Reverse of the module-to-app mapping, built once per connection."""
+        if self._modules_by_app is not None:
+            return self._modules_by_app
+        modules_by_app = defaultdict(list)
+        for module, app_name in self._get_module_app_mapping().items():
+            modules_by_app[app_name].append(module)
+        if self._module_map is not None:
+            self._modules_by_app = modules_by_app
+        return modules_by_app
+
     def _infer_app_from_module(self, module_name: str, module_to_app_map: Dict[str, str]) -> str:
         """Infer app name from module name using the accurate mapping."""
         return module_to_app_map.get(module_name, module_name.lower().replace(" ", "_"))
@@ -77,37 +123,36 @@ class FrappeAppsDetector:
             doctypes = self.client.get_list(
                 "DocType",
                 fields=["name", "module", "app_name", "custom"],
-                limit_page_length=0
+                limit_page_length=self.ALL_ROWS
             )
         except Exception:
             # If app_name field is not available, try without it
             doctypes = self.client.get_list(
                 "DocType",
                 fields=["name", "module", "custom"],
-                limit_page_length=0
+                limit_page_length=self.ALL_ROWS
             )
 
-        apps = []
-        app_names = set()
+        apps: Dict[str, FrappeApp] = {}
         module_to_app_map = self._get_module_app_mapping()
 
         for doctype in doctypes:
-            app_name = doctype.get("app_name", "").strip()
+            app_name = (doctype.get("app_name") or "").strip()
             if not app_name:
-                module = doctype.get("module", "").strip()
+                module = (doctype.get("module") or "").strip()
                 if module:
                     app_name = self._infer_app_from_module(module, module_to_app_map)
 
-            if app_name and app_name not in app_names:
-                app_names.add(app_name)
-                apps.append(FrappeApp(
+            # First doctype seen for an app decides is_custom, as before
+            if app_name and app_name not in apps:
+                apps[app_name] = FrappeApp(
                     name=app_name,
                     title=app_name.replace("_", " ").title(),
                     version="Unknown",
                     is_custom=bool(doctype.get("custom", 0))
-                ))
+                )
 
-        return apps
+        return list(apps.values())
 
     def _get_all_doctypes_by_app(self) -> Dict[str, List[Dict]]:
         """Get all doctypes grouped by their parent app."""
@@ -123,28 +168,26 @@ class FrappeAppsDetector:
             module_to_app_map = self._get_module_app_mapping()
 
             # Group doctypes by app
-            doctypes_by_app = {}
+            doctypes_by_app = defaultdict(list)
             for doctype in all_doctypes:
-                module = doctype.get("module", "").strip()
-                if module:
-                    # Infer app from module
-                    app_name = self._infer_app_from_module(module, module_to_app_map)
-                    if app_name not in doctypes_by_app:
-                        doctypes_by_app[app_name] = []
-
-                    doctype_info = {
-                        "name": doctype.get("name", ""),
-                        "module": module,
-                        "is_custom": bool(doctype.get("custom", 0)),
-                        "is_table": bool(doctype.get("istable", 0))
-                    }
-                    doctypes_by_app[app_name].append(doctype_info)
+                module = (doctype.get("module") or "").strip()
+                if not module:
+                    continue
+                # Infer app from module
+                app_name = self._infer_app_from_module(module, module_to_app_map)
+                doctypes_by_app[app_name].append({
+                    "name": doctype.get("name", ""),
+                    "module": module,
+                    "is_custom": bool(doctype.get("custom", 0)),
+                    "is_table": bool(doctype.get("istable", 0))
+                })
 
             # Sort doctypes within each app
-            for app_name in doctypes_by_app:
-                doctypes_by_app[app_name].sort(key=lambda x: x["name"])
+            by_name = itemgetter("name")
+            for doctypes in doctypes_by_app.values():
+                doctypes.sort(key=by_name)
 
-            return doctypes_by_app
+            return dict(doctypes_by_app)
         except Exception as e:
             logger.error(f"Error getting doctypes by app: {str(e)}")
             return {}
@@ -236,14 +279,8 @@ class FrappeAppsDetector:
                 "version": "Unknown"
             }
 
-            # Get modules for this app
-            modules = self.client.get_list(
-                "Module Def",
-                filters={"app_name": app_name},
-                fields=["name", "custom"],
-                limit_page_length=0
-            )
-            app_info["modules"] = [m["name"] for m in modules]
+            # Get modules for this app from the cached Module Def index
+            app_info["modules"] = list(self._get_modules_by_app().get(app_name, []))
 
             # Get detailed doctypes for this app
             doctypes = self.get_doctypes_for_app(app_name)
@@ -273,7 +310,7 @@ class FrappeAppsDetector:
                 "DocType",
                 filters={"app_name": app_name},
                 fields=["name", "module", "custom", "istable", "is_submittable"],
-                limit_page_length=0
+                limit_page_length=self.ALL_ROWS
             )
             return doctypes
         except Exception as e:
@@ -1,12 +1,22 @@
 import os
+import atexit
 import json
 import logging
 import uuid
-import requests
-from flask import Flask, request, jsonify, session, send_from_directory
+import time
+import hashlib
+import threading
+import functools
+import mimetypes
+from concurrent.futures import Future, ThreadPoolExecutor
+from flask import Flask, Response, request, jsonify, session, send_from_directory, g, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional
+from services.agent_cache import AgentCache, ShardedAgentCache
+from services.http_session import create_http_session
+from services.rate_limiter import FixedWindowLimiter
 
 # Load environment variables from .env file
 try:
@@ -18,7 +28,7 @@ except ImportError:
 # --- START: Import AidaERPNextAgent and SessionManager ---
 try:
     from services.aida_agent import AidaERPNextAgent, MongoMemoryManager
-    from session_manager import SessionManager
+    from session_manager import SessionManager, ChatMessageWriter
     from auth_manager import AuthManager
     # Re-evaluate MONGODB_AVAILABLE based on current environment for the API server
     try:
@@ -45,19 +55,61 @@ except ImportError as e:
         def __init__(self, *args, **kwargs): pass
         def create_session(self, *args, **kwargs): return str(uuid.uuid4())
         def get_session(self, *args, **kwargs): return None
+    class ChatMessageWriter:
+        def __init__(self, *args, **kwargs): pass
+        def put(self, *args, **kwargs): pass
+        def flush(self): pass
     class AuthManager:
         def __init__(self, *args, **kwargs): pass
         def authenticate_user(self, *args, **kwargs): return (False, None, "Auth not available")
     MONGODB_AVAILABLE = False
 # --- END: Import AidaERPNextAgent and SessionManager ---
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from flask_compress import Compress
+except ImportError:
+    Compress = None
+
+
+class ORJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson, producing the same output as the default one.
+
+    Keys stay sorted and datetimes, Decimals etc. still go through Flask's default()
+    so responses keep their existing format.
+    """
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
 
 # Configure logging for the Flask app
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 flask_logger = logging.getLogger('flask_server')
-flask_logger.setLevel(logging.INFO)
+# Per-request success logs are at DEBUG; set LOG_LEVEL=DEBUG to see them
+flask_logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
 
 app = Flask(__name__)
+if orjson is not None:
+    app.json = ORJSONProvider(app)
+if Compress is not None:
+    # Chat history and saved chats are large, repetitive JSON; compress anything over 1 KB.
+    # Disable compression at the reverse proxy to avoid double-compressing.
+    app.config.setdefault("COMPRESS_ALGORITHM", ["br", "gzip"])
+    app.config.setdefault("COMPRESS_MIN_SIZE", 1024)
+    Compress(app)
 CORS(app, origins="*")  # Allow all origins
 app.secret_key = os.getenv("FLASK_SECRET_KEY", "supersecretkey_aida_erpnext_agent") # IMPORTANT: Change this in production!
 
@@ -66,17 +118,200 @@ mongo_uri = os.getenv("MONGODB_URI", "mongodb://localhost:27017/")
 db_name = os.getenv("MONGODB_DB_NAME", "aida_platform")
 session_manager = SessionManager(mongo_uri=mongo_uri, db_name=db_name)
 
+# Chat history is written off the request path, in batched inserts. The writer thread
+# starts on first use in each process, and the exit flush only runs where it started.
+chat_writer = ChatMessageWriter(session_manager)
+atexit.register(chat_writer.flush)
+
 # Initialize authentication manager
 auth_manager = AuthManager(mongo_uri=mongo_uri, db_name=db_name)
 
-# In-memory store for active AidaERPNextAgent instances, keyed by session_id
-# Sessions are now persistent, but agents are still created on-demand
-active_agents: Dict[str, AidaERPNextAgent] = {}
-
-# Clear all sessions on server restart to ensure fresh state
-session_manager.clear_all_sessions()
-flask_logger.info("All sessions cleared on server restart")
+# Keep-alive connection pool for outbound calls to ERPNext, shared by all requests
+http_session = create_http_session(pool_connections=20, pool_maxsize=50)
+atexit.register(http_session.close)
+# (connect, read) seconds: fail fast on an unreachable ERPNext host instead of holding a thread
+SESSION_VALIDATION_TIMEOUT = (3.05, 7)
+# get_logged_user is already the cheapest check that proves the sid is live: frappe.ping
+# also answers 200 for Guest, so an expired sid would pass. Repeat logins within
+# SESSION_VALIDATION_TTL skip the request entirely (see _validated_sessions below).
+SESSION_VALIDATION_PATH = "/api/method/frappe.auth.get_logged_user"
+SESSION_VALIDATION_HEADERS = {
+    'Content-Type': 'application/json',
+    'User-Agent': 'AIDA-API-Server'
+}
+
+def _close_agent(session_id: str, agent: Any) -> None:
+    """Release an evicted agent's clients, if it exposes a close() method"""
+    if isinstance(agent, Future):
+        # Still being built in the background: close it once construction finishes
+        agent.add_done_callback(lambda done: done.exception() or _close_agent(session_id, done.result()))
+        return
+    close = getattr(agent, 'close', None)
+    if callable(close):
+        try:
+            close()
+        except Exception as e:
+            flask_logger.warning(f"Failed to close agent for session {session_id}: {e}")
+    flask_logger.debug("Evicted idle agent for session %s", session_id)
+
+# Agents used by /create_leads, reused across calls with the same credentials so
+# their pooled ERPNext and Google Maps connections stay warm between requests
+lead_agents = AgentCache(
+    maxsize=int(os.getenv('LEAD_AGENT_CACHE_MAX', '64')),
+    ttl=float(os.getenv('LEAD_AGENT_CACHE_TTL', '300')),
+    on_evict=_close_agent
+)
+
+def _lead_agent_key(erpnext_url: str, username: str, password: str, google_api_key: str) -> str:
+    """Cache key covering every credential, so a cached agent is only reused by the same login"""
+    return hashlib.sha256("|".join((erpnext_url, username, password, google_api_key)).encode()).hexdigest()
+
+# Recently validated Frappe sessions: sha256(url|user|sid) -> validation time (monotonic).
+# Only successful validations are cached, so a rejected sid is always rechecked.
+SESSION_VALIDATION_TTL = float(os.getenv('SESSION_VALIDATION_TTL', '60'))
+SESSION_VALIDATION_CACHE_SIZE = 10000
+_validated_sessions: Dict[bytes, float] = {}
+_validated_sessions_lock = threading.Lock()
+
+def _session_validation_key(erpnext_url: str, api_key: str, api_secret: str) -> bytes:
+    return hashlib.sha256(f"{erpnext_url}|{api_key}|{api_secret}".encode()).digest()
+
+def _is_session_recently_validated(key: bytes) -> bool:
+    with _validated_sessions_lock:
+        validated_at = _validated_sessions.get(key)
+        if validated_at is None:
+            return False
+        if time.monotonic() - validated_at < SESSION_VALIDATION_TTL:
+            return True
+        del _validated_sessions[key]
+        return False
+
+def _remember_session_validation(key: bytes) -> None:
+    with _validated_sessions_lock:
+        if key not in _validated_sessions and len(_validated_sessions) >= SESSION_VALIDATION_CACHE_SIZE:
+            _validated_sessions.pop(next(iter(_validated_sessions)))
+        _validated_sessions[key] = time.monotonic()
+
+# Mocxha logins whose "Hello" connection test passed recently:
+# blake2b(url|user|password) -> probe time (monotonic). Raw passwords never enter the map.
+CONNECT_PROBE_TTL = float(os.getenv('CONNECT_PROBE_TTL', '300'))
+CONNECT_PROBE_CACHE_SIZE = 1024
+_connect_probes: Dict[str, float] = {}
+_connect_probes_lock = threading.Lock()
+
+def _connect_probe_key(erpnext_url: str, username: str, password: str) -> str:
+    return hashlib.blake2b(f"{erpnext_url}|{username}|{password}".encode(), digest_size=16).hexdigest()
+
+def _is_connection_recently_probed(key: str) -> bool:
+    with _connect_probes_lock:
+        probed_at = _connect_probes.get(key)
+        if probed_at is None:
+            return False
+        if time.monotonic() - probed_at < CONNECT_PROBE_TTL:
+            return True
+        del _connect_probes[key]
+        return False
+
+def _remember_connection_probe(key: str) -> None:
+    with _connect_probes_lock:
+        if key not in _connect_probes and len(_connect_probes) >= CONNECT_PROBE_CACHE_SIZE:
+            _connect_probes.pop(next(iter(_connect_probes)))
+        _connect_probes[key] = time.monotonic()
+
+# Logged-in agents used for the connection test, keyed by _connect_probe_key, so a
+# repeat test reuses the ERPNext login and LLM client instead of building new ones
+probe_agents = AgentCache(
+    maxsize=int(os.getenv('PROBE_AGENT_CACHE_MAX', '64')),
+    ttl=float(os.getenv('PROBE_AGENT_CACHE_TTL', '900')),
+    on_evict=_close_agent
+)
+
+def _probe_agent(probe_key: str, **kwargs) -> Any:
+    """Return the pooled connection-test agent for these credentials, creating it if needed"""
+    agent = probe_agents.get(probe_key)
+    if agent is None:
+        agent = AidaERPNextAgent(mongo_uri=None, session_id="test", http_session=http_session, **kwargs)
+        probe_agents[probe_key] = agent
+    return agent
+
+# Per-IP request limits: 10 chat messages per minute, 5 lead creation runs per 5 minutes
+chat_rate_limiter = FixedWindowLimiter(limit=10, window=60)
+lead_rate_limiter = FixedWindowLimiter(limit=5, window=300)
 
+# In-memory store for active AidaERPNextAgent instances, keyed by session_id
+# Sessions are now persistent, but agents are still created on-demand.
+# Bounded LRU: agents idle for AGENT_CACHE_TTL seconds, or beyond AGENT_CACHE_MAX, are evicted.
+# Sharded so connect and chat requests for different sessions do not queue on one lock.
+active_agents = ShardedAgentCache(
+    maxsize=int(os.getenv('AGENT_CACHE_MAX', '512')),
+    ttl=float(os.getenv('AGENT_CACHE_TTL', '1800')),
+    on_evict=_close_agent,
+    shards=int(os.getenv('AGENT_CACHE_SHARDS', '16'))
+)
+
+# Agents for already-verified credentials are built in the background so the connect
+# endpoints can answer straight away; /chat waits on the pending Future if needed.
+agent_builder = ThreadPoolExecutor(
+    max_workers=int(os.getenv('AGENT_BUILD_WORKERS', '8')),
+    thread_name_prefix='agent-build'
+)
+AGENT_BUILD_TIMEOUT = float(os.getenv('AGENT_BUILD_TIMEOUT', '30'))
+
+# The caches only notice idle agents when they are touched, so sweep them periodically
+# to close agents that would otherwise sit until the next request
+AGENT_SWEEP_INTERVAL = float(os.getenv('AGENT_SWEEP_INTERVAL', '60'))
+
+def _sweep_idle_agents() -> None:
+    while True:
+        time.sleep(AGENT_SWEEP_INTERVAL)
+        for cache in (active_agents, lead_agents, probe_agents):
+            try:
+                cache.sweep()
+            except Exception as e:
+                flask_logger.warning(f"Idle agent sweep failed: {e}")
+
+def _start_agent_sweeper() -> None:
+    threading.Thread(target=_sweep_idle_agents, name='agent-sweeper', daemon=True).start()
+
+_start_agent_sweeper()
+# Threads do not survive fork: restart the sweeper in Gunicorn workers when the app is preloaded
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_start_agent_sweeper)
+
+def start_agent(session_id: str, **kwargs) -> Future:
+    """Build an AidaERPNextAgent in the background and register it for the session"""
+    future = agent_builder.submit(AidaERPNextAgent, session_id=session_id, http_session=http_session, **kwargs)
+    active_agents[session_id] = future
+    return future
+
+def resolve_agent(session_id: str) -> Optional[Any]:
+    """Return the session's agent, waiting for a background build to finish"""
+    agent = active_agents.get(session_id)
+    if not isinstance(agent, Future):
+        return agent
+    try:
+        built = agent.result(timeout=AGENT_BUILD_TIMEOUT)
+    except Exception as e:
+        flask_logger.error(f"Background agent build failed for session {session_id}: {e}")
+        if agent.done() and active_agents.get(session_id) is agent:
+            active_agents.pop(session_id)
+        return None
+    # A plain assignment would pass the Future to _close_agent, closing the agent it built
+    active_agents.replace(session_id, agent, built)
+    return built
+
+# Sessions survive restarts: SessionManager already prunes sessions idle for 30 days
+# (and their messages) when it starts, and clients whose agent is gone reconnect via /init_session.
+
+
+def missing_fields_error(fields: Dict[str, Any]):
+    """Return a 400 response naming the empty required fields, or None if all are present"""
+    missing_fields = [name for name, value in fields.items() if not value]
+    if not missing_fields:
+        return None
+    error_msg = f"Missing required fields: {', '.join(missing_fields)}"
+    flask_logger.error(error_msg)
+    return jsonify({"error": error_msg}), 400
 
 @app.route('/init_session', methods=['POST'])
 def init_session():
@@ -91,7 +326,7 @@ def init_session():
     user_agent = request.headers.get('User-Agent', '')
     ip_address = request.remote_addr
     
-    flask_logger.info(f"Init session request from: {ip_address}, Origin: {origin}")
+    flask_logger.debug("Init session request from: %s, Origin: %s", ip_address, origin)
     
     erpnext_url = data.get('mocxha_url') or data.get('erpnext_url')  # Support both new and legacy field names
     username = data.get('username')
@@ -101,19 +336,12 @@ def init_session():
     restore_session = data.get('restore_session', True)  # Default to trying to restore
 
     # Security: Don't log sensitive data
-    flask_logger.info(f"Session request - URL: {erpnext_url}, Username: {username}, Restore: {restore_session}")
+    flask_logger.debug("Session request - URL: %s, Username: %s, Restore: %s", erpnext_url, username, restore_session)
 
     # Validate required fields
-    missing_fields = []
-    if not erpnext_url:
-        missing_fields.append("mocxha_url")
-    if not username:
-        missing_fields.append("username")
-    
-    if missing_fields:
-        error_msg = f"Missing required fields: {', '.join(missing_fields)}"
-        flask_logger.error(error_msg)
-        return jsonify({"error": error_msg}), 400
+    error = missing_fields_error({"mocxha_url": erpnext_url, "username": username})
+    if error:
+        return error
     
     # Validate Google API key from environment
     if not google_api_key:
@@ -129,33 +357,36 @@ def init_session():
         if not all([api_key, api_secret]):
             return jsonify({"error": "API key and secret required for session token authentication."}), 400
         
-        # Validate the Frappe session
-        try:
-            session_validation_url = f"{erpnext_url}/api/method/frappe.auth.get_logged_user"
-            headers = {
-                'Cookie': f'sid={api_secret}',
-                'Content-Type': 'application/json',
-                'User-Agent': 'AIDA-API-Server'
-            }
+        # Validate the Frappe session, unless the same sid was validated moments ago
+        validation_key = _session_validation_key(erpnext_url, api_key, api_secret)
+        if _is_session_recently_validated(validation_key):
+            flask_logger.debug("Session validation cached for user: %s", api_key)
+            username = api_key
+            password = api_secret
+        else:
+            try:
+                session_validation_url = erpnext_url + SESSION_VALIDATION_PATH
+                headers = {'Cookie': f'sid={api_secret}', **SESSION_VALIDATION_HEADERS}
             
-            response = requests.get(session_validation_url, headers=headers, timeout=10)
+                response = http_session.get(session_validation_url, headers=headers, timeout=SESSION_VALIDATION_TIMEOUT)
             
-            if response.status_code == 200:
-                user_data = response.json()
-                if user_data.get('message') == api_key:
-                    flask_logger.info(f"Session validated for user: {api_key}")
-                    username = api_key
-                    password = api_secret
+                if response.status_code == 200:
+                    user_data = response.json()
+                    if user_data.get('message') == api_key:
+                        flask_logger.info(f"Session validated for user: {api_key}")
+                        username = api_key
+                        password = api_secret
+                        _remember_session_validation(validation_key)
+                    else:
+                        flask_logger.warning(f"Session validation failed for user: {api_key}")
+                        return jsonify({"error": "Session validation failed. Invalid user."}), 401
                 else:
-                    flask_logger.warning(f"Session validation failed for user: {api_key}")
-                    return jsonify({"error": "Session validation failed. Invalid user."}), 401
-            else:
-                flask_logger.warning(f"Session validation returned status: {response.status_code}")
-                return jsonify({"error": "Session validation failed. Please log in again."}), 401
+                    flask_logger.warning(f"Session validation returned status: {response.status_code}")
+                    return jsonify({"error": "Session validation failed. Please log in again."}), 401
                 
-        except Exception as e:
-            flask_logger.error(f"Session validation error: {e}")
-            return jsonify({"error": "Could not validate session. Please try again."}), 500
+            except Exception as e:
+                flask_logger.error(f"Session validation error: {e}")
+                return jsonify({"error": "Could not validate session. Please try again."}), 500
     
     # Security: Validate Google API key format from environment
     if len(google_api_key) < 20:
@@ -178,16 +409,15 @@ def init_session():
                     # Create agent if not already active
                     if existing_session_id not in active_agents:
                         session_data = session_manager.get_session(existing_session_id)
-                        agent = AidaERPNextAgent(
+                        start_agent(
+                            existing_session_id,
                             erpnext_url=session_data.erpnext_url,
                             username=session_data.username,
                             password=password,  # Use actual password, not hash
                             google_api_key=google_api_key,  # Use actual key, not hash
                             mongo_uri=None,  # Using SQLite now
-                            session_id=existing_session_id,
                             site_base_url=session_data.site_base_url
                         )
-                        active_agents[existing_session_id] = agent
                     
                     flask_logger.info(f"Restored session {existing_session_id} for user: {username}")
                     return jsonify({
@@ -250,53 +480,37 @@ def create_leads():
     count = data.get('count', 10)
     
     # Validate required fields
-    missing_fields = []
-    if not erpnext_url:
-        missing_fields.append("mocxha_url")
-    if not username:
-        missing_fields.append("username")
-    if not password:
-        missing_fields.append("password")
-    if not google_api_key:
-        missing_fields.append("google_api_key")
-    if not business_type:
-        missing_fields.append("business_type")
-    if not location:
-        missing_fields.append("location")
-    
-    if missing_fields:
-        error_msg = f"Missing required fields: {', '.join(missing_fields)}"
-        flask_logger.error(error_msg)
-        return jsonify({"error": error_msg}), 400
+    error = missing_fields_error({
+        "mocxha_url": erpnext_url,
+        "username": username,
+        "password": password,
+        "google_api_key": google_api_key,
+        "business_type": business_type,
+        "location": location
+    })
+    if error:
+        return error
     
     # Security: Rate limiting check (basic)
     client_ip = request.remote_addr
-    current_time = datetime.now()
-    
-    if not hasattr(app, 'lead_rate_limits'):
-        app.lead_rate_limits = {}
-    
-    if client_ip in app.lead_rate_limits:
-        last_requests = app.lead_rate_limits[client_ip]
-        recent_requests = [t for t in last_requests if (current_time - t).seconds < 300]  # 5 minutes
-        if len(recent_requests) >= 5:  # Max 5 lead creation requests per 5 minutes
-            flask_logger.warning(f"Lead creation rate limit exceeded for IP: {client_ip}")
-            return jsonify({"error": "Rate limit exceeded. Please try again later."}), 429
-        app.lead_rate_limits[client_ip] = recent_requests + [current_time]
-    else:
-        app.lead_rate_limits[client_ip] = [current_time]
+    if not lead_rate_limiter.allow(client_ip):
+        flask_logger.warning(f"Lead creation rate limit exceeded for IP: {client_ip}")
+        return jsonify({"error": "Rate limit exceeded. Please try again later."}), 429
     
     try:
-        # Create a temporary agent instance for lead creation
-        temp_session_id = str(uuid.uuid4())
-        agent = AidaERPNextAgent(
-            erpnext_url=erpnext_url,
-            username=username,
-            password=password,
-            google_api_key=google_api_key,
-            mongo_uri=None,  # No persistent memory needed for lead creation
-            session_id=temp_session_id
-        )
+        # Reuse the lead creation agent for these credentials, creating it on first use
+        agent_key = _lead_agent_key(erpnext_url, username, password, google_api_key)
+        agent = lead_agents.get(agent_key)
+        if agent is None:
+            agent = AidaERPNextAgent(
+                erpnext_url=erpnext_url,
+                username=username,
+                password=password,
+                google_api_key=google_api_key,
+                mongo_uri=None,  # No persistent memory needed for lead creation
+                session_id=str(uuid.uuid4())
+            )
+            lead_agents[agent_key] = agent
         
         # Use the lead creation functionality
         if not agent.lead_creation_agent:
@@ -308,7 +522,7 @@ def create_leads():
             count=count
         )
         
-        flask_logger.info(f"Lead creation completed - Type: {business_type}, Location: {location}, Count: {count}")
+        flask_logger.debug("Lead creation completed - Type: %s, Location: %s, Count: %s", business_type, location, count)
         return jsonify({"success": True, "result": result}), 200
         
     except Exception as e:
@@ -326,21 +540,9 @@ def chat_with_agent():
 
     # Security: Rate limiting check (basic)
     client_ip = request.remote_addr
-    current_time = datetime.now()
-    
-    # Basic rate limiting: max 10 requests per minute per IP
-    if not hasattr(app, 'rate_limits'):
-        app.rate_limits = {}
-    
-    if client_ip in app.rate_limits:
-        last_requests = app.rate_limits[client_ip]
-        recent_requests = [t for t in last_requests if (current_time - t).seconds < 60]
-        if len(recent_requests) >= 10:
-            flask_logger.warning(f"Rate limit exceeded for IP: {client_ip}")
-            return jsonify({"error": "Rate limit exceeded. Please try again later."}), 429
-        app.rate_limits[client_ip] = recent_requests + [current_time]
-    else:
-        app.rate_limits[client_ip] = [current_time]
+    if not chat_rate_limiter.allow(client_ip):
+        flask_logger.warning(f"Rate limit exceeded for IP: {client_ip}")
+        return jsonify({"error": "Rate limit exceeded. Please try again later."}), 429
 
     if not session_id or not user_input:
         return jsonify({"error": "Session ID and user input are required."}), 400
@@ -359,7 +561,7 @@ def chat_with_agent():
     session_manager.update_session_access(session_id)
 
     # Get or create agent instance
-    agent = active_agents.get(session_id)
+    agent = resolve_agent(session_id)
     if not agent:
         # Session exists but agent not in memory - recreate it
         # This can happen with multiple Gunicorn workers or after server restart
@@ -377,13 +579,13 @@ def chat_with_agent():
         
         # Store in session manager's chat history (in addition to agent's memory)
         # This provides redundant storage and better persistence
-        session_manager.store_chat_message(
+        chat_writer.put(
             session_id=session_id,
             user_message=user_input,
             ai_response=response
         )
         
-        flask_logger.info(f"Chat - Session: {session_id}, User message length: {len(user_input)}")
+        flask_logger.debug("Chat - Session: %s, User message length: %d", session_id, len(user_input))
         return jsonify({"session_id": session_id, "response": response}), 200
         
     except Exception as e:
@@ -391,7 +593,7 @@ def chat_with_agent():
         error_response = "An error occurred. Please try again."
         
         # Store error in chat history too
-        session_manager.store_chat_message(
+        chat_writer.put(
             session_id=session_id,
             user_message=user_input,
             ai_response=error_response
@@ -412,41 +614,24 @@ def get_chat_history(session_id):
     if not session_data:
         return jsonify({"error": "Invalid session."}), 404
     
-    try:
-        # Get chat history from session manager
-        limit = request.args.get('limit', 20, type=int)
-        history = session_manager.get_chat_history(session_id, limit=limit)
-        
-        # Format history for frontend
-        formatted_history = []
-        i = 0
-        while i < len(history):
-            msg = history[i]
-            if msg["role"] == "user":
-                user_message = msg["content"]
-                ai_response = ""
-                
-                # Look for the corresponding AI response
-                if i + 1 < len(history) and history[i + 1]["role"] == "assistant":
-                    ai_response = history[i + 1]["content"]
-                    i += 1  # Skip the AI message in next iteration
-                
-                formatted_history.append({
-                    "timestamp": msg["timestamp"],
-                    "user_message": user_message,
-                    "ai_response": ai_response
-                })
-            i += 1
-        
-        return jsonify({
-            "session_id": session_id,
-            "history": formatted_history,
-            "count": len(formatted_history)
-        }), 200
-        
-    except Exception as e:
-        flask_logger.error(f"Error retrieving chat history for session {session_id}: {e}")
-        return jsonify({"error": "Failed to retrieve chat history."}), 500
+    limit = request.args.get('limit', 20, type=int)
+    history = session_manager.iter_chat_history(session_id, limit=limit)
+    dumps = app.json.dumps
+    
+    def generate():
+        # Stream the same document jsonify would build, one exchange at a time
+        yield '{"session_id":' + dumps(session_id) + ',"history":['
+        count = 0
+        try:
+            # Format history for frontend: each user message paired with the AI response right after it
+            for item in SessionManager.pair_chat_history(history):
+                yield ("," if count else "") + dumps(item)
+                count += 1
+        except Exception as e:
+            flask_logger.error(f"Error retrieving chat history for session {session_id}: {e}")
+        yield '],"count":' + str(count) + '}'
+    
+    return Response(stream_with_context(generate()), mimetype='application/json')
 
 @app.route('/clear_session', methods=['POST'])
 def clear_session():
@@ -460,8 +645,7 @@ def clear_session():
         return jsonify({"error": "Session ID is required."}), 400
 
     # Remove from active agents
-    if session_id in active_agents:
-        del active_agents[session_id]
+    if active_agents.pop(session_id) is not None:
         flask_logger.info(f"Active agent for session {session_id} cleared.")
     
     # Note: We don't delete the session from session_manager to preserve history
@@ -498,21 +682,117 @@ def session_status(session_id):
         flask_logger.error(f"Error checking session status: {str(e)}")
         return jsonify({"error": "Failed to check session status"}), 500
 
+BEARER_PREFIX = 'Bearer '
+
+# Active user sessions looked up recently: session_id -> (monotonic time, session).
+# Saves a database read per request for UIs that call several endpoints in a row.
+USER_SESSION_CACHE_TTL = float(os.getenv('USER_SESSION_CACHE_TTL', '30'))
+USER_SESSION_CACHE_SIZE = 5000
+_user_sessions: Dict[str, tuple] = {}
+_user_sessions_lock = threading.Lock()
+
+def cached_get_session(session_id: str):
+    """auth_manager.get_session, served from memory for USER_SESSION_CACHE_TTL seconds"""
+    now = time.monotonic()
+    with _user_sessions_lock:
+        cached = _user_sessions.get(session_id)
+        if cached and now - cached[0] < USER_SESSION_CACHE_TTL:
+            return cached[1]
+    user_session = auth_manager.get_session(session_id)
+    if user_session:
+        with _user_sessions_lock:
+            if session_id not in _user_sessions and len(_user_sessions) >= USER_SESSION_CACHE_SIZE:
+                _user_sessions.pop(next(iter(_user_sessions)))
+            _user_sessions[session_id] = (now, user_session)
+    return user_session
+
+# Admin sessions get the same treatment; admin pages poll several /admin endpoints per view
+ADMIN_SESSION_CACHE_TTL = float(os.getenv('ADMIN_SESSION_CACHE_TTL', '30'))
+ADMIN_SESSION_CACHE_SIZE = 1000
+_admin_sessions: Dict[str, tuple] = {}
+_admin_sessions_lock = threading.Lock()
+
+def cached_get_admin_session(session_id: str, touch: bool = False):
+    """auth_manager.get_admin_session, served from memory for ADMIN_SESSION_CACHE_TTL seconds
+
+    With touch=True the session's activity is also updated, folded into the lookup on a miss.
+    """
+    now = time.monotonic()
+    with _admin_sessions_lock:
+        cached = _admin_sessions.get(session_id)
+    if cached and now - cached[0] < ADMIN_SESSION_CACHE_TTL:
+        if touch:
+            auth_manager.update_session_activity(session_id)
+        return cached[1]
+    if touch:
+        admin_session = auth_manager.touch_and_get_admin_session(session_id)
+    else:
+        admin_session = auth_manager.get_admin_session(session_id)
+    if admin_session:
+        with _admin_sessions_lock:
+            if session_id not in _admin_sessions and len(_admin_sessions) >= ADMIN_SESSION_CACHE_SIZE:
+                _admin_sessions.pop(next(iter(_admin_sessions)))
+            _admin_sessions[session_id] = (now, admin_session)
+    return admin_session
+
+def forget_session(session_id: str) -> None:
+    """Drop a session from the lookup caches after it is invalidated or changed"""
+    with _user_sessions_lock:
+        _user_sessions.pop(session_id, None)
+    with _admin_sessions_lock:
+        _admin_sessions.pop(session_id, None)
+
+def _bearer_token() -> Optional[str]:
+    """Session token from the Authorization header, or None when it is not a Bearer token"""
+    auth_header = request.headers.get('Authorization', '')
+    if not auth_header.startswith(BEARER_PREFIX):
+        return None
+    return auth_header[len(BEARER_PREFIX):].strip() or None
+
+def require_bearer(fn):
+    """Require an active user session; the token and session are stored on g for the view"""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        session_id = _bearer_token()
+        if not session_id:
+            return jsonify({"error": "Authentication required"}), 401
+        try:
+            user_session = cached_get_session(session_id)
+        except Exception as e:
+            flask_logger.error(f"Session lookup error: {e}")
+            return jsonify({"error": "Session validation failed"}), 500
+        if not user_session or not user_session.is_active:
+            return jsonify({"error": "Invalid session"}), 401
+        g.session_id = session_id
+        g.user_session = user_session
+        return fn(*args, **kwargs)
+    return wrapper
+
+def require_admin(fn):
+    """Require a valid admin session and record its activity; the session is stored on g for the view"""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        session_id = _bearer_token()
+        if not session_id:
+            return jsonify({"error": "No session provided"}), 401
+        try:
+            admin_session = cached_get_admin_session(session_id, touch=True)
+        except Exception as e:
+            flask_logger.error(f"Admin session lookup error: {e}")
+            return jsonify({"error": "Session validation failed"}), 500
+        if not admin_session:
+            return jsonify({"error": "Invalid or expired session"}), 401
+        g.session_id = session_id
+        g.admin_session = admin_session
+        return fn(*args, **kwargs)
+    return wrapper
+
 @app.route('/get_recent_chats', methods=['GET'])
+@require_bearer
 def get_recent_chats():
     """Get recent chats for the current user"""
     try:
-        # Check authentication
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({"error": "Authentication required"}), 401
-        
-        session_id = auth_header.split(' ')[1]
-        
-        # Get user session
-        session = auth_manager.get_session(session_id)
-        if not session or not session.is_active:
-            return jsonify({"error": "Invalid session"}), 401
+        session = g.user_session
         
         # Get chats using user_id
         chats = session_manager.get_recent_chats(user_id=session.user_id, limit=20)
@@ -522,20 +802,11 @@ def get_recent_chats():
         return jsonify({"error": "Failed to get recent chats"}), 500
 
 @app.route('/get_chat/<chat_id>', methods=['GET'])
+@require_bearer
 def get_chat(chat_id):
     """Get a specific chat by ID"""
     try:
-        # Check authentication
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({"error": "Authentication required"}), 401
-        
-        session_id = auth_header.split(' ')[1]
-        
-        # Get user session
-        session = auth_manager.get_session(session_id)
-        if not session or not session.is_active:
-            return jsonify({"error": "Invalid session"}), 401
+        session = g.user_session
         
         chat = session_manager.get_chat_by_id(chat_id, user_id=session.user_id)
         if chat:
@@ -547,21 +818,10 @@ def get_chat(chat_id):
         return jsonify({"error": "Failed to get chat"}), 500
 
 @app.route('/save_chat', methods=['POST'])
+@require_bearer
 def save_chat():
     """Save a new chat"""
     try:
-        # Check authentication
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({"error": "Authentication required"}), 401
-        
-        session_id = auth_header.split(' ')[1]
-        
-        # Get user session
-        session = auth_manager.get_session(session_id)
-        if not session or not session.is_active:
-            return jsonify({"error": "Invalid session"}), 401
-        
         data = request.get_json()
         mocxha_session_id = data.get('session_id')
         title = data.get('title', 'New Chat')
@@ -578,20 +838,11 @@ def save_chat():
         return jsonify({"error": "Failed to save chat"}), 500
 
 @app.route('/delete_chat/<chat_id>', methods=['DELETE'])
+@require_bearer
 def delete_chat(chat_id):
     """Delete a chat"""
     try:
-        # Check authentication
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({"error": "Authentication required"}), 401
-        
-        session_id = auth_header.split(' ')[1]
-        
-        # Get user session
-        session = auth_manager.get_session(session_id)
-        if not session or not session.is_active:
-            return jsonify({"error": "Invalid session"}), 401
+        session = g.user_session
         
         success = session_manager.delete_chat(chat_id, user_id=session.user_id)
         if success:
@@ -639,26 +890,19 @@ def login():
         return jsonify({"error": "Authentication failed"}), 500
 
 @app.route('/auth/check_session', methods=['GET'])
+@require_bearer
 def check_session():
     """Check if user session is valid"""
-    auth_header = request.headers.get('Authorization')
-    if not auth_header or not auth_header.startswith('Bearer '):
-        return jsonify({"error": "No valid session token"}), 401
-    
-    session_id = auth_header.split(' ')[1]
+    session = g.user_session
     
     try:
-        session = auth_manager.get_session(session_id)
-        if session and session.is_active:
-            # Update session activity
-            auth_manager.update_session_activity(session_id)
-            return jsonify({
-                "valid": True,
-                "user_id": session.user_id,
-                "username": session.username
-            })
-        else:
-            return jsonify({"error": "Invalid or expired session"}), 401
+        # Update session activity
+        auth_manager.update_session_activity(g.session_id)
+        return jsonify({
+            "valid": True,
+            "user_id": session.user_id,
+            "username": session.username
+        })
     except Exception as e:
         flask_logger.error(f"Session check error: {e}")
         return jsonify({"error": "Session validation failed"}), 500
@@ -666,34 +910,25 @@ def check_session():
 @app.route('/auth/logout', methods=['POST'])
 def logout():
     """User logout endpoint"""
-    auth_header = request.headers.get('Authorization')
-    if not auth_header or not auth_header.startswith('Bearer '):
+    session_id = _bearer_token()
+    if not session_id:
         return jsonify({"error": "No valid session token"}), 401
     
-    session_id = auth_header.split(' ')[1]
-    
     try:
         auth_manager.invalidate_session(session_id)
+        forget_session(session_id)
         return jsonify({"success": True, "message": "Logged out successfully"})
     except Exception as e:
         flask_logger.error(f"Logout error: {e}")
         return jsonify({"error": "Logout failed"}), 500
 
 @app.route('/auth/change_password', methods=['POST'])
+@require_bearer
 def change_password():
     """User password change endpoint"""
-    auth_header = request.headers.get('Authorization')
-    if not auth_header or not auth_header.startswith('Bearer '):
-        return jsonify({"error": "No valid session token"}), 401
-    
-    session_id = auth_header.split(' ')[1]
+    session = g.user_session
     
     try:
-        # Get user session
-        session = auth_manager.get_session(session_id)
-        if not session or not session.is_active:
-            return jsonify({"error": "Invalid session"}), 401
-        
         data = request.get_json()
         current_password = data.get('current_password')
         new_password = data.get('new_password')
@@ -713,6 +948,7 @@ def change_password():
         # Update password
         success = auth_manager.update_user_password(session.user_id, new_password)
         if success:
+            forget_session(g.session_id)
             return jsonify({"success": True, "message": "Password changed successfully"})
         else:
             return jsonify({"error": "Failed to change password"}), 500
@@ -722,23 +958,14 @@ def change_password():
         return jsonify({"error": "Password change failed"}), 500
 
 @app.route('/user/connect_mocxha', methods=['POST'])
+@require_bearer
 def user_connect_mocxha():
     """
     Connect to Mocxha for authenticated users and save credentials.
     """
-    # Check authentication
-    auth_header = request.headers.get('Authorization')
-    if not auth_header or not auth_header.startswith('Bearer '):
-        return jsonify({"error": "Authentication required"}), 401
-    
-    session_id = auth_header.split(' ')[1]
+    session = g.user_session
     
     try:
-        # Get user session
-        session = auth_manager.get_session(session_id)
-        if not session or not session.is_active:
-            return jsonify({"error": "Invalid session"}), 401
-        
         data = request.get_json()
         erpnext_url = data.get('mocxha_url') or data.get('erpnext_url')
         username = data.get('username')
@@ -754,27 +981,31 @@ def user_connect_mocxha():
         if not google_api_key:
             return jsonify({"error": "Google API key not configured"}), 500
         
-        # Test the connection
-        try:
-            # Create a temporary agent to test the connection
-            test_agent = AidaERPNextAgent(
-                erpnext_url=erpnext_url,
-                username=username,
-                password=password,
-                google_api_key=google_api_key,
-                mongo_uri=None,
-                session_id="test",
-                site_base_url=site_base_url
-            )
-            
-            # Test the connection by trying to get user info
-            test_response = test_agent.chat("Hello")
-            if not test_response:
-                return jsonify({"error": "Failed to connect to Mocxha. Please check your credentials."}), 400
-            
-        except Exception as e:
-            flask_logger.error(f"Mocxha connection test failed: {e}")
-            return jsonify({"error": f"Failed to connect to Mocxha: {str(e)}"}), 400
+        # Test the connection, unless these credentials passed the test moments ago
+        probe_key = _connect_probe_key(erpnext_url, username, password)
+        if _is_connection_recently_probed(probe_key):
+            flask_logger.debug("Mocxha connection test cached for user: %s", username)
+        else:
+            try:
+                # Reuse a warm agent for these credentials to test the connection
+                test_agent = _probe_agent(
+                    probe_key,
+                    erpnext_url=erpnext_url,
+                    username=username,
+                    password=password,
+                    google_api_key=google_api_key,
+                    site_base_url=site_base_url
+                )
+                
+                # Test the connection by trying to get user info
+                test_response = test_agent.chat("Hello")
+                if not test_response:
+                    return jsonify({"error": "Failed to connect to Mocxha. Please check your credentials."}), 400
+                _remember_connection_probe(probe_key)
+                
+            except Exception as e:
+                flask_logger.error(f"Mocxha connection test failed: {e}")
+                return jsonify({"error": f"Failed to connect to Mocxha: {str(e)}"}), 400
         
         # Save credentials to user account
         credentials = {
@@ -805,13 +1036,13 @@ def user_connect_mocxha():
         )
         
         # Create agent
-        active_agents[mocxha_session_id] = AidaERPNextAgent(
+        start_agent(
+            mocxha_session_id,
             erpnext_url=erpnext_url,
             username=username,
             password=password,
             google_api_key=google_api_key,
             mongo_uri=None,
-            session_id=mocxha_session_id,
             site_base_url=site_base_url
         )
         
@@ -827,23 +1058,14 @@ def user_connect_mocxha():
         return jsonify({"error": f"Failed to connect to Mocxha: {str(e)}"}), 500
 
 @app.route('/user/auto_connect_mocxha', methods=['POST'])
+@require_bearer
 def user_auto_connect_mocxha():
     """
     Auto-connect to Mocxha using saved credentials for authenticated users.
     """
-    # Check authentication
-    auth_header = request.headers.get('Authorization')
-    if not auth_header or not auth_header.startswith('Bearer '):
-        return jsonify({"error": "Authentication required"}), 401
-    
-    session_id = auth_header.split(' ')[1]
+    session = g.user_session
     
     try:
-        # Get user session
-        session = auth_manager.get_session(session_id)
-        if not session or not session.is_active:
-            return jsonify({"error": "Invalid session"}), 401
-        
         # Get user's saved Mocxha credentials
         credentials = auth_manager.get_mocxha_credentials(session.user_id)
         if not credentials:
@@ -854,33 +1076,10 @@ def user_auto_connect_mocxha():
         if not google_api_key:
             return jsonify({"error": "Google API key not configured"}), 500
         
-        # Test the connection with saved credentials
-        try:
-            # Create a temporary agent to test the connection
-            test_agent = AidaERPNextAgent(
-                erpnext_url=credentials["mocxha_url"],
-                username=credentials["username"],
-                password=credentials["password"],
-                google_api_key=google_api_key,
-                mongo_uri=None,
-                session_id="test",
-                site_base_url=credentials.get("site_base_url", credentials["mocxha_url"])
-            )
-            
-            # Test the connection by trying to get user info
-            test_response = test_agent.chat("Hello")
-            if not test_response:
-                return jsonify({"error": "Failed to connect to Mocxha with saved credentials. Please reconnect."}), 400
-            
-        except Exception as e:
-            flask_logger.error(f"Mocxha auto-connection test failed: {e}")
-            return jsonify({"error": f"Failed to connect to Mocxha: {str(e)}"}), 400
-        
         # Check for existing session first
         user_agent = request.headers.get('User-Agent', '')
         ip_address = request.remote_addr
         
-        # Try to find existing session
         existing_session_id = session_manager.find_existing_session(
             user_agent=user_agent,
             ip_address=ip_address,
@@ -888,32 +1087,67 @@ def user_auto_connect_mocxha():
             username=credentials["username"],
             user_id=session.user_id
         )
+        existing_session = session_manager.get_session(existing_session_id) if existing_session_id else None
+        existing_is_active = bool(existing_session and existing_session.is_active)
+        
+        # An active session whose agent is still live already proved these credentials:
+        # hand it back without repeating the connection test
+        if existing_is_active and existing_session_id in active_agents:
+            session_manager.update_session_access(existing_session_id)
+            flask_logger.info(f"✅ Mocxha auto-connected using existing session for user {session.username}: {existing_session_id}")
+            return jsonify({
+                "session_id": existing_session_id,
+                "message": "Mocxha auto-connected using existing session"
+            })
         
-        if existing_session_id:
-            # Use existing session
-            existing_session = session_manager.get_session(existing_session_id)
-            if existing_session and existing_session.is_active:
-                # Update session access time
-                session_manager.update_session_access(existing_session_id)
+        # Test the connection with saved credentials, unless they passed the test moments ago
+        probe_key = _connect_probe_key(credentials["mocxha_url"], credentials["username"], credentials["password"])
+        if _is_connection_recently_probed(probe_key):
+            flask_logger.debug("Mocxha connection test cached for user: %s", credentials["username"])
+        else:
+            try:
+                # Reuse a warm agent for these credentials to test the connection
+                test_agent = _probe_agent(
+                    probe_key,
+                    erpnext_url=credentials["mocxha_url"],
+                    username=credentials["username"],
+                    password=credentials["password"],
+                    google_api_key=google_api_key,
+                    site_base_url=credentials.get("site_base_url", credentials["mocxha_url"])
+                )
                 
-                # Check if agent already exists
-                if existing_session_id not in active_agents:
-                    # Create agent for existing session
-                    active_agents[existing_session_id] = AidaERPNextAgent(
-                        erpnext_url=credentials["mocxha_url"],
-                        username=credentials["username"],
-                        password=credentials["password"],
-                        google_api_key=google_api_key,
-                        mongo_uri=None,
-                        session_id=existing_session_id,
-                        site_base_url=credentials.get("site_base_url", credentials["mocxha_url"])
-                    )
+                # Test the connection by trying to get user info
+                test_response = test_agent.chat("Hello")
+                if not test_response:
+                    return jsonify({"error": "Failed to connect to Mocxha with saved credentials. Please reconnect."}), 400
+                _remember_connection_probe(probe_key)
                 
-                flask_logger.info(f"✅ Mocxha auto-connected using existing session for user {session.username}: {existing_session_id}")
-                return jsonify({
-                    "session_id": existing_session_id,
-                    "message": "Mocxha auto-connected using existing session"
-                })
+            except Exception as e:
+                flask_logger.error(f"Mocxha auto-connection test failed: {e}")
+                return jsonify({"error": f"Failed to connect to Mocxha: {str(e)}"}), 400
+        
+        if existing_is_active:
+            # Use existing session, recreating its agent; update session access time
+            session_manager.update_session_access(existing_session_id)
+            
+            # Check if agent already exists
+            if existing_session_id not in active_agents:
+                # Create agent for existing session
+                start_agent(
+                    existing_session_id,
+                    erpnext_url=credentials["mocxha_url"],
+                    username=credentials["username"],
+                    password=credentials["password"],
+                    google_api_key=google_api_key,
+                    mongo_uri=None,
+                    site_base_url=credentials.get("site_base_url", credentials["mocxha_url"])
+                )
+            
+            flask_logger.info(f"✅ Mocxha auto-connected using existing session for user {session.username}: {existing_session_id}")
+            return jsonify({
+                "session_id": existing_session_id,
+                "message": "Mocxha auto-connected using existing session"
+            })
         
         # Create new session if no existing session found
         mocxha_session_id = session_manager.create_session(
@@ -928,13 +1162,13 @@ def user_auto_connect_mocxha():
         )
         
         # Create agent
-        active_agents[mocxha_session_id] = AidaERPNextAgent(
+        start_agent(
+            mocxha_session_id,
             erpnext_url=credentials["mocxha_url"],
             username=credentials["username"],
             password=credentials["password"],
             google_api_key=google_api_key,
             mongo_uri=None,
-            session_id=mocxha_session_id,
             site_base_url=credentials.get("site_base_url", credentials["mocxha_url"])
         )
         
@@ -950,23 +1184,14 @@ def user_auto_connect_mocxha():
         return jsonify({"error": f"Failed to connect to Mocxha: {str(e)}"}), 500
 
 @app.route('/user/mocxha_credentials', methods=['GET'])
+@require_bearer
 def get_user_mocxha_credentials():
     """
     Get user's saved Mocxha credentials.
     """
-    # Check authentication
-    auth_header = request.headers.get('Authorization')
-    if not auth_header or not auth_header.startswith('Bearer '):
-        return jsonify({"error": "Authentication required"}), 401
-    
-    session_id = auth_header.split(' ')[1]
+    session = g.user_session
     
     try:
-        # Get user session
-        session = auth_manager.get_session(session_id)
-        if not session or not session.is_active:
-            return jsonify({"error": "Invalid session"}), 401
-        
         # Get user's Mocxha credentials
         credentials = auth_manager.get_mocxha_credentials(session.user_id)
         
@@ -1029,20 +1254,11 @@ def admin_login():
         return jsonify({"error": "Login failed"}), 500
 
 @app.route('/admin/check_session', methods=['GET'])
+@require_admin
 def admin_check_session():
     """Check admin session validity"""
     try:
-        session_id = request.headers.get('Authorization', '').replace('Bearer ', '')
-        
-        if not session_id:
-            return jsonify({"error": "No session provided"}), 401
-        
-        admin_session = auth_manager.get_admin_session(session_id)
-        if not admin_session:
-            return jsonify({"error": "Invalid or expired session"}), 401
-        
-        # Update session activity
-        auth_manager.update_session_activity(session_id)
+        admin_session = g.admin_session
         
         return jsonify({
             "valid": True,
@@ -1060,10 +1276,11 @@ def admin_check_session():
 def admin_logout():
     """Admin logout endpoint"""
     try:
-        session_id = request.headers.get('Authorization', '').replace('Bearer ', '')
+        session_id = _bearer_token()
         
         if session_id:
             auth_manager.invalidate_session(session_id)
+            forget_session(session_id)
             flask_logger.info("Admin logout successful")
         
         return jsonify({"success": True, "message": "Logout successful"}), 200
@@ -1073,17 +1290,11 @@ def admin_logout():
         return jsonify({"error": "Logout failed"}), 500
 
 @app.route('/admin/change_password', methods=['POST'])
+@require_admin
 def admin_change_password():
     """Change admin password"""
     try:
-        session_id = request.headers.get('Authorization', '').replace('Bearer ', '')
-        
-        if not session_id:
-            return jsonify({"error": "No session provided"}), 401
-        
-        admin_session = auth_manager.get_admin_session(session_id)
-        if not admin_session:
-            return jsonify({"error": "Invalid or expired session"}), 401
+        admin_session = g.admin_session
         
         data = request.get_json()
         current_password = data.get('current_password')
@@ -1098,6 +1309,7 @@ def admin_change_password():
         )
         
         if success:
+            forget_session(g.session_id)
             flask_logger.info(f"Admin password changed for user: {admin_session.username}")
             return jsonify({"success": True, "message": message}), 200
         else:
@@ -1108,21 +1320,10 @@ def admin_change_password():
         return jsonify({"error": "Password change failed"}), 500
 
 @app.route('/admin/change_user_password', methods=['POST'])
+@require_admin
 def admin_change_user_password():
     """Change user password (admin only)"""
     try:
-        # Check admin authentication
-        session_id = request.headers.get('Authorization', '').replace('Bearer ', '')
-        if not session_id:
-            return jsonify({"error": "No session provided"}), 401
-        
-        admin_session = auth_manager.get_admin_session(session_id)
-        if not admin_session:
-            return jsonify({"error": "Invalid or expired session"}), 401
-        
-        # Update session activity
-        auth_manager.update_session_activity(session_id)
-        
         data = request.get_json()
         user_id = data.get('user_id')
         new_password = data.get('new_password')
@@ -1147,21 +1348,10 @@ def admin_change_user_password():
         return jsonify({"error": "Failed to change password"}), 500
 
 @app.route('/admin/stats', methods=['GET'])
+@require_admin
 def admin_stats():
     """Get platform statistics (admin only)"""
     try:
-        # Check admin authentication
-        session_id = request.headers.get('Authorization', '').replace('Bearer ', '')
-        if not session_id:
-            return jsonify({"error": "No session provided"}), 401
-        
-        admin_session = auth_manager.get_admin_session(session_id)
-        if not admin_session:
-            return jsonify({"error": "Invalid or expired session"}), 401
-        
-        # Update session activity
-        auth_manager.update_session_activity(session_id)
-        
         stats = auth_manager.get_user_stats()
         return jsonify({"success": True, "stats": stats}), 200
     except Exception as e:
@@ -1169,21 +1359,10 @@ def admin_stats():
         return jsonify({"error": "Failed to get stats"}), 500
 
 @app.route('/admin/users', methods=['GET'])
+@require_admin
 def admin_users():
     """Get all users (admin only)"""
     try:
-        # Check admin authentication
-        session_id = request.headers.get('Authorization', '').replace('Bearer ', '')
-        if not session_id:
-            return jsonify({"error": "No session provided"}), 401
-        
-        admin_session = auth_manager.get_admin_session(session_id)
-        if not admin_session:
-            return jsonify({"error": "Invalid or expired session"}), 401
-        
-        # Update session activity
-        auth_manager.update_session_activity(session_id)
-        
         users = auth_manager.get_all_users()
         return jsonify({"success": True, "users": users}), 200
     except Exception as e:
@@ -1191,21 +1370,10 @@ def admin_users():
         return jsonify({"error": "Failed to get users"}), 500
 
 @app.route('/admin/create_user', methods=['POST'])
+@require_admin
 def admin_create_user():
     """Create a new user (admin only)"""
     try:
-        # Check admin authentication
-        session_id = request.headers.get('Authorization', '').replace('Bearer ', '')
-        if not session_id:
-            return jsonify({"error": "No session provided"}), 401
-        
-        admin_session = auth_manager.get_admin_session(session_id)
-        if not admin_session:
-            return jsonify({"error": "Invalid or expired session"}), 401
-        
-        # Update session activity
-        auth_manager.update_session_activity(session_id)
-        
         data = request.get_json()
         username = data.get('username')
         email = data.get('email')
@@ -1232,21 +1400,10 @@ def admin_create_user():
         return jsonify({"error": "Failed to create user"}), 500
 
 @app.route('/admin/deactivate_user/<user_id>', methods=['POST'])
+@require_admin
 def admin_deactivate_user(user_id):
     """Deactivate a user (admin only)"""
     try:
-        # Check admin authentication
-        session_id = request.headers.get('Authorization', '').replace('Bearer ', '')
-        if not session_id:
-            return jsonify({"error": "No session provided"}), 401
-        
-        admin_session = auth_manager.get_admin_session(session_id)
-        if not admin_session:
-            return jsonify({"error": "Invalid or expired session"}), 401
-        
-        # Update session activity
-        auth_manager.update_session_activity(session_id)
-        
         success = auth_manager.deactivate_user(user_id)
         if success:
             return jsonify({"success": True, "message": "User deactivated successfully"})
@@ -1257,21 +1414,10 @@ def admin_deactivate_user(user_id):
         return jsonify({"error": "Failed to deactivate user"}), 500
 
 @app.route('/admin/activate_user/<user_id>', methods=['POST'])
+@require_admin
 def admin_activate_user(user_id):
     """Activate a user (admin only)"""
     try:
-        # Check admin authentication
-        session_id = request.headers.get('Authorization', '').replace('Bearer ', '')
-        if not session_id:
-            return jsonify({"error": "No session provided"}), 401
-        
-        admin_session = auth_manager.get_admin_session(session_id)
-        if not admin_session:
-            return jsonify({"error": "Invalid or expired session"}), 401
-        
-        # Update session activity
-        auth_manager.update_session_activity(session_id)
-        
         success = auth_manager.activate_user(user_id)
         if success:
             return jsonify({"success": True, "message": "User activated successfully"})
@@ -1282,67 +1428,107 @@ def admin_activate_user(user_id):
         return jsonify({"error": "Failed to activate user"}), 500
 
 # Serve static files
+# The web UI is small and only changes on deploy, so read it once at startup and answer
+# from memory; ETags let browsers revalidate with a 304 instead of re-downloading
+WEB_UI_DIR = os.path.join(app.root_path, 'web_ui')
+
+def _load_web_ui(directory: str) -> Dict[str, tuple]:
+    """Read every web UI file: relative path -> (body, etag, mimetype, mtime)"""
+    assets = {}
+    for root, _, files in os.walk(directory):
+        for name in files:
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                body = f.read()
+            rel_path = os.path.relpath(path, directory).replace(os.sep, '/')
+            assets[rel_path] = (
+                body,
+                hashlib.blake2b(body, digest_size=16).hexdigest(),
+                mimetypes.guess_type(name)[0] or 'application/octet-stream',
+                os.path.getmtime(path)
+            )
+    return assets
+
+STATIC_CACHE = _load_web_ui(WEB_UI_DIR)
+
+def serve_web_ui(filename: str):
+    """Serve a web UI file from memory, falling back to disk for files added after startup"""
+    asset = STATIC_CACHE.get(filename)
+    if asset is None:
+        return send_from_directory('web_ui', filename)
+    body, etag, mimetype, mtime = asset
+    response = Response(body, mimetype=mimetype)
+    response.set_etag(etag)
+    response.last_modified = mtime
+    max_age = app.get_send_file_max_age(filename)
+    if max_age is None:
+        response.cache_control.no_cache = True
+    else:
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+    return response.make_conditional(request)
+
 @app.route('/login')
 def login_page():
     """Serve login page"""
-    return send_from_directory('web_ui', 'login.html')
+    return serve_web_ui('login.html')
 
 @app.route('/admin-login')
 def admin_login_page():
     """Serve admin login page"""
-    return send_from_directory('web_ui', 'admin_login.html')
+    return serve_web_ui('admin_login.html')
 
 @app.route('/admin')
 def admin_page():
     """Serve admin panel (protected)"""
-    return send_from_directory('web_ui', 'admin.html')
+    return serve_web_ui('admin.html')
 
 @app.route('/admin.js')
 def serve_admin_js():
     """Serve admin JavaScript"""
-    return send_from_directory('web_ui', 'admin.js')
+    return serve_web_ui('admin.js')
 
 @app.route('/admin_login.js')
 def serve_admin_login_js():
     """Serve admin login JavaScript"""
-    return send_from_directory('web_ui', 'admin_login.js')
+    return serve_web_ui('admin_login.js')
 
 @app.route('/login.js')
 def serve_login_js():
     """Serve login JavaScript"""
-    return send_from_directory('web_ui', 'login.js')
+    return serve_web_ui('login.js')
 
 @app.route('/test_config')
 def test_config_page():
     """Serve the test configuration page"""
-    return send_from_directory('web_ui', 'test_config.html')
+    return serve_web_ui('test_config.html')
 
 
 
 @app.route('/config.js')
 def serve_config_js():
     """Serve the configuration JavaScript file"""
-    return send_from_directory('web_ui', 'config.js')
+    return serve_web_ui('config.js')
 
 @app.route('/')
 def index():
     """Serve the main web UI"""
-    return send_from_directory('web_ui', 'index.html')
+    return serve_web_ui('index.html')
 
 @app.route('/web_ui/<path:filename>')
 def serve_static(filename):
     """Serve static files from web_ui directory"""
-    return send_from_directory('web_ui', filename)
+    return serve_web_ui(filename)
 
 @app.route('/styles.css')
 def serve_styles():
     """Serve styles.css directly"""
-    return send_from_directory('web_ui', 'styles.css')
+    return serve_web_ui('styles.css')
 
 @app.route('/script.js')
 def serve_script():
     """Serve script.js directly"""
-    return send_from_directory('web_ui', 'script.js')
+    return serve_web_ui('script.js')
 
 @app.route('/api')
 def api_info():
@@ -1377,4 +1563,13 @@ if __name__ == '__main__':
         app.run(debug=True, host='0.0.0.0', port=5000)
     else:
         flask_logger.info("Starting Aida ERPNext AI Agent API server in PRODUCTION mode...")
-        app.run(debug=False, host='0.0.0.0', port=5000)
\ No newline at end of file
+        # Handlers spend most of their time waiting on ERPNext and Gemini, so serve them
+        # from a thread pool; Waitress also runs on Windows, unlike Gunicorn
+        threads = int(os.getenv("WAITRESS_THREADS", "32"))
+        try:
+            from waitress import serve
+        except ImportError:
+            flask_logger.warning("Waitress not installed (pip install waitress); falling back to Flask's threaded server")
+            app.run(debug=False, host='0.0.0.0', port=5000, threaded=True)
+        else:
+            serve(app, host='0.0.0.0', port=5000, threads=threads)
\ No newline at end of file
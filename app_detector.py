@@ -9,7 +9,7 @@ import json
 import logging
 from typing import List, Dict, Optional, Union
 from dataclasses import dataclass
-from frappeclient import FrappeClient
+from services.frappe_async import create_frappe_client
 
 
 @dataclass
@@ -52,7 +52,8 @@ class FrappeAppsDetector:
             bool: True if connection successful, False otherwise
         """
         try:
-            self.client = FrappeClient(self.site_url, self.username, self.password)
+            # Pooled, retrying session reused by every detection query
+            self.client = create_frappe_client(self.site_url, self.username, self.password)
             # Test connection by making a simple API call
             self.client.get_api("frappe.auth.get_logged_user")
             self.logger.info(f"Successfully connected to {self.site_url}")
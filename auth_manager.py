@@ -11,7 +11,7 @@ import os
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
-from pymongo import MongoClient
+from pymongo import MongoClient, ReturnDocument
 from pymongo.errors import DuplicateKeyError
 import logging
 
@@ -530,25 +530,42 @@ class AuthManager:
         """Get admin session"""
         try:
             session_data = self.sessions_collection.find_one({"session_id": session_id, "is_active": True})
-            if session_data:
-                # Check if the session is for an admin user
-                user_data = self.users_collection.find_one({"user_id": session_data["user_id"]})
-                if user_data and user_data.get("role") == "admin":
-                    return UserSession(
-                        session_id=session_data["session_id"],
-                        user_id=session_data["user_id"],
-                        username=session_data["username"],
-                        created_at=session_data["created_at"],
-                        last_activity=session_data["last_activity"],
-                        is_active=session_data["is_active"],
-                        ip_address=session_data["ip_address"],
-                        user_agent=session_data["user_agent"]
-                    )
+            return self._admin_session_from(session_data)
+        except Exception as e:
+            logger.error(f"❌ Failed to get admin session: {e}")
             return None
+    
+    def touch_and_get_admin_session(self, session_id: str) -> Optional[UserSession]:
+        """Update session last activity and get the admin session, without a separate update"""
+        try:
+            session_data = self.sessions_collection.find_one_and_update(
+                {"session_id": session_id, "is_active": True},
+                {"$set": {"last_activity": datetime.utcnow()}},
+                return_document=ReturnDocument.AFTER
+            )
+            return self._admin_session_from(session_data)
         except Exception as e:
             logger.error(f"❌ Failed to get admin session: {e}")
             return None
     
+    def _admin_session_from(self, session_data: Optional[Dict]) -> Optional[UserSession]:
+        """Build the UserSession for a session document, if it belongs to an admin user"""
+        if session_data:
+            # Check if the session is for an admin user
+            user_data = self.users_collection.find_one({"user_id": session_data["user_id"]})
+            if user_data and user_data.get("role") == "admin":
+                return UserSession(
+                    session_id=session_data["session_id"],
+                    user_id=session_data["user_id"],
+                    username=session_data["username"],
+                    created_at=session_data["created_at"],
+                    last_activity=session_data["last_activity"],
+                    is_active=session_data["is_active"],
+                    ip_address=session_data["ip_address"],
+                    user_agent=session_data["user_agent"]
+                )
+        return None
+    
     def update_admin_password(self, username: str, current_password: str, new_password: str) -> Tuple[bool, str]:
         """Update admin password"""
         try:
@@ -11,8 +11,13 @@ backlog = 2048
 # Worker processes
 # Using single worker to avoid shared state issues with active_agents dictionary
 # For high-traffic production, consider implementing Redis-based session storage
+# Agents and rate limits live in each worker's memory (thread-safe within it); with
+# more than one worker, route by session_id at the proxy so one worker owns each agent
 workers = 1
-worker_class = "sync"
+# Handlers mostly wait on ERPNext, Gemini and Google Maps, so serve requests on
+# threads: a slow chat no longer blocks every other request in the single worker
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "32"))
 worker_connections = 1000
 timeout = 30
 keepalive = 2
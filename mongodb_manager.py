@@ -3,7 +3,7 @@ import uuid
 import logging
 import hashlib
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, Iterator, List, Any, Optional, Tuple
 from dataclasses import dataclass, asdict
 import os
 
@@ -294,26 +294,70 @@ class MongoDBManager:
             logger.error(f"❌ Failed to store message: {e}")
             raise Exception(f"Message storage failed: {e}")
     
-    def get_chat_history(self, session_id: str, limit: int = 50) -> List[Dict[str, Any]]:
-        """Get chat history for a session."""
+    def store_chat_messages(self, messages: List[Dict[str, Any]]) -> int:
+        """Store several chat messages with one session lookup and one insert_many.
+        
+        Each message is a dict with session_id, message_type, content and optionally
+        metadata and timestamp. Messages for unknown or inactive sessions are skipped.
+        """
+        if not messages:
+            return 0
+        
+        session_ids = list({m["session_id"] for m in messages})
+        try:
+            sessions = {
+                doc["session_id"]: doc
+                for doc in self.sessions_collection.find(
+                    {"session_id": {"$in": session_ids}, "is_active": True},
+                    {"session_id": 1, "user_id": 1, "user_identifier": 1}
+                )
+            }
+            
+            docs = []
+            for message in messages:
+                session = sessions.get(message["session_id"])
+                if not session:
+                    logger.warning(f"Session {message['session_id']} not found, dropping {message['message_type']} message")
+                    continue
+                docs.append({
+                    "message_id": str(uuid.uuid4()),
+                    "session_id": message["session_id"],
+                    "user_id": session.get("user_id"),
+                    "user_identifier": session.get("user_identifier"),
+                    "timestamp": message.get("timestamp") or datetime.now(),
+                    "message_type": message["message_type"],
+                    "content": message["content"],
+                    "metadata": message.get("metadata")
+                })
+            
+            if docs:
+                self.messages_collection.insert_many(docs, ordered=False)
+            logger.debug(f"✅ Stored {len(docs)} messages for {len(sessions)} sessions")
+            return len(docs)
+        except Exception as e:
+            logger.error(f"❌ Failed to store messages: {e}")
+            raise Exception(f"Message storage failed: {e}")
+    
+    def iter_chat_history(self, session_id: str, limit: int = 50) -> Iterator[Dict[str, Any]]:
+        """Yield chat history for a session straight from the cursor."""
         try:
             cursor = self.messages_collection.find(
                 {"session_id": session_id}
             ).sort("timestamp", 1).limit(limit)
             
-            messages = []
             for doc in cursor:
-                messages.append({
+                yield {
                     'role': 'user' if doc['message_type'] == 'user' else 'assistant',
                     'content': doc['content'],
                     'timestamp': doc['timestamp'].isoformat(),
                     'metadata': doc.get('metadata')
-                })
-            
-            return messages
+                }
         except Exception as e:
             logger.error(f"❌ Failed to get chat history: {e}")
-            return []
+    
+    def get_chat_history(self, session_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """Get chat history for a session."""
+        return list(self.iter_chat_history(session_id, limit))
     
     def get_user_chat_history(self, username: str, erpnext_url: str, limit: int = 100) -> List[Dict[str, Any]]:
         """Get all chat history for a user across all sessions on a specific ERPNext instance."""
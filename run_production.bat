@@ -28,7 +28,7 @@ if %errorlevel% == 0 (
     python -c "import waitress" 2>nul
     if %errorlevel% == 0 (
         echo Using Waitress for production server...
-        waitress-serve --host=0.0.0.0 --port=5000 --threads=4 production_server:application
+        waitress-serve --host=0.0.0.0 --port=5000 --threads=32 production_server:application
     ) else (
         echo Neither Gunicorn nor Waitress found. Using production Flask server...
         echo Warning: For better performance, install Gunicorn or Waitress:
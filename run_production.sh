@@ -24,7 +24,7 @@ if python -c "import gunicorn" 2>/dev/null; then
     gunicorn -c gunicorn.conf.py production_server:application
 elif python -c "import waitress" 2>/dev/null; then
     echo "Using Waitress for production server..."
-    waitress-serve --host=0.0.0.0 --port=5000 --threads=4 production_server:application
+    waitress-serve --host=0.0.0.0 --port=5000 --threads=32 production_server:application
 else
     echo "Neither Gunicorn nor Waitress found. Using production Flask server..."
     echo "Warning: For better performance, install Gunicorn or Waitress:"
@@ -0,0 +1,145 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+
+class AgentCache:
+    """Thread-safe LRU of live agents keyed by session id, dropping agents left idle past ttl
+
+    Evicted agents, and agents replaced by a different one under the same key, are passed to
+    on_evict (outside the lock) so their clients can be closed.
+    """
+
+    def __init__(self, maxsize: int = 512, ttl: float = 1800.0,
+                 on_evict: Optional[Callable[[str, Any], None]] = None):
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self._agents = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get(self, session_id: str, default: Any = None) -> Any:
+        """Return the agent and mark it as recently used"""
+        expired = []
+        with self._lock:
+            entry = self._agents.get(session_id)
+            now = time.monotonic()
+            if entry is not None and now - entry[0] < self.ttl:
+                self._agents[session_id] = (now, entry[1])
+                self._agents.move_to_end(session_id)
+                return entry[1]
+            if entry is not None:
+                del self._agents[session_id]
+                expired.append((session_id, entry[1]))
+        self._notify(expired)
+        return default
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.get(session_id) is not None
+
+    def __setitem__(self, session_id: str, agent: Any) -> None:
+        with self._lock:
+            old = self._agents.get(session_id)
+            self._agents[session_id] = (time.monotonic(), agent)
+            self._agents.move_to_end(session_id)
+            evicted = self._expire_locked()
+            if old is not None and old[1] is not agent:
+                evicted.append((session_id, old[1]))
+            while len(self._agents) > self.maxsize:
+                key, (_, old_agent) = self._agents.popitem(last=False)
+                evicted.append((key, old_agent))
+        self._notify(evicted)
+
+    def replace(self, session_id: str, old: Any, new: Any) -> bool:
+        """Swap old for new if session_id still maps to old; old is not passed to on_evict"""
+        with self._lock:
+            entry = self._agents.get(session_id)
+            if entry is None or entry[1] is not old:
+                return False
+            self._agents[session_id] = (entry[0], new)
+            return True
+
+    def pop(self, session_id: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._agents.pop(session_id, None)
+        return default if entry is None else entry[1]
+
+    def __delitem__(self, session_id: str) -> None:
+        with self._lock:
+            del self._agents[session_id]
+
+    def __len__(self) -> int:
+        with self._lock:
+            evicted = self._expire_locked()
+            size = len(self._agents)
+        self._notify(evicted)
+        return size
+
+    def sweep(self) -> None:
+        """Evict idle agents now, rather than waiting for the next access to notice them"""
+        with self._lock:
+            evicted = self._expire_locked()
+        self._notify(evicted)
+
+    def _expire_locked(self) -> list:
+        """Remove idle agents; entries are in last-use order, so stop at the first fresh one"""
+        cutoff = time.monotonic() - self.ttl
+        expired = []
+        while self._agents:
+            key, (used_at, agent) = next(iter(self._agents.items()))
+            if used_at > cutoff:
+                break
+            del self._agents[key]
+            expired.append((key, agent))
+        return expired
+
+    def _notify(self, evicted: list) -> None:
+        if self.on_evict:
+            for session_id, agent in evicted:
+                self.on_evict(session_id, agent)
+
+
+class ShardedAgentCache:
+    """AgentCache split into independently locked shards, so concurrent sessions rarely contend
+
+    Each shard keeps its own LRU order and holds up to ceil(maxsize / shards) agents plus 25%
+    headroom, so sessions hashing unevenly are not evicted while the cache as a whole is below
+    maxsize. The total can exceed maxsize by that headroom.
+    """
+
+    def __init__(self, maxsize: int = 512, ttl: float = 1800.0,
+                 on_evict: Optional[Callable[[str, Any], None]] = None, shards: int = 16):
+        shards = max(1, shards)
+        per_shard = math.ceil(max(1, maxsize) / shards)
+        per_shard += max(1, per_shard // 4)
+        self._shards = [AgentCache(per_shard, ttl, on_evict) for _ in range(shards)]
+
+    def _shard(self, session_id: str) -> AgentCache:
+        return self._shards[hash(session_id) % len(self._shards)]
+
+    def get(self, session_id: str, default: Any = None) -> Any:
+        return self._shard(session_id).get(session_id, default)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._shard(session_id)
+
+    def __setitem__(self, session_id: str, agent: Any) -> None:
+        self._shard(session_id)[session_id] = agent
+
+    def replace(self, session_id: str, old: Any, new: Any) -> bool:
+        return self._shard(session_id).replace(session_id, old, new)
+
+    def pop(self, session_id: str, default: Any = None) -> Any:
+        return self._shard(session_id).pop(session_id, default)
+
+    def __delitem__(self, session_id: str) -> None:
+        del self._shard(session_id)[session_id]
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+    def sweep(self) -> None:
+        for shard in self._shards:
+            shard.sweep()
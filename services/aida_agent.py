@@ -19,6 +19,10 @@ from langchain.callbacks.base import BaseCallbackHandler # Not used, but kept as
 from langchain_core.runnables.history import RunnableWithMessageHistory
 
 from frappeclient import FrappeClient
+import requests
+
+from services.frappe_async import create_frappe_client
+from services.http_session import session_sharing_pool
 
 # Import CRM agents and services
 try:
@@ -142,7 +146,8 @@ class AidaERPNextAgent:
     """
     
     def __init__(self, erpnext_url: str, username: str, password: str, google_api_key: str, 
-                 mongo_uri: str = None, session_id: str = None, site_base_url: str = None):
+                 mongo_uri: str = None, session_id: str = None, site_base_url: str = None,
+                 http_session: Optional[requests.Session] = None):
         """
         Initialize the Aida ERPNext Agent with enhanced onboarding and separated lead creation capabilities.
         
@@ -154,8 +159,11 @@ class AidaERPNextAgent:
             mongo_uri: MongoDB connection string (optional)
             session_id: Unique session identifier (optional)
             site_base_url: Base URL for generating clickable links (optional, defaults to erpnext_url)
+            http_session: Shared session whose connection pools the ERPNext client reuses (optional);
+                login cookies stay private to this agent
         """
         self.site_base_url = site_base_url or erpnext_url
+        self.http_session = http_session
         # Call the original initialization logic
         self._original_init(erpnext_url, username, password, google_api_key, mongo_uri, session_id)
     
@@ -321,7 +329,12 @@ class AidaERPNextAgent:
         self.gmaps_api_key = gmaps_api_key
         
         try:
-            self.erpnext_client = FrappeClient(erpnext_url, username, password)
+            if self.http_session is not None:
+                self.erpnext_client = create_frappe_client(
+                    erpnext_url, username, password, session=session_sharing_pool(self.http_session)
+                )
+            else:
+                self.erpnext_client = FrappeClient(erpnext_url, username, password)
             logger.info(f"✅ Connected to ERPNext at {erpnext_url}")
             # Check for specific methods for version compatibility
             # FrappeClient has standard post_api method
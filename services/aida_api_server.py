@@ -6,7 +6,9 @@ import requests
 from flask import Flask, request, jsonify, session, send_from_directory
 from flask_cors import CORS
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from typing import List, Any, Optional
+from services.agent_cache import AgentCache
+from services.rate_limiter import FixedWindowLimiter
 
 # --- START: Import AidaERPNextAgent and MongoMemoryManager from aida_agent.py ---
 # This assumes your main agent code is saved in a file named `aida_agent.py`
@@ -70,7 +72,15 @@ app.secret_key = os.getenv("FLASK_SECRET_KEY", "supersecretkey_aida_erpnext_agen
 # In-memory store for active AidaERPNextAgent instances, keyed by session_id
 # For production, this would ideally be backed by a persistent store like Redis
 # to handle server restarts and scaling.
-active_agents: Dict[str, AidaERPNextAgent] = {}
+# Locked LRU so threaded workers can share it; idle agents are dropped after AGENT_CACHE_TTL.
+active_agents = AgentCache(
+    maxsize=int(os.getenv('AGENT_CACHE_MAX', '512')),
+    ttl=float(os.getenv('AGENT_CACHE_TTL', '1800'))
+)
+
+# Per-IP request limits, shared safely between request threads
+chat_rate_limiter = FixedWindowLimiter(10, 60)  # max 10 chat requests per minute
+lead_rate_limiter = FixedWindowLimiter(5, 300)  # max 5 lead creation requests per 5 minutes
 
 
 @app.route('/init_session', methods=['POST'])
@@ -242,20 +252,9 @@ def create_leads():
     
     # Security: Rate limiting check (basic)
     client_ip = request.remote_addr
-    current_time = datetime.now()
-    
-    if not hasattr(app, 'lead_rate_limits'):
-        app.lead_rate_limits = {}
-    
-    if client_ip in app.lead_rate_limits:
-        last_requests = app.lead_rate_limits[client_ip]
-        recent_requests = [t for t in last_requests if (current_time - t).seconds < 300]  # 5 minutes
-        if len(recent_requests) >= 5:  # Max 5 lead creation requests per 5 minutes
-            flask_logger.warning(f"Lead creation rate limit exceeded for IP: {client_ip}")
-            return jsonify({"error": "Rate limit exceeded. Please try again later."}), 429
-        app.lead_rate_limits[client_ip] = recent_requests + [current_time]
-    else:
-        app.lead_rate_limits[client_ip] = [current_time]
+    if not lead_rate_limiter.allow(client_ip):
+        flask_logger.warning(f"Lead creation rate limit exceeded for IP: {client_ip}")
+        return jsonify({"error": "Rate limit exceeded. Please try again later."}), 429
     
     try:
         # Create a temporary agent instance for lead creation
@@ -297,21 +296,9 @@ def chat_with_agent():
 
     # Security: Rate limiting check (basic)
     client_ip = request.remote_addr
-    current_time = datetime.now()
-    
-    # Basic rate limiting: max 10 requests per minute per IP
-    if not hasattr(app, 'rate_limits'):
-        app.rate_limits = {}
-    
-    if client_ip in app.rate_limits:
-        last_requests = app.rate_limits[client_ip]
-        recent_requests = [t for t in last_requests if (current_time - t).seconds < 60]
-        if len(recent_requests) >= 10:
-            flask_logger.warning(f"Rate limit exceeded for IP: {client_ip}")
-            return jsonify({"error": "Rate limit exceeded. Please try again later."}), 429
-        app.rate_limits[client_ip] = recent_requests + [current_time]
-    else:
-        app.rate_limits[client_ip] = [current_time]
+    if not chat_rate_limiter.allow(client_ip):
+        flask_logger.warning(f"Rate limit exceeded for IP: {client_ip}")
+        return jsonify({"error": "Rate limit exceeded. Please try again later."}), 429
 
     if not session_id or not user_input:
         return jsonify({"error": "Session ID and user input are required."}), 400
@@ -345,8 +332,7 @@ def clear_session():
     if not session_id:
         return jsonify({"error": "Session ID is required."}), 400
 
-    if session_id in active_agents:
-        del active_agents[session_id]
+    if active_agents.pop(session_id) is not None:
         flask_logger.info(f"Session {session_id} cleared.")
         return jsonify({"message": f"Session {session_id} cleared successfully."}), 200
     else:
@@ -1,18 +1,25 @@
 from frappeclient import FrappeClient
 import logging
+import requests
 import json
+import os
+import time
 from typing import Dict, List, Optional
 from services.gmaps_service import BusinessData
 from services.company_research_service import CompanyResearchService
 
 class ERPNextService:
-    def __init__(self, url: str, username: str, password: str):
+    def __init__(self, url: str, username: str, password: str, session: Optional[requests.Session] = None):
         self.url = url
+        self.session = session
         self.username = username
         self.password = password
         self.client = None
         self.valid_industries = None
         self.research_service = None
+        self.lead_cache_ttl = int(os.getenv('LEAD_CACHE_TTL', '60'))
+        self._lead_fields = None
+        self._leads_cache = None  # (fetched_at, leads)
         self._authenticate()
         self._load_valid_industries()
         
@@ -24,6 +31,9 @@ class ERPNextService:
         """Authenticate with ERPNext using login method"""
         try:
             self.client = FrappeClient(self.url)
+            if self.session is not None:
+                # Reuse the caller's connection pool for all Frappe API calls
+                self.client.session = self.session
             self.client.login(self.username, self.password)
             logging.info(f"Successfully authenticated with ERPNext at {self.url}")
             logging.info(f"Connected as user: {self.username}")
@@ -32,8 +42,21 @@ class ERPNextService:
             logging.error(f"Failed to authenticate with ERPNext: {e}")
             raise Exception(f"ERPNext authentication failed: {e}")
     
+    def invalidate_cache(self):
+        """Drop cached lead data so the next read goes to ERPNext"""
+        self._leads_cache = None
+
     def get_lead_fields(self) -> Dict:
-        """Get available fields for Lead doctype"""
+        """Get available fields for Lead doctype (cached after the first successful lookup)"""
+        if self._lead_fields is None:
+            fields = self._fetch_lead_fields()
+            if fields is None:
+                return self._get_default_lead_fields()
+            self._lead_fields = fields
+        return self._lead_fields
+
+    def _fetch_lead_fields(self) -> Optional[Dict]:
+        """Read Lead doctype meta from ERPNext, None when unavailable"""
         try:
             if not self.client:
                 raise Exception("ERPNext client not authenticated")
@@ -50,7 +73,7 @@ class ERPNextService:
                 
                 if not doctype_fields:
                     logging.warning("No fields found in Lead DocType, using default fields")
-                    return self._get_default_lead_fields()
+                    return None
                 
                 for field in doctype_fields:
                     if isinstance(field, dict):
@@ -68,12 +91,12 @@ class ERPNextService:
                 
             except Exception as e:
                 logging.warning(f"Could not get Lead DocType meta: {e}")
-                return self._get_default_lead_fields()
+                return None
         
         except Exception as e:
             logging.error(f"Failed to get Lead fields: {e}")
             logging.info("Using default Lead fields as fallback")
-            return self._get_default_lead_fields()
+            return None
     
     def _get_default_lead_fields(self) -> Dict:
         """Return default Lead fields as fallback"""
@@ -95,6 +118,13 @@ class ERPNextService:
         """
         Create a lead in ERPNext from business data and store detailed research
         """
+        try:
+            return self._create_lead(business_data, personalization_content)
+        finally:
+            self.invalidate_cache()
+
+    def _create_lead(self, business_data: BusinessData, personalization_content: Optional[str] = None) -> str:
+        """Insert the lead, retrying with reduced payloads on validation errors"""
         if not self.client:
             raise Exception("ERPNext client not authenticated")
         
@@ -311,9 +341,16 @@ class ERPNextService:
 
     def get_leads_for_campaign(self) -> List[Dict]:
         """Get all leads with research data for outreach campaigns"""
-        if self.research_service:
-            return self.research_service.get_all_leads_with_research()
-        return []
+        if not self.research_service:
+            return []
+        
+        now = time.monotonic()
+        if self._leads_cache and now - self._leads_cache[0] < self.lead_cache_ttl:
+            return self._leads_cache[1]
+        
+        leads = self.research_service.get_all_leads_with_research()
+        self._leads_cache = (now, leads)
+        return leads
 
     def _load_valid_industries(self):
         """Load valid industries from ERPNext to avoid validation errors"""
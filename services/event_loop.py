@@ -0,0 +1,33 @@
+import asyncio
+import os
+import threading
+
+
+# One event loop per process, run on a daemon thread and shared by every sync caller.
+# Async gRPC clients (Gemini) bind to the loop they are first used on, so campaigns must
+# not each spin up a fresh loop with asyncio.run.
+_loop = None
+_loop_thread = None
+_loop_pid = None
+_lock = threading.Lock()
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """Return the background loop, starting it on first use and again in forked children"""
+    global _loop, _loop_thread, _loop_pid
+    with _lock:
+        if _loop is None or _loop_pid != os.getpid():
+            _loop = asyncio.new_event_loop()
+            _loop_thread = threading.Thread(target=_loop.run_forever, name="background-loop", daemon=True)
+            _loop_thread.start()
+            _loop_pid = os.getpid()
+        return _loop
+
+
+def run_coroutine(coro):
+    """Run coro on the shared background loop and block until it returns its result"""
+    loop = _get_loop()
+    if threading.current_thread() is _loop_thread:
+        coro.close()
+        raise RuntimeError("run_coroutine cannot be called from the background loop itself")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
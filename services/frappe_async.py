@@ -0,0 +1,40 @@
+import asyncio
+from typing import Any, Dict, List, Optional
+
+import requests
+from frappeclient import FrappeClient
+
+from services.http_session import create_http_session
+
+
+def create_frappe_client(url: str, username: str, password: str,
+                         session: Optional[requests.Session] = None) -> FrappeClient:
+    """Log in a FrappeClient whose requests go through a pooled, retrying session"""
+    client = FrappeClient(url)
+    client.session = session or create_http_session()
+    client.login(username, password)
+    return client
+
+
+class AsyncFrappeClient:
+    """Awaitable facade over a logged-in FrappeClient
+
+    Each call runs in a worker thread on the client's pooled session, so
+    coroutines can issue Frappe requests concurrently without blocking the
+    event loop.
+    """
+
+    def __init__(self, client: FrappeClient):
+        self.client = client
+
+    async def get_list(self, doctype: str, **kwargs) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.client.get_list, doctype, **kwargs)
+
+    async def get_doc(self, doctype: str, name: str = '', **kwargs) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.client.get_doc, doctype, name, **kwargs)
+
+    async def get_api(self, method: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        return await asyncio.to_thread(self.client.get_api, method, params or {})
+
+    async def post_api(self, method: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        return await asyncio.to_thread(self.client.post_api, method, params or {})
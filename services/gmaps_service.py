@@ -1,8 +1,9 @@
 import requests
 import json
 import logging
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional
 from dataclasses import dataclass
+from services.http_session import create_http_session
 
 @dataclass
 class BusinessData:
@@ -19,8 +20,9 @@ class BusinessData:
     company_size: Optional[str] = None
 
 class GMapsDataExtractor:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, session: Optional[requests.Session] = None):
         self.api_key = api_key
+        self.session = session or create_http_session()
         self.base_url = "https://api.gmapsdataextractor.com/search"
         self.headers = {'X-API-Key': api_key}
     
@@ -36,6 +38,15 @@ class GMapsDataExtractor:
         Returns:
             List of BusinessData objects
         """
+        businesses = list(self.iter_businesses(query, location, count))
+        logging.info(f"Successfully parsed {len(businesses)} businesses")
+        return businesses
+    
+    def iter_businesses(self, query: str, location: str = "", count: int = 10) -> Iterator[BusinessData]:
+        """
+        Search for businesses and yield them one at a time as they are parsed,
+        so callers can stop consuming once they have enough matches
+        """
         search_query = f"{query}"
         if location:
             search_query += f" in {location}"
@@ -52,7 +63,7 @@ class GMapsDataExtractor:
             logging.info(f"Making API request to {self.base_url}")
             logging.info(f"Query: {search_query}")
             
-            response = requests.get(self.base_url, headers=self.headers, params=params, timeout=30)
+            response = self.session.get(self.base_url, headers=self.headers, params=params, timeout=30)
             
             logging.info(f"API Response Status: {response.status_code}")
             
@@ -80,7 +91,7 @@ class GMapsDataExtractor:
             
             logging.info(f"API returned data with keys: {list(data.keys()) if isinstance(data, dict) else 'Not a dict'}")
             
-            return self._parse_response(data)
+            raw_items = self._response_items(data)
         
         except requests.Timeout:
             logging.error("API request timed out")
@@ -91,9 +102,17 @@ class GMapsDataExtractor:
         except Exception as e:
             logging.error(f"Unexpected error in API call: {e}")
             raise
+        
+        yield from self._iter_parsed(raw_items)
     
     def _parse_response(self, response_data: Dict) -> List[BusinessData]:
         """Parse API response into BusinessData objects"""
+        businesses = list(self._iter_parsed(self._response_items(response_data)))
+        logging.info(f"Successfully parsed {len(businesses)} businesses")
+        return businesses
+    
+    def _response_items(self, response_data: Dict) -> List[Dict]:
+        """Validate an API response and return its raw business items"""
         if not response_data:
             logging.warning("Empty response data")
             return []
@@ -115,8 +134,10 @@ class GMapsDataExtractor:
             logging.info(f"Response structure: {json.dumps(response_data, indent=2)[:500]}...")
             return []
         
-        businesses = []
-        
+        return data_list
+    
+    def _iter_parsed(self, data_list: List[Dict]) -> Iterator[BusinessData]:
+        """Lazily parse raw business items, skipping malformed ones"""
         for item in data_list:
             if not isinstance(item, dict):
                 logging.warning(f"Skipping invalid item: {item}")
@@ -124,13 +145,10 @@ class GMapsDataExtractor:
             
             try:
                 business = self._parse_business_item(item)
-                businesses.append(business)
             except Exception as e:
                 logging.warning(f"Failed to parse business item: {e}")
                 continue
-        
-        logging.info(f"Successfully parsed {len(businesses)} businesses")
-        return businesses
+            yield business
     
     def _parse_business_item(self, item: Dict) -> BusinessData:
         """Parse individual business item"""
@@ -0,0 +1,57 @@
+import os
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+# (connect, read) seconds applied to requests that do not set their own timeout
+DEFAULT_TIMEOUT = (
+    float(os.getenv('HTTP_CONNECT_TIMEOUT', '5')),
+    float(os.getenv('HTTP_READ_TIMEOUT', '30'))
+)
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that falls back to a default timeout instead of waiting forever"""
+
+    def __init__(self, *args, timeout=DEFAULT_TIMEOUT, **kwargs):
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, timeout=None, **kwargs):
+        return super().send(request, timeout=timeout if timeout is not None else self.timeout, **kwargs)
+
+
+def _retry(**kwargs) -> Retry:
+    """Retry policy with jittered backoff, so retries from many threads do not line up"""
+    try:
+        return Retry(backoff_jitter=0.2, **kwargs)
+    except TypeError:  # urllib3 < 2.0 has no backoff_jitter
+        return Retry(**kwargs)
+
+
+def create_http_session(pool_connections: int = 20, pool_maxsize: int = 100,
+                        timeout=DEFAULT_TIMEOUT) -> requests.Session:
+    """Create a requests session with a pooled, retrying adapter shared across services"""
+    session = requests.Session()
+    adapter = TimeoutHTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=_retry(total=3, backoff_factor=0.3, status_forcelist=[429, 502, 503, 504]),
+        timeout=timeout
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def session_sharing_pool(shared: requests.Session) -> requests.Session:
+    """New session with its own cookie jar that borrows the shared session's connection pools
+
+    Lets per-user clients reuse warm keep-alive connections without sharing login cookies.
+    """
+    session = requests.Session()
+    for prefix, adapter in shared.adapters.items():
+        session.mount(prefix, adapter)
+    return session
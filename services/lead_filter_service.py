@@ -122,6 +122,10 @@ class LeadFilterService:
         logging.info(f"Filtered {len(businesses)} businesses down to {len(filtered)} based on criteria: {filters}")
         return filtered
     
+    def matches(self, business: BusinessData, filters: Dict) -> bool:
+        """Check a single business against the filters (scalar form of filter_businesses)"""
+        return not filters or self._meets_criteria(business, filters)
+    
     def _meets_criteria(self, business: BusinessData, filters: Dict) -> bool:
         """Check if a business meets the filtering criteria"""
         
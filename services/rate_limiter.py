@@ -0,0 +1,66 @@
+import asyncio
+import threading
+import time
+
+
+class TokenBucket:
+    """Token bucket shared by sync and async callers; waits instead of rejecting"""
+
+    def __init__(self, rate: int, period: float = 60.0):
+        self.capacity = max(1, rate)
+        self.fill_rate = self.capacity / period
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take one token and return how long the caller must wait for it"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.fill_rate)
+            self.updated_at = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.fill_rate
+
+    def wait(self):
+        delay = self._reserve()
+        if delay:
+            time.sleep(delay)
+
+    async def __aenter__(self):
+        delay = self._reserve()
+        if delay:
+            await asyncio.sleep(delay)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+
+class FixedWindowLimiter:
+    """Per-key request counter over fixed time windows; rejects instead of waiting"""
+
+    def __init__(self, limit: int, window: float = 60.0, max_keys: int = 10000):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def allow(self, key) -> bool:
+        """Count one request for key and return whether it is within the limit"""
+        with self._lock:
+            now = time.monotonic()
+            start, count = self._windows.get(key, (now, 0))
+            if now - start >= self.window:
+                start, count = now, 0
+            elif key not in self._windows and len(self._windows) >= self.max_keys:
+                self._prune(now)
+            self._windows[key] = (start, count + 1)
+            return count < self.limit
+
+    def _prune(self, now: float):
+        """Drop keys whose window has ended, keeping memory bounded by active keys"""
+        expired = [key for key, (start, _) in self._windows.items() if now - start >= self.window]
+        for key in expired:
+            del self._windows[key]
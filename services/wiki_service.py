@@ -1,15 +1,16 @@
 import requests
 import logging
 from typing import Dict, Optional
+from services.http_session import create_http_session
 
 logger = logging.getLogger(__name__)
 
 class WikiService:
-    def __init__(self, base_url: str, username: str, password: str):
+    def __init__(self, base_url: str, username: str, password: str, session: Optional[requests.Session] = None):
         self.base_url = base_url.rstrip('/')
         self.username = username
         self.password = password
-        self.session = requests.Session()
+        self.session = session or create_http_session()
         self._authenticate()
     
     def _authenticate(self):
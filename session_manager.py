@@ -1,9 +1,12 @@
 import os
 import json
 import uuid
+import queue
 import logging
+import threading
+import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterable, Iterator, List, Any, Optional
 from dataclasses import dataclass, asdict
 import hashlib
 
@@ -73,21 +76,30 @@ class SessionManager:
     def store_chat_message(self, session_id: str, user_message: str, ai_response: str,
                           query_result: Dict[str, Any] = None, doctype: str = None):
         """Store chat message in history."""
-        # Store user message
-        self.db_manager.store_chat_message(
-            session_id=session_id,
-            message_type="user",
-            content=user_message,
-            metadata={"query_result": query_result, "doctype": doctype} if query_result or doctype else None
+        self.store_chat_messages_bulk(
+            self.chat_exchange(session_id, user_message, ai_response, query_result, doctype)
         )
+    
+    @staticmethod
+    def chat_exchange(session_id: str, user_message: str, ai_response: str,
+                      query_result: Dict[str, Any] = None, doctype: str = None) -> List[Dict[str, Any]]:
+        """The user and assistant message records for one exchange, timestamped now.
         
-        # Store AI response
-        self.db_manager.store_chat_message(
-            session_id=session_id,
-            message_type="assistant",
-            content=ai_response,
-            metadata={"query_result": query_result, "doctype": doctype} if query_result or doctype else None
-        )
+        The assistant message is stamped 1 ms later so the pair keeps its order
+        at MongoDB's millisecond timestamp precision.
+        """
+        metadata = {"query_result": query_result, "doctype": doctype} if query_result or doctype else None
+        now = datetime.now()
+        return [
+            {"session_id": session_id, "message_type": "user", "content": user_message,
+             "metadata": metadata, "timestamp": now},
+            {"session_id": session_id, "message_type": "assistant", "content": ai_response,
+             "metadata": metadata, "timestamp": now + timedelta(milliseconds=1)}
+        ]
+    
+    def store_chat_messages_bulk(self, messages: List[Dict[str, Any]]) -> int:
+        """Store many message records (see chat_exchange) in one database write."""
+        return self.db_manager.store_chat_messages(messages)
     
     def get_chat_history(self, session_id: str, limit: int = 10) -> List[Dict[str, Any]]:
         """Get chat history for session."""
@@ -96,6 +108,33 @@ class SessionManager:
         # Each message has 'role' and 'content' fields
         return messages
     
+    def iter_chat_history(self, session_id: str, limit: int = 10) -> Iterator[Dict[str, Any]]:
+        """Yield chat history for session without materializing the full list."""
+        return self.db_manager.iter_chat_history(session_id, limit)
+    
+    @staticmethod
+    def pair_chat_history(history: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Pair each user message with the assistant response right after it, for the UI.
+        
+        A user message without a response gets an empty ai_response; assistant
+        messages without a preceding user message are dropped.
+        """
+        pending = None
+        for msg in history:
+            if pending is not None:
+                yield {
+                    "timestamp": pending["timestamp"],
+                    "user_message": pending["content"],
+                    "ai_response": msg["content"] if msg["role"] == "assistant" else ""
+                }
+            pending = msg if msg["role"] == "user" else None
+        if pending is not None:
+            yield {
+                "timestamp": pending["timestamp"],
+                "user_message": pending["content"],
+                "ai_response": ""
+            }
+    
     def cleanup_expired_sessions(self, days: int = 30):
         """Remove sessions older than specified days."""
         self.db_manager.cleanup_expired_sessions(days)
@@ -126,4 +165,85 @@ class SessionManager:
     
     def delete_chat(self, chat_id: str, user_id: str = None) -> bool:
         """Delete a chat."""
-        return self.db_manager.delete_chat(chat_id, user_id)
\ No newline at end of file
+        return self.db_manager.delete_chat(chat_id, user_id)
+
+
+class ChatMessageWriter:
+    """Background writer that batches chat messages into bulk inserts.
+    
+    A batch is written once it holds batch_size messages or max_wait seconds after
+    its first message, whichever comes first. When the queue is full, put() writes
+    synchronously instead of blocking the request on the queue.
+    
+    The writer thread starts on the first put() in each process, so a writer created
+    before a fork (e.g. Gunicorn with preload_app) still runs in the workers.
+    """
+    
+    def __init__(self, session_manager: SessionManager, batch_size: int = 32,
+                 max_wait: float = 0.05, max_queue: int = 10000):
+        self.session_manager = session_manager
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+    
+    def _ensure_started(self):
+        """Start the writer thread, with a fresh queue, if this process has none yet."""
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=self.max_queue)
+                self._thread = threading.Thread(target=self._run, name="chat-message-writer", daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+    
+    def put(self, session_id: str, user_message: str, ai_response: str,
+            query_result: Dict[str, Any] = None, doctype: str = None):
+        """Queue one chat exchange for storage."""
+        exchange = SessionManager.chat_exchange(session_id, user_message, ai_response, query_result, doctype)
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(exchange)
+        except queue.Full:
+            logger.warning("Chat message queue full, storing synchronously")
+            self.session_manager.store_chat_messages_bulk(exchange)
+    
+    def _run(self):
+        while True:
+            batch = list(self._queue.get())
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.extend(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write(batch)
+    
+    def _write(self, batch: List[Dict[str, Any]]):
+        try:
+            self.session_manager.store_chat_messages_bulk(batch)
+        except Exception as e:
+            logger.error(f"Failed to store {len(batch)} chat messages: {e}")
+    
+    def flush(self):
+        """Synchronously write whatever is still queued, e.g. at shutdown.
+        
+        Only the process running the writer thread owns the queue; anywhere else this is a no-op.
+        """
+        if self._pid != os.getpid():
+            return
+        batch = []
+        while True:
+            try:
+                batch.extend(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self._write(batch)
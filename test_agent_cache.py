@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Tests for the agent caches: TTL expiry, LRU eviction and eviction callbacks
+"""
+
+from unittest import mock
+
+from services.agent_cache import AgentCache, ShardedAgentCache
+
+
+class FakeClock:
+    """Stand-in for time.monotonic that only moves when told to"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_cache(maxsize=3, ttl=10.0):
+    evicted = []
+    cache = AgentCache(maxsize=maxsize, ttl=ttl, on_evict=lambda key, agent: evicted.append((key, agent)))
+    return cache, evicted
+
+
+def test_ttl_expiry():
+    """Agents idle for ttl seconds are dropped and passed to on_evict"""
+    clock = FakeClock()
+    with mock.patch('services.agent_cache.time.monotonic', clock):
+        cache, evicted = make_cache(ttl=10.0)
+        cache['a'] = 'agent-a'
+
+        clock.now += 9
+        assert cache.get('a') == 'agent-a'
+
+        # The get above refreshed the idle timer
+        clock.now += 9
+        assert 'a' in cache
+
+        clock.now += 10
+        assert cache.get('a') is None
+        assert evicted == [('a', 'agent-a')]
+
+
+def test_sweep_evicts_idle_agents():
+    """sweep() evicts idle agents without waiting for them to be accessed"""
+    clock = FakeClock()
+    with mock.patch('services.agent_cache.time.monotonic', clock):
+        cache, evicted = make_cache(ttl=10.0)
+        cache['a'] = 'agent-a'
+        clock.now += 5
+        cache['b'] = 'agent-b'
+
+        clock.now += 6
+        cache.sweep()
+        assert evicted == [('a', 'agent-a')]
+        assert len(cache) == 1
+
+
+def test_lru_eviction():
+    """Beyond maxsize the least recently used agent is evicted"""
+    cache, evicted = make_cache(maxsize=2)
+    cache['a'] = 'agent-a'
+    cache['b'] = 'agent-b'
+    cache.get('a')  # 'b' is now the least recently used
+    cache['c'] = 'agent-c'
+
+    assert evicted == [('b', 'agent-b')]
+    assert cache.get('a') == 'agent-a'
+    assert cache.get('c') == 'agent-c'
+
+
+def test_replacing_an_agent_evicts_the_old_one():
+    """Assigning a different agent to a key passes the old one to on_evict"""
+    cache, evicted = make_cache()
+    cache['a'] = 'agent-a'
+    cache['a'] = 'agent-a'
+    assert evicted == []
+
+    cache['a'] = 'agent-a2'
+    assert evicted == [('a', 'agent-a')]
+
+
+def test_replace_swaps_without_eviction():
+    """replace() only swaps the expected agent and never calls on_evict"""
+    cache, evicted = make_cache()
+    cache['a'] = 'pending'
+
+    assert cache.replace('a', 'pending', 'built')
+    assert not cache.replace('a', 'pending', 'other')
+    assert cache.get('a') == 'built'
+    assert evicted == []
+
+
+def test_pop_does_not_evict():
+    """pop() hands the agent back to the caller instead of on_evict"""
+    cache, evicted = make_cache()
+    cache['a'] = 'agent-a'
+    assert cache.pop('a') == 'agent-a'
+    assert cache.pop('a', 'missing') == 'missing'
+    assert evicted == []
+
+
+def test_sharded_cache_capacity():
+    """Shards round up and leave headroom, so the total never falls short of maxsize"""
+    cache = ShardedAgentCache(maxsize=100, ttl=60.0, shards=16)
+    assert sum(shard.maxsize for shard in cache._shards) >= 100
+    assert all(shard.maxsize > 100 // 16 for shard in cache._shards)
+
+    cache['session-7'] = 7
+    assert cache.get('session-7') == 7
+    assert cache.pop('session-7') == 7
+    assert 'session-7' not in cache
+
+
+if __name__ == "__main__":
+    for test in (test_ttl_expiry, test_sweep_evicts_idle_agents, test_lru_eviction,
+                 test_replacing_an_agent_evicts_the_old_one, test_replace_swaps_without_eviction,
+                 test_pop_does_not_evict, test_sharded_cache_capacity):
+        test()
+        print(f"✅ {test.__name__}")
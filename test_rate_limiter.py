@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Tests for the request limiters in services/rate_limiter.py
+"""
+
+import asyncio
+from unittest import mock
+
+from services.rate_limiter import FixedWindowLimiter, TokenBucket
+
+
+class FakeClock:
+    """Stand-in for time.monotonic that only moves when told to"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_fixed_window_limits_per_key():
+    """Each key gets limit requests per window; other keys are counted separately"""
+    clock = FakeClock()
+    with mock.patch('services.rate_limiter.time.monotonic', clock):
+        limiter = FixedWindowLimiter(limit=2, window=60.0)
+        assert limiter.allow('1.2.3.4')
+        assert limiter.allow('1.2.3.4')
+        assert not limiter.allow('1.2.3.4')
+        assert limiter.allow('5.6.7.8')
+
+        # A new window starts once the old one has ended
+        clock.now += 60
+        assert limiter.allow('1.2.3.4')
+
+
+def test_fixed_window_prunes_expired_keys():
+    """With max_keys reached, keys whose window has ended are dropped"""
+    clock = FakeClock()
+    with mock.patch('services.rate_limiter.time.monotonic', clock):
+        limiter = FixedWindowLimiter(limit=1, window=10.0, max_keys=2)
+        limiter.allow('a')
+        limiter.allow('b')
+
+        clock.now += 10
+        assert limiter.allow('c')
+        assert set(limiter._windows) == {'c'}
+
+
+def test_token_bucket_burst_then_wait():
+    """A full bucket allows a burst of rate calls, then each call waits for its token"""
+    clock = FakeClock()
+    with mock.patch('services.rate_limiter.time.monotonic', clock):
+        bucket = TokenBucket(rate=2, period=1.0)
+        assert bucket._reserve() == 0.0
+        assert bucket._reserve() == 0.0
+        assert bucket._reserve() == 0.5
+        # Tokens are reserved in order, so the next caller queues behind the last one
+        assert bucket._reserve() == 1.0
+
+        clock.now += 2
+        assert bucket._reserve() == 0.0
+
+
+def test_token_bucket_wait_sleeps_for_the_delay():
+    """wait() and the async context manager sleep only once the bucket is empty"""
+    clock = FakeClock()
+    with mock.patch('services.rate_limiter.time.monotonic', clock), \
+            mock.patch('services.rate_limiter.time.sleep') as sleep:
+        bucket = TokenBucket(rate=1, period=4.0)
+        bucket.wait()
+        sleep.assert_not_called()
+        bucket.wait()
+        sleep.assert_called_once_with(4.0)
+
+    async def acquire(bucket):
+        async with bucket:
+            pass
+
+    with mock.patch('services.rate_limiter.time.monotonic', clock), \
+            mock.patch('services.rate_limiter.asyncio.sleep', new=mock.AsyncMock()) as async_sleep:
+        bucket = TokenBucket(rate=1, period=4.0)
+        asyncio.run(acquire(bucket))
+        async_sleep.assert_not_called()
+        asyncio.run(acquire(bucket))
+        async_sleep.assert_awaited_once_with(4.0)
+
+
+if __name__ == "__main__":
+    for test in (test_fixed_window_limits_per_key, test_fixed_window_prunes_expired_keys,
+                 test_token_bucket_burst_then_wait, test_token_bucket_wait_sleeps_for_the_delay):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Tests for chat history pairing and the batched chat message writer
+"""
+
+import threading
+
+from session_manager import SessionManager, ChatMessageWriter
+
+
+def message(role, content, timestamp=0):
+    return {"role": role, "content": content, "timestamp": timestamp}
+
+
+def test_pairs_user_messages_with_responses():
+    """Each user message is paired with the assistant message right after it"""
+    history = [
+        message("user", "hi", 1),
+        message("assistant", "hello", 2),
+        message("user", "list leads", 3),
+        message("assistant", "here they are", 4),
+    ]
+    assert list(SessionManager.pair_chat_history(history)) == [
+        {"timestamp": 1, "user_message": "hi", "ai_response": "hello"},
+        {"timestamp": 3, "user_message": "list leads", "ai_response": "here they are"},
+    ]
+
+
+def test_consecutive_user_messages():
+    """A user message followed by another user message gets an empty response"""
+    history = [
+        message("user", "first", 1),
+        message("user", "second", 2),
+        message("assistant", "answer", 3),
+        message("user", "unanswered", 4),
+    ]
+    assert list(SessionManager.pair_chat_history(history)) == [
+        {"timestamp": 1, "user_message": "first", "ai_response": ""},
+        {"timestamp": 2, "user_message": "second", "ai_response": "answer"},
+        {"timestamp": 4, "user_message": "unanswered", "ai_response": ""},
+    ]
+
+
+def test_leading_assistant_message_is_dropped():
+    """Assistant messages without a preceding user message are skipped"""
+    history = [
+        message("assistant", "orphan", 1),
+        message("assistant", "another orphan", 2),
+        message("user", "question", 3),
+        message("assistant", "answer", 4),
+    ]
+    assert list(SessionManager.pair_chat_history(history)) == [
+        {"timestamp": 3, "user_message": "question", "ai_response": "answer"},
+    ]
+    assert list(SessionManager.pair_chat_history([])) == []
+
+
+class RecordingStore:
+    """Session manager stand-in that records each bulk write"""
+
+    def __init__(self, block_writer=False):
+        self.batches = []
+        self.written = threading.Event()
+        self.busy = threading.Event()
+        self.release = threading.Event()
+        if not block_writer:
+            self.release.set()
+
+    def store_chat_messages_bulk(self, messages):
+        if threading.current_thread().name == "chat-message-writer":
+            self.busy.set()
+            self.release.wait(5)
+        self.batches.append([m["content"] for m in messages])
+        self.written.set()
+        return len(messages)
+
+
+def test_writer_batches_exchanges():
+    """Exchanges queued together are stored in one bulk write"""
+    store = RecordingStore()
+    writer = ChatMessageWriter(store, batch_size=4, max_wait=5.0)
+    writer.put("s1", "q1", "a1")
+    writer.put("s1", "q2", "a2")
+
+    assert store.written.wait(5)
+    assert store.batches == [["q1", "a1", "q2", "a2"]]
+
+
+def test_writer_flushes_queued_exchanges():
+    """flush() synchronously stores whatever the writer thread has not picked up"""
+    store = RecordingStore(block_writer=True)
+    writer = ChatMessageWriter(store, batch_size=2, max_wait=0.0)
+    writer.put("s1", "q1", "a1")
+
+    # The writer thread is now stuck on the first batch; these stay queued
+    assert store.busy.wait(5)
+    writer.put("s1", "q2", "a2")
+    writer.put("s1", "q3", "a3")
+
+    writer.flush()
+    assert store.batches == [["q2", "a2", "q3", "a3"]]
+    assert writer._queue.empty()
+
+    store.release.set()
+
+
+def test_flush_before_first_put_is_a_no_op():
+    """A writer that never started (e.g. in the parent of forked workers) writes nothing"""
+    store = RecordingStore()
+    writer = ChatMessageWriter(store)
+    writer.flush()
+    assert writer._thread is None
+    assert store.batches == []
+
+
+if __name__ == "__main__":
+    for test in (test_pairs_user_messages_with_responses, test_consecutive_user_messages,
+                 test_leading_assistant_message_is_dropped, test_writer_batches_exchanges,
+                 test_writer_flushes_queued_exchanges, test_flush_before_first_put_is_a_no_op):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Tests for UnifiedAgent JSON extraction and query routing
+"""
+
+import json
+import threading
+from types import SimpleNamespace
+
+from agents.unified_agent import UnifiedAgent, QueryTypeParser, _extract_json, logger
+
+
+def test_extract_json_object():
+    """The first balanced object is returned, without surrounding text"""
+    text = 'Here you go: {"intent": "stats", "parameters": {"count": 5}} Anything else?'
+    assert json.loads(_extract_json(text)) == {"intent": "stats", "parameters": {"count": 5}}
+
+
+def test_extract_json_ignores_brackets_in_strings():
+    """Brackets and escaped quotes inside string values do not end the object"""
+    text = '```json\n{"subject": "Hi {name}", "body": "She said \\"}\\" then left"}\n```'
+    assert json.loads(_extract_json(text)) == {"subject": "Hi {name}", "body": 'She said "}" then left'}
+
+
+def test_extract_json_array_and_missing():
+    """Arrays are found with their own brackets; unbalanced or absent JSON gives None"""
+    assert json.loads(_extract_json('result: [{"idx": 0}, {"idx": 1}] done', '[', ']')) == [{"idx": 0}, {"idx": 1}]
+    assert _extract_json('no json here') is None
+    assert _extract_json('{"unterminated": {') is None
+
+
+class RecordingLeadAgent:
+    def __init__(self):
+        self.calls = []
+
+    def create_leads(self, **kwargs):
+        self.calls.append(kwargs)
+        return {"created": kwargs.get("count")}
+
+
+class RecordingExecutor:
+    def __init__(self, error=None):
+        self.inputs = []
+        self.error = error
+
+    def invoke(self, inputs):
+        self.inputs.append(inputs["input"])
+        if self.error:
+            raise self.error
+        return {"output": "handled by agent"}
+
+
+def make_agent(llm_response=None, executor_error=None):
+    """UnifiedAgent with the LLM, lead agent and ReAct executor replaced by recorders"""
+    agent = UnifiedAgent.__new__(UnifiedAgent)
+    agent.verbose = False
+    agent.logger = logger
+    agent.parser = QueryTypeParser()
+    agent.analysis_cache_ttl = 60
+    agent.analysis_cache_size = 16
+    agent._analysis_cache = {}
+    agent._analysis_cache_lock = threading.Lock()
+    agent._lead_cache = {}
+    agent._lead_cache_lock = threading.Lock()
+    agent.lead_agent = RecordingLeadAgent()
+    agent.agent_executor = RecordingExecutor(executor_error)
+
+    def invoke_llm(prompt, llm=None):
+        if llm_response is None:
+            raise RuntimeError("LLM unavailable")
+        return SimpleNamespace(content=llm_response)
+    agent._invoke_llm = invoke_llm
+    return agent
+
+
+def test_failed_analysis_goes_to_the_agent():
+    """A query whose analysis fails is answered by the ReAct agent, never by lead creation"""
+    agent = make_agent()
+    result = agent.process_query("show me stats")
+
+    assert result == {"success": True, "result": "handled by agent", "query": "show me stats"}
+    assert agent.agent_executor.inputs == ["show me stats"]
+    assert agent.lead_agent.calls == []
+
+
+def test_failed_analysis_and_agent_error_creates_nothing():
+    """When the agent fails too, the query reports the error instead of creating leads"""
+    agent = make_agent(executor_error=RuntimeError("agent down"))
+    result = agent.process_query("how many lead replies this week?")
+
+    assert result["success"] is False
+    assert result["error"] == "agent down"
+    assert agent.lead_agent.calls == []
+
+
+def test_lead_generation_uses_analysis_parameters():
+    """Lead generation gets the business type, location and count the analysis extracted"""
+    analysis = {
+        "intent": "lead_generation",
+        "parameters": {"count": 3, "business_type": "dental clinics", "location": "Austin, TX", "filters": {}}
+    }
+    agent = make_agent(llm_response=json.dumps(analysis))
+    result = agent.process_query("I need a few dental clinics around Austin")
+
+    assert result["success"] is True
+    assert agent.agent_executor.inputs == []
+    assert len(agent.lead_agent.calls) == 1
+    call = agent.lead_agent.calls[0]
+    assert (call["business_type"], call["location"], call["count"]) == ("dental clinics", "Austin, TX", 3)
+
+
+if __name__ == "__main__":
+    for test in (test_extract_json_object, test_extract_json_ignores_brackets_in_strings,
+                 test_extract_json_array_and_missing, test_failed_analysis_goes_to_the_agent,
+                 test_failed_analysis_and_agent_error_creates_nothing,
+                 test_lead_generation_uses_analysis_parameters):
+        test()
+        print(f"✅ {test.__name__}")